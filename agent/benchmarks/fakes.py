@@ -0,0 +1,209 @@
+"""
+Stand-ins for Gemini and Neon used by the load benchmark.
+
+- FakePool / FakeConnection: an in-memory asyncpg pool seeded with the
+  tractor type catalog (legacy table dog_breeds). It answers the registered
+  queries in src/queries.py, with a configurable per-query latency and a
+  real max_size limit, so pool waits show up the way they would on Neon.
+- mock_model(): a pydantic-ai FunctionModel (wrapped in TimedModel) with a
+  synthetic time-to-first-token and per-token delay. It calls the same tools
+  Gemini would for the scripted conversation, so tool and DB stages run for
+  real.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+from src.queries import QUERIES
+from src.tracing import TimedModel
+
+# Catalog rows as seeded in dog_breeds (type_id = id)
+TRACTOR_TYPES: List[Dict[str, Any]] = [
+    {"id": 1, "name": "Farm Tractor", "size": "large", "risk_category": "medium", "avg_lifespan_years": 20,
+     "common_health_issues": ["Engine failure", "Hydraulic leaks", "Transmission wear", "Theft"], "base_premium_multiplier": 1.2},
+    {"id": 2, "name": "Vintage Tractor", "size": "medium", "risk_category": "high", "avg_lifespan_years": 60,
+     "common_health_issues": ["Rust/corrosion", "Parts unavailability", "Electrical failures"], "base_premium_multiplier": 1.5},
+    {"id": 3, "name": "Compact Tractor", "size": "small", "risk_category": "low", "avg_lifespan_years": 15,
+     "common_health_issues": ["Starter motor failure", "Belt wear", "Battery issues"], "base_premium_multiplier": 0.9},
+    {"id": 4, "name": "Utility Tractor", "size": "medium", "risk_category": "medium", "avg_lifespan_years": 18,
+     "common_health_issues": ["Hydraulic system wear", "Tyre damage", "Loader arm fatigue"], "base_premium_multiplier": 1.1},
+    {"id": 5, "name": "Mini Tractor", "size": "small", "risk_category": "low", "avg_lifespan_years": 12,
+     "common_health_issues": ["Belt wear", "Blade damage", "Starter issues"], "base_premium_multiplier": 0.8},
+    {"id": 6, "name": "Garden Tractor", "size": "small", "risk_category": "low", "avg_lifespan_years": 12,
+     "common_health_issues": ["Deck damage", "Belt failure", "Battery issues"], "base_premium_multiplier": 0.75},
+    {"id": 7, "name": "Ride-on Mower", "size": "small", "risk_category": "low", "avg_lifespan_years": 10,
+     "common_health_issues": ["Blade damage", "Belt wear", "Engine overheating"], "base_premium_multiplier": 0.7},
+]
+
+_QUERY_NAMES = {query.sql: query.name for query in QUERIES.values()}
+
+
+# =============================================================================
+# FAKE DATABASE
+# =============================================================================
+
+class FakeDatabase:
+    """Tables the agent touches, in memory."""
+
+    def __init__(self):
+        self.tractor_types = [dict(row) for row in TRACTOR_TYPES]
+        self.user_tractors: List[Tuple] = []
+        self.quotes: List[Tuple] = []
+        self.queries: Dict[str, int] = {}
+
+    def run(self, sql: str, args: Tuple) -> Any:
+        name = _QUERY_NAMES.get(sql.strip(), sql.strip().split()[0].lower())
+        self.queries[name] = self.queries.get(name, 0) + 1
+        if name == "tractor_types.all":
+            return [dict(row) for row in self.tractor_types]
+        if name == "tractor_types.by_name":
+            return [row for row in self.tractor_types if row["name"].lower() == args[0].lower()]
+        if name in ("tractor_types.best_like", "tractor_types.search"):
+            needle = args[0].strip("%").lower()
+            return [row for row in self.tractor_types if needle in row["name"].lower()]
+        if name == "users.dashboard":
+            tractors = [
+                {"id": i, "name": row[1], "type_name": row[3], "age_years": row[4]}
+                for i, row in enumerate(self.user_tractors) if row[0] == args[0]
+            ]
+            return [{"profile": None, "tractors": json.dumps(tractors), "policies": "[]"}]
+        if name == "select":
+            return [{"?column?": 1}]
+        return []
+
+
+class FakeConnection:
+    """Answers registered queries from FakeDatabase after a synthetic delay."""
+
+    def __init__(self, db: FakeDatabase, latency: float):
+        self.db = db
+        self.latency = latency
+
+    async def _query(self, sql: str, args: Tuple) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self.latency)
+        return self.db.run(sql, args)
+
+    async def fetch(self, sql: str, *args: Any) -> List[Dict[str, Any]]:
+        return await self._query(sql, args)
+
+    async def fetchrow(self, sql: str, *args: Any) -> Optional[Dict[str, Any]]:
+        rows = await self._query(sql, args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, sql: str, *args: Any) -> Any:
+        row = await self.fetchrow(sql, *args)
+        return next(iter(row.values())) if row else None
+
+    async def execute(self, sql: str, *args: Any) -> str:
+        await self._query(sql, args)
+        return "OK"
+
+    async def executemany(self, sql: str, rows: List[Tuple]) -> None:
+        await asyncio.sleep(self.latency)
+        name = _QUERY_NAMES.get(sql.strip())
+        if name == "quotes.insert":
+            self.db.quotes.extend(rows)
+        elif name == "users.insert_tractor":
+            self.db.user_tractors.extend(rows)
+
+
+class _Acquire:
+    """Like asyncpg's PoolAcquireContext: awaitable, or an async context manager."""
+
+    def __init__(self, pool: "FakePool"):
+        self.pool = pool
+        self.conn: Optional[FakeConnection] = None
+
+    def __await__(self):
+        return self.pool._acquire().__await__()
+
+    async def __aenter__(self) -> FakeConnection:
+        self.conn = await self.pool._acquire()
+        return self.conn
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.pool.release(self.conn)
+
+
+class FakePool:
+    """The parts of asyncpg.Pool that database.py uses, with a real size limit."""
+
+    def __init__(self, db: FakeDatabase, max_size: int = 10, query_latency: float = 0.002):
+        self.db = db
+        self.max_size = max_size
+        self._free = [FakeConnection(db, query_latency) for _ in range(max_size)]
+        self._available = asyncio.Semaphore(max_size)
+
+    def acquire(self) -> "_Acquire":
+        return _Acquire(self)
+
+    async def _acquire(self) -> FakeConnection:
+        await self._available.acquire()
+        return self._free.pop()
+
+    async def release(self, conn: FakeConnection) -> None:
+        self._free.append(conn)
+        self._available.release()
+
+    async def close(self) -> None:
+        pass
+
+    def get_size(self) -> int:
+        return self.max_size
+
+    def get_idle_size(self) -> int:
+        return len(self._free)
+
+    def get_min_size(self) -> int:
+        return self.max_size
+
+    def get_max_size(self) -> int:
+        return self.max_size
+
+
+# =============================================================================
+# MOCK LLM
+# =============================================================================
+
+def _plan_turn(messages: List[ModelMessage]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """The tool Gemini would call for this turn, or None to answer in text."""
+    last = messages[-1].parts[-1]
+    if isinstance(last, ToolReturnPart):
+        return None
+    prompt = last.content.lower() if isinstance(last, UserPromptPart) and isinstance(last.content, str) else ""
+    if "quote" in prompt:
+        return "generate_insurance_quote", {"plan_type": "standard"}
+    if "plans" in prompt:
+        return "show_all_plans", {}
+    return None
+
+
+def mock_model(ttft: float = 0.3, token_delay: float = 0.02, tokens: int = 40) -> TimedModel:
+    """FunctionModel with Gemini-like latency: ttft before the first token, then token_delay per token."""
+    words = ["Great", "choice,", "the", "standard", "plan", "covers", "theft", "and", "accidental", "damage."]
+
+    def reply_words() -> List[str]:
+        return [words[i % len(words)] + " " for i in range(tokens)]
+
+    async def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(ttft + token_delay * tokens)
+        tool = _plan_turn(messages)
+        if tool:
+            return ModelResponse(parts=[ToolCallPart(tool[0], tool[1])])
+        return ModelResponse(parts=[TextPart("".join(reply_words()))])
+
+    async def stream(messages: List[ModelMessage], info: AgentInfo):
+        await asyncio.sleep(ttft)
+        tool = _plan_turn(messages)
+        if tool:
+            yield {0: DeltaToolCall(name=tool[0], json_args=json.dumps(tool[1]))}
+            return
+        for word in reply_words():
+            await asyncio.sleep(token_delay)
+            yield word
+
+    return TimedModel(FunctionModel(respond, stream_function=stream, model_name="mock-gemini"))
@@ -0,0 +1,209 @@
+"""
+Load benchmark for /chat/completions (stream and non-stream) and /copilotkit.
+
+Runs the FastAPI app in-process (httpx ASGI transport) with Gemini replaced
+by a FunctionModel with synthetic latency and Neon replaced by an in-memory
+asyncpg pool seeded with the tractor type catalog (see benchmarks/fakes.py).
+Each concurrency level runs that many simulated sessions at once, each
+replaying a short quote conversation. Per level it reports:
+- throughput (turns/s)
+- turn latency p50/p95/p99
+- server-side TTFT p50/p95
+- pool acquire wait p95 and peak waiters
+- peak traced memory
+- turns shed by admission control (503 + Retry-After)
+
+Baselines live in benchmarks/baselines/load_bench.json. They are machine
+dependent, so record them on the machine that runs the check:
+    python -m benchmarks.load_bench --save-baseline
+    python -m benchmarks.load_bench --check          # exit 1 on regression
+
+Run from agent/:
+    python -m benchmarks.load_bench
+    python -m benchmarks.load_bench --endpoints chat-stream --concurrency 1 16 64 --llm-ttft-ms 500
+"""
+
+import os
+
+# Configure the app before it is imported
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("MEMORY_BACKEND", "none")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.fakes import FakeDatabase, FakePool, mock_model
+from src.agent import app, tracker_agent
+from src.database import Database
+from src.tracing import stage_metrics
+
+ENDPOINTS = ("chat-stream", "chat", "copilotkit")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "load_bench.json")
+
+# One simulated caller: greeting, type and age (fast path), plan list, quote
+CONVERSATION = [
+    "Hi there",
+    "I've got a kubota compact",
+    "it's 7 years old",
+    "what plans do you offer",
+    "can I get a quote on the standard plan",
+]
+
+# Metrics compared against the baseline; True means higher is better
+CHECKED_METRICS = {"throughput": True, "p95_ms": False, "ttft_p95_ms": False}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def send_turn(client: httpx.AsyncClient, endpoint: str, session: str, history: List[Dict[str, str]]) -> bool:
+    """Run one turn; False if admission control shed it."""
+    if endpoint == "copilotkit":
+        response = await client.post(
+            "/copilotkit",
+            json={"threadId": session, "messages": history[-1:]},
+            headers={"accept": "text/event-stream"},
+        )
+    else:
+        response = await client.post(
+            f"/chat/completions?custom_session_id=Caller|{session}",
+            json={"messages": history, "stream": endpoint == "chat-stream"},
+        )
+    if response.status_code == 503:
+        history.pop()
+        return False
+    response.raise_for_status()
+    body = response.text
+    if endpoint == "chat":
+        reply = response.json()["choices"][0]["message"]["content"]
+    else:
+        reply = body  # the streamed transcript is not needed, only that it completed
+    history.append({"role": "assistant", "content": reply[:200]})
+    return True
+
+
+async def run_session(client: httpx.AsyncClient, endpoint: str, latencies: List[float], rejected: List[int]) -> None:
+    session = uuid.uuid4().hex[:12]
+    history: List[Dict[str, str]] = []
+    for text in CONVERSATION:
+        history.append({"role": "user", "content": text})
+        started = time.perf_counter()
+        if await send_turn(client, endpoint, session, history):
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            rejected.append(1)
+
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, sessions: int) -> Dict[str, Any]:
+    stage_metrics.reset()
+    Database._max_waiting = 0
+    latencies: List[float] = []
+    rejected: List[int] = []
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(client, endpoint, latencies, rejected) for _ in range(sessions)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+
+    stages = stage_metrics.summary()
+    return {
+        "sessions": sessions,
+        "turns": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "ttft_p50_ms": stages.get("ttft", {}).get("p50_ms", 0.0),
+        "ttft_p95_ms": stages.get("ttft", {}).get("p95_ms", 0.0),
+        "pool_wait_p95_ms": stages.get("db_acquire", {}).get("p95_ms", 0.0),
+        "pool_max_waiting": Database._max_waiting,
+        "peak_mem_kib": peak // 1024,
+        "rejected": len(rejected),
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions beyond tolerance, as readable lines."""
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        for metric, higher_is_better in CHECKED_METRICS.items():
+            old, new = expected.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{key} {metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    db = FakeDatabase()
+    Database._pool = FakePool(db, max_size=args.pool_size, query_latency=args.db_latency_ms / 1000)
+    model = mock_model(args.llm_ttft_ms / 1000, args.llm_token_ms / 1000, args.llm_tokens)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    tracemalloc.start()
+    transport = httpx.ASGITransport(app=app)
+    with tracker_agent.override(model=model):
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            print(f"{'endpoint':<12} {'sessions':>8} {'turns/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+                  f"{'ttft50':>7} {'ttft95':>7} {'poolw95':>7} {'waiters':>7} {'memKiB':>8} {'shed':>5}")
+            for endpoint in args.endpoints:
+                for sessions in args.concurrency:
+                    r = await run_level(client, endpoint, sessions)
+                    results[f"{endpoint}@{sessions}"] = r
+                    print(f"{endpoint:<12} {sessions:>8} {r['throughput']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+                          f"{r['p99_ms']:>8} {r['ttft_p50_ms']:>7} {r['ttft_p95_ms']:>7} "
+                          f"{r['pool_wait_p95_ms']:>7} {r['pool_max_waiting']:>7} {r['peak_mem_kib']:>8} {r['rejected']:>5}")
+    tracemalloc.stop()
+    print(f"queries: {json.dumps(db.queries, sort_keys=True)}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {BASELINE_PATH}")
+
+    if args.check:
+        if not os.path.exists(BASELINE_PATH):
+            print(f"No baseline at {BASELINE_PATH}; run with --save-baseline first")
+            return 1
+        with open(BASELINE_PATH) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoints", nargs="*", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", nargs="*", type=int, default=[1, 8, 32], help="Concurrent sessions per level")
+    parser.add_argument("--llm-ttft-ms", type=float, default=300, help="Synthetic model time to first token")
+    parser.add_argument("--llm-token-ms", type=float, default=5, help="Synthetic delay per streamed token")
+    parser.add_argument("--llm-tokens", type=int, default=40, help="Tokens per text reply")
+    parser.add_argument("--db-latency-ms", type=float, default=2, help="Synthetic latency per query")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Compare with the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    sys.exit(asyncio.run(main(parser.parse_args())))
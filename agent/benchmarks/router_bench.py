@@ -0,0 +1,103 @@
+"""
+Latency and accuracy benchmark for the fast-path router.
+
+Replays recorded user turns (benchmarks/transcripts/*.jsonl) through
+route_utterance and reports routing accuracy against the labels and
+per-turn latency. Each line is:
+    {"text": ..., "context": {session fields}, "expected": null | {"intent": ..., slots}}
+where "expected": null means the turn must fall back to the agent.
+
+Run from agent/:
+    python -m benchmarks.router_bench
+    python -m benchmarks.router_bench --transcripts my_turns.jsonl --repeat 2000
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from src.resolver import TypeResolver
+from src.router import Route, route_utterance
+from src.sessions import SessionContext
+
+# Catalog type names (matches the seeded tractor_types table)
+CATALOG_TYPE_NAMES = [
+    "Farm Tractor",
+    "Vintage Tractor",
+    "Compact Tractor",
+    "Utility Tractor",
+    "Mini Tractor",
+    "Garden Tractor",
+    "Ride-on Mower",
+]
+
+TRANSCRIPT_DIR = os.path.join(os.path.dirname(__file__), "transcripts")
+
+
+def load_turns(paths: List[str]) -> List[Dict[str, Any]]:
+    turns = []
+    for path in paths:
+        with open(path) as f:
+            turns.extend(json.loads(line) for line in f if line.strip())
+    return turns
+
+
+def matches(route: Optional[Route], expected: Optional[Dict[str, Any]]) -> bool:
+    if expected is None or route is None:
+        return expected is None and route is None
+    return all(getattr(route, key) == value for key, value in expected.items())
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(turns: List[Dict[str, Any]], repeat: int) -> int:
+    resolver = TypeResolver(CATALOG_TYPE_NAMES)
+    correct = routed = wrongly_routed = missed = 0
+    latencies_us: List[float] = []
+
+    for turn in turns:
+        ctx = SessionContext(**turn.get("context", {}))
+        route = route_utterance(turn["text"], resolver, ctx)
+        expected = turn.get("expected")
+
+        if matches(route, expected):
+            correct += 1
+        elif route is not None:
+            wrongly_routed += 1
+            print(f"  WRONG   {turn['text']!r}: {route} (expected {expected})")
+        else:
+            missed += 1
+            print(f"  MISSED  {turn['text']!r}: fell back (expected {expected})")
+        routed += route is not None
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            route_utterance(turn["text"], resolver, ctx)
+        latencies_us.append((time.perf_counter() - start) / repeat * 1e6)
+
+    total = len(turns)
+    labelled_fast = sum(1 for t in turns if t.get("expected") is not None)
+    print(f"turns={total} fast-path labels={labelled_fast} routed={routed}")
+    print(f"accuracy={correct / total:.1%} wrongly routed={wrongly_routed} missed={missed}")
+    print(f"latency per turn: p50={statistics.median(latencies_us):.1f}us "
+          f"p99={percentile(latencies_us, 0.99):.1f}us max={max(latencies_us):.1f}us")
+    # A wrong fast-path answer is worse than a missed one
+    return 1 if wrongly_routed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transcripts", nargs="*", help="JSONL files (default: benchmarks/transcripts/*.jsonl)")
+    parser.add_argument("--repeat", type=int, default=500, help="Timing iterations per turn")
+    args = parser.parse_args()
+
+    paths = args.transcripts or sorted(glob.glob(os.path.join(TRANSCRIPT_DIR, "*.jsonl")))
+    sys.exit(run(load_turns(paths), args.repeat))
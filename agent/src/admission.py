@@ -0,0 +1,288 @@
+"""
+Admission control for Tractor Insurance Agent (Tracker)
+
+Without a bound, a burst sends every turn into the agent at once and every
+turn slows down together (Gemini rate limits, a 10-connection pool with a
+30s command timeout). Two controllers bound concurrency instead:
+- llm_admission: agent turns in flight (each turn makes its model calls one
+  after another, so this bounds concurrent LLM calls); taken by the chat
+  endpoints once a turn needs the model (turns answered by the fast path or
+  the response cache never queue) and before the response starts, so a
+  rejected turn gets a 503
+- db_admission: pool acquisitions (get_connection)
+
+A caller over the limit waits in a bounded queue ordered by priority -
+voice (Hume EVI, /chat/completions) ahead of chat (CopilotKit) ahead of
+background work. It is rejected with Overloaded instead of waiting when:
+- the queue is full (a voice caller displaces the newest lower-priority
+  waiter rather than being turned away)
+- the expected wait, from recent slot hold times, would run past the
+  request's deadline or the controller's max wait
+- it is still queued when that time runs out
+
+Slots are released deterministically: in a finally around a non-streamed
+turn, and by HeldStreamingResponse once a streamed response has been sent,
+has failed or the client has gone away (whether or not its body started).
+
+Endpoints turn Overloaded into 503 with Retry-After. Queue wait is recorded
+as the admission_wait stage (/metrics); depth, in-use and rejection counts
+are in /health and /metrics.
+
+Env: ADMISSION_ENABLED (default true), ADMISSION_LLM_MAX_CONCURRENCY,
+ADMISSION_LLM_MAX_QUEUE, ADMISSION_LLM_MAX_WAIT_SECONDS,
+ADMISSION_DB_MAX_CONCURRENCY (default DB_POOL_MAX_SIZE), ADMISSION_DB_MAX_QUEUE,
+ADMISSION_DB_MAX_WAIT_SECONDS, ADMISSION_VOICE_DEADLINE_SECONDS,
+ADMISSION_CHAT_DEADLINE_SECONDS.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .logs import get_logger, sampled
+from .tracing import record
+
+log = get_logger("admission")
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_LLM_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_LLM_MAX_CONCURRENCY", "32"))
+ADMISSION_LLM_MAX_QUEUE = int(os.environ.get("ADMISSION_LLM_MAX_QUEUE", "64"))
+ADMISSION_LLM_MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_LLM_MAX_WAIT_SECONDS", "5"))
+# Defaults to the pool size, so callers queue here (by priority) rather than in asyncpg
+ADMISSION_DB_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_DB_MAX_CONCURRENCY", os.environ.get("DB_POOL_MAX_SIZE", "10")))
+ADMISSION_DB_MAX_QUEUE = int(os.environ.get("ADMISSION_DB_MAX_QUEUE", "100"))
+ADMISSION_DB_MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_DB_MAX_WAIT_SECONDS", "2"))
+# Whole-turn budget from arrival; queue waits never run past it
+ADMISSION_VOICE_DEADLINE_SECONDS = float(os.environ.get("ADMISSION_VOICE_DEADLINE_SECONDS", "10"))
+ADMISSION_CHAT_DEADLINE_SECONDS = float(os.environ.get("ADMISSION_CHAT_DEADLINE_SECONDS", "30"))
+
+# Priorities, lowest value served first
+VOICE = 0
+CHAT = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {VOICE: "voice", CHAT: "chat", BACKGROUND: "background"}
+
+# Smoothing for the average slot hold time used to estimate waits
+_HOLD_ALPHA = 0.2
+
+request_priority: ContextVar[int] = ContextVar("request_priority", default=BACKGROUND)
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """Rejected by admission control; retry_after is in seconds."""
+
+    def __init__(self, controller: str, reason: str, retry_after: float):
+        super().__init__(f"{controller} overloaded ({reason}), retry after {retry_after:.0f}s")
+        self.controller = controller
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def begin_request(priority: int) -> None:
+    """Set this request's priority and deadline (read by every admission it goes through)."""
+    budget = ADMISSION_VOICE_DEADLINE_SECONDS if priority == VOICE else ADMISSION_CHAT_DEADLINE_SECONDS
+    request_priority.set(priority)
+    request_deadline.set(time.monotonic() + budget)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "future")
+
+    def __init__(self, priority: int, seq: int, future: "asyncio.Future[None]"):
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _granted(waiter: _Waiter) -> bool:
+    future = waiter.future
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+class Ticket:
+    """A held slot; release() is idempotent and must be called exactly once the work is done."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded priority queue and deadline-aware rejection."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_use = 0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._avg_hold = 0.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected: Dict[str, int] = {}
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for waiter in self._queue if not waiter.future.done())
+
+    def _expected_wait(self, ahead: int) -> float:
+        """Rough wait behind `ahead` queued callers, from the average hold time."""
+        return math.ceil((ahead + 1) / max(1, self.limit)) * self._avg_hold
+
+    def _reject(self, reason: str, expected_wait: float, priority: int) -> Overloaded:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        retry_after = max(1.0, math.ceil(expected_wait or self._avg_hold or 1.0))
+        sampled(log, logging.WARNING, f"admission.{self.name}.reject",
+                "Rejected %s caller at %s admission (%s): %d in use, %d queued",
+                PRIORITY_NAMES.get(priority, priority), self.name, reason, self.in_use, self.depth)
+        return Overloaded(self.name, reason, retry_after)
+
+    async def admit(self, priority: Optional[int] = None, deadline: Optional[float] = None) -> Ticket:
+        """Take a slot, waiting in the queue if needed; raises Overloaded instead of waiting too long."""
+        if not ADMISSION_ENABLED:
+            return Ticket(_UNLIMITED)
+        priority = request_priority.get() if priority is None else priority
+        deadline = request_deadline.get() if deadline is None else deadline
+
+        if self.in_use < self.limit and not self.depth:
+            return self._take()
+
+        now = time.monotonic()
+        allowed = self.max_wait if deadline is None else min(self.max_wait, deadline - now)
+        ahead = sum(1 for w in self._queue if not w.future.done() and w.priority <= priority)
+        expected = self._expected_wait(ahead)
+        if allowed <= 0 or expected > allowed:
+            raise self._reject("deadline", expected, priority)
+        if self.depth >= self.max_queue and not self._displace(priority):
+            raise self._reject("queue_full", expected, priority)
+
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            # Raises Overloaded if a higher-priority caller displaces this one
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=allowed)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if _granted(waiter):
+                # Granted, then the caller went away: hand the slot on
+                self.in_use -= 1
+                self._wake()
+            else:
+                waiter.future.cancel()
+            raise
+        finally:
+            record("admission_wait", self.name, time.perf_counter() - started)
+
+        # A grant can land just as the wait times out - the slot is still ours
+        if not _granted(waiter):
+            waiter.future.cancel()
+            raise self._reject("timeout", self._expected_wait(self.depth), priority)
+        self.admitted += 1
+        return Ticket(self)
+
+    def _take(self) -> Ticket:
+        self.in_use += 1
+        self.admitted += 1
+        record("admission_wait", self.name, 0.0)
+        return Ticket(self)
+
+    def _displace(self, priority: int) -> bool:
+        """Make room for a caller by rejecting the newest lower-priority waiter."""
+        victims = [w for w in self._queue if not w.future.done() and w.priority > priority]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda w: (w.priority, w.seq))
+        victim.future.set_exception(self._reject("displaced", self._avg_hold, victim.priority))
+        return True
+
+    def _release(self, held: float) -> None:
+        self._avg_hold += _HOLD_ALPHA * (held - self._avg_hold)
+        self.in_use -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to the highest-priority waiters still waiting."""
+        while self.in_use < self.limit and self._queue:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue
+            self.in_use += 1
+            waiter.future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "queue_depth": self.depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "avg_hold_ms": round(self._avg_hold * 1000, 1),
+        }
+
+
+class _Unlimited:
+    """Ticket target when admission control is disabled."""
+
+    def _release(self, held: float) -> None:
+        pass
+
+
+_UNLIMITED: Any = _Unlimited()
+
+llm_admission = AdmissionController(
+    "llm", ADMISSION_LLM_MAX_CONCURRENCY, ADMISSION_LLM_MAX_QUEUE, ADMISSION_LLM_MAX_WAIT_SECONDS,
+)
+db_admission = AdmissionController(
+    "db", ADMISSION_DB_MAX_CONCURRENCY, ADMISSION_DB_MAX_QUEUE, ADMISSION_DB_MAX_WAIT_SECONDS,
+)
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {"llm": llm_admission.stats(), "db": db_admission.stats()}
+
+
+class HeldStreamingResponse(StreamingResponse):
+    """StreamingResponse that holds an admission ticket until the response is over.
+
+    Released when sending completes or fails, including a client that went
+    away before the body was iterated.
+    """
+
+    def __init__(self, content: Any, ticket: Optional[Ticket] = None, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.ticket is not None:
+                self.ticket.release()
@@ -10,106 +10,73 @@ Single Pydantic AI agent serving both:
 from dotenv import load_dotenv
 load_dotenv()
 
+# Logging next, so module-level warnings in the imports below go through it
+from .logs import RequestIdMiddleware, configure_logging, get_logger, stop_logging
+configure_logging()
+
 import os
-import sys
-import json
 import uuid
+from contextlib import asynccontextmanager
 from typing import Optional, AsyncGenerator, List
 from dataclasses import dataclass, field
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import StreamingResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 
 from pydantic_ai import Agent, RunContext
-
-# Zep memory integration
-try:
-    from zep_cloud.client import AsyncZep
-    ZEP_AVAILABLE = True
-except ImportError:
-    ZEP_AVAILABLE = False
-    print("[TRACKER] Warning: zep-cloud not installed, memory features disabled", file=sys.stderr)
+from pydantic_ai.messages import AgentStreamEvent, PartDeltaEvent, PartStartEvent, TextPart, TextPartDelta
 
 from .database import (
-    get_all_tractor_types,
     get_tractor_type_by_name,
-    search_tractor_types,
-    calculate_quote,
+    load_type_resolver,
+    Database,
+    DB_WARMUP,
+    coalesce_stats,
     get_insurance_plans,
+    start_user_cache_listener,
+    user_cache,
+    DEFAULT_PLAN_TYPE,
 )
+from .pricing import quote_batch, type_multiplier, columns_to_json, compare_plans
+from .rating import ensure_rating_table
 
 # =============================================================================
 # SESSION CONTEXT FOR NAME SPACING & GREETING MANAGEMENT
 # =============================================================================
 
-from collections import OrderedDict
 import time
-import random
 
-# LRU cache for session contexts (max 100 sessions)
-_session_contexts: OrderedDict = OrderedDict()
-MAX_SESSIONS = 100
-NAME_COOLDOWN_TURNS = 3
-
-@dataclass
-class SessionContext:
-    """Track conversation state per session."""
-    turns_since_name_used: int = 0
-    name_used_in_greeting: bool = False
-    greeted_this_session: bool = False
-    last_topic: str = ""
-    last_interaction_time: float = field(default_factory=time.time)
+from .sessions import SessionContext, session_store
+from .sse import CompletionChunks, chunk_deltas, dumps
+from .history import history_for_run, record_run, record_exchange, history_from_client_messages
+from .response_cache import response_cache, state_key
+from .router import FAST_PATH_ENABLED, route_utterance, next_question, router_stats
+from .memory import user_memory
+from .auth import auth_stats, authenticated_user, split_session_id
+from .admission import CHAT, VOICE, HeldStreamingResponse, Overloaded, admission_stats, begin_request, llm_admission
+from .memo import RequestMemo, memo_stats
+from .prefetch import speculate
+from .queries import query_stats
+from .tracing import (
+    TimedModel,
+    configure_tracing,
+    record,
+    shutdown_tracing,
+    stage_metrics,
+    start_trace,
+    traced_tool,
+)
+from .writes import record_quote, record_user_tractor, start_write_behind, stop_write_behind, write_behind_stats
 
-    # User context
-    user_name: Optional[str] = None
-    context_fetched: bool = False
+log = get_logger("agent")
 
-    # Tractor context
-    tractor_name: Optional[str] = None
-    tractor_type: Optional[str] = None
-    tractor_age: Optional[int] = None
-    has_modifications: bool = False
+NAME_COOLDOWN_TURNS = 3
 
 
 def get_session_context(session_id: str) -> SessionContext:
-    """Get or create session context with LRU eviction."""
-    global _session_contexts
-
-    if session_id in _session_contexts:
-        _session_contexts.move_to_end(session_id)
-        return _session_contexts[session_id]
-
-    while len(_session_contexts) >= MAX_SESSIONS:
-        _session_contexts.popitem(last=False)
-
-    ctx = SessionContext()
-    _session_contexts[session_id] = ctx
-    return ctx
-
-
-# =============================================================================
-# ZEP MEMORY CLIENT
-# =============================================================================
-
-_zep_client: Optional["AsyncZep"] = None
-
-def get_zep_client() -> Optional["AsyncZep"]:
-    """Get or create Zep client singleton."""
-    global _zep_client
-    if _zep_client is None and ZEP_AVAILABLE:
-        api_key = os.environ.get("ZEP_API_KEY")
-        if api_key:
-            _zep_client = AsyncZep(api_key=api_key)
-            print("[TRACKER] Zep memory client initialized", file=sys.stderr)
-        else:
-            print("[TRACKER] ZEP_API_KEY not set, memory disabled", file=sys.stderr)
-    return _zep_client
-
-
-def get_zep_user_id(user_id: str) -> str:
-    """Prefix user_id with project name to separate from other projects."""
-    return f"tractorinsurance_{user_id}"
+    """Get or create session context (local LRU; see sessions.SessionStore)."""
+    return session_store.get(session_id)
 
 
 # =============================================================================
@@ -156,6 +123,7 @@ After collecting tractor info, help them find the right plan:
 
 When user is ready, generate a personalised quote:
 - Call generate_insurance_quote with their tractor details
+- If they want to compare plans or ask "which plan?", call compare_insurance_plans ONCE - never generate_insurance_quote per plan
 - Explain the premium calculation factors
 - Highlight relevant coverage for their tractor type's common risks
 
@@ -193,17 +161,12 @@ When discussing tractor types, share relevant risk info:
 ## USER PERSONALISATION
 - If the user's name is provided in [brackets] at the start of their message, USE IT naturally
 - Greet returning users by name: "Hey [Name]! Good to hear from you again!"
+- If a returning user mentions their existing tractors or policies, call get_my_account
 - Use their name occasionally but not excessively (every 2-3 exchanges is good)
 - If you learn new info about their tractor, acknowledge it
 
-## PHONETIC CORRECTIONS (voice transcription)
-- "john deer/john deere" -> John Deere
-- "massey/massey fergie/massey ferguson" -> Massey Ferguson
-- "new holland" -> New Holland
-- "kubota/cabota" -> Kubota
-- "compact/sub compact" -> Compact Tractor
-- "ride on/sit on" -> Ride-on Mower
-- "vintage/classic/old" -> Vintage Tractor
+## VOICE TRANSCRIPTION
+- Pass tractor types and brands to tools exactly as heard; the tools correct misheard names (e.g. "cabota" -> Kubota)
 """
 
 
@@ -215,45 +178,66 @@ When discussing tractor types, share relevant risk info:
 class TrackerDeps:
     """Dependencies for the Tracker agent."""
     session_id: str = ""
+    # Verified by auth.authenticated_user; None for anonymous callers (their
+    # quotes are recorded without a user, nothing else is written for them)
     user_id: Optional[str] = None
+    # Long-term memory about a returning user (Zep facts), if any
+    memory_context: Optional[str] = None
+    # Lookups shared by every tool in this request's run, prefetched ones
+    # included (see memo.py)
+    memo: RequestMemo = field(default_factory=RequestMemo)
 
 
 tracker_agent = Agent(
-    "google-gla:gemini-2.0-flash",
+    TimedModel("google-gla:gemini-2.0-flash"),
     deps_type=TrackerDeps,
-    system_prompt=TRACKER_SYSTEM_PROMPT,
+    # Instructions are sent with every request, so stored history never needs them
+    instructions=TRACKER_SYSTEM_PROMPT,
 )
 
 
+@tracker_agent.instructions
+def user_memory_instructions(ctx: RunContext[TrackerDeps]) -> str:
+    """Add what we remember about a returning user to this run's instructions."""
+    if not ctx.deps.memory_context:
+        return ""
+    return (
+        "## WHAT I REMEMBER ABOUT THIS USER:\n"
+        f"{ctx.deps.memory_context}\n"
+        "Use this naturally and don't ask again for details you already know."
+    )
+
+
 # =============================================================================
 # AGENT TOOLS
 # =============================================================================
 
-@tracker_agent.tool
-async def confirm_tractor_type(ctx: RunContext[TrackerDeps], type_name: str) -> str:
-    """Confirm the user's tractor type. Call this when user mentions their tractor type."""
-    session_ctx = get_session_context(ctx.deps.session_id)
-
+async def apply_tractor_type(session_ctx: SessionContext, type_name: str, memo: Optional[RequestMemo] = None) -> str:
+    """Record a heard tractor type on the session; returns the confirmation text."""
+    # A one-off memo when called outside an agent run (fast path)
+    memo = memo or RequestMemo()
     # Look up type in database
-    tractor_type = await get_tractor_type_by_name(type_name)
+    tractor_type = await memo.tractor_type(type_name)
 
     if tractor_type:
         session_ctx.tractor_type = tractor_type['name']
+        resolution = await memo.resolve_mention(type_name)
+        if resolution and resolution.brand:
+            session_ctx.tractor_brand = resolution.brand
+        brand = f" ({session_ctx.tractor_brand})" if session_ctx.tractor_brand else ""
         common_risks = ', '.join(tractor_type.get('common_health_issues', [])[:3])
-        return f"Confirmed: {tractor_type['name']} - a {tractor_type['size']} machine with {tractor_type['risk_category']} risk level. Common risks: {common_risks}. Typical operational life: {tractor_type.get('avg_lifespan_years', 20)} years."
+        return f"Confirmed: {tractor_type['name']}{brand} - a {tractor_type['size']} machine with {tractor_type['risk_category']} risk level. Common risks: {common_risks}. Typical operational life: {tractor_type.get('avg_lifespan_years', 20)} years."
     else:
         # Try fuzzy search
-        matches = await search_tractor_types(type_name)
+        matches = await memo.search_tractor_types(type_name)
         if matches:
             suggestions = ', '.join([t['name'] for t in matches[:3]])
             return f"I couldn't find an exact match for '{type_name}'. Did you mean: {suggestions}?"
         return f"I couldn't find '{type_name}' in our database. Could you describe what type of machine it is? We cover most agricultural vehicles."
 
 
-@tracker_agent.tool
-async def confirm_tractor_age(ctx: RunContext[TrackerDeps], age_years: int) -> str:
-    """Confirm the tractor's age. Call this when user mentions their tractor's age."""
-    session_ctx = get_session_context(ctx.deps.session_id)
+def apply_tractor_age(session_ctx: SessionContext, age_years: int) -> str:
+    """Record the tractor's age on the session; returns the confirmation text."""
     session_ctx.tractor_age = age_years
 
     if age_years < 2:
@@ -265,6 +249,21 @@ async def confirm_tractor_age(ctx: RunContext[TrackerDeps], age_years: int) -> s
 
 
 @tracker_agent.tool
+@traced_tool
+async def confirm_tractor_type(ctx: RunContext[TrackerDeps], type_name: str) -> str:
+    """Confirm the user's tractor type. Call this when user mentions their tractor type."""
+    return await apply_tractor_type(get_session_context(ctx.deps.session_id), type_name, ctx.deps.memo)
+
+
+@tracker_agent.tool
+@traced_tool
+async def confirm_tractor_age(ctx: RunContext[TrackerDeps], age_years: int) -> str:
+    """Confirm the tractor's age. Call this when user mentions their tractor's age."""
+    return apply_tractor_age(get_session_context(ctx.deps.session_id), age_years)
+
+
+@tracker_agent.tool
+@traced_tool
 async def confirm_tractor_name(ctx: RunContext[TrackerDeps], tractor_name: str) -> str:
     """Confirm the tractor's name or identifier. Call this when user shares their tractor's name."""
     session_ctx = get_session_context(ctx.deps.session_id)
@@ -273,6 +272,7 @@ async def confirm_tractor_name(ctx: RunContext[TrackerDeps], tractor_name: str)
 
 
 @tracker_agent.tool
+@traced_tool
 async def confirm_modifications(
     ctx: RunContext[TrackerDeps],
     has_modifications: bool,
@@ -287,7 +287,44 @@ async def confirm_modifications(
     return "Good to know it's standard specification. That makes things straightforward for cover options."
 
 
+def quote_tractor_details(session_ctx: SessionContext) -> dict:
+    """The tractor profile stored with each quote (policy_quotes.dog_details)."""
+    return {
+        "type_name": session_ctx.tractor_type,
+        "brand": session_ctx.tractor_brand,
+        "age_years": session_ctx.tractor_age,
+        "name": session_ctx.tractor_name,
+        "has_modifications": session_ctx.has_modifications,
+    }
+
+
+def persist_quote(
+    deps: TrackerDeps,
+    session_ctx: SessionContext,
+    plan_type: str,
+    monthly_premium: float,
+    coverage_details: dict,
+) -> None:
+    """Queue a quote for policy_quotes; user_id is None unless the caller is authenticated (see auth.py)."""
+    record_quote(deps.user_id, deps.session_id, quote_tractor_details(session_ctx),
+                 plan_type, monthly_premium, coverage_details)
+
+
+def persist_tractor(deps: TrackerDeps, session_ctx: SessionContext) -> None:
+    """Queue the session's tractor for user_dogs once, when an authenticated user is quoted."""
+    if session_ctx.tractor_saved or not deps.user_id:
+        return
+    session_ctx.tractor_saved = record_user_tractor(
+        deps.user_id,
+        session_ctx.tractor_name or session_ctx.tractor_type,
+        session_ctx.tractor_type,
+        session_ctx.tractor_age,
+        session_ctx.has_modifications,
+    )
+
+
 @tracker_agent.tool
+@traced_tool
 async def generate_insurance_quote(
     ctx: RunContext[TrackerDeps],
     plan_type: str = "standard"
@@ -298,19 +335,27 @@ async def generate_insurance_quote(
     if not session_ctx.tractor_type or session_ctx.tractor_age is None:
         return "I need to know the tractor type and age to generate an accurate quote. What type of tractor do you have, and how old is it?"
 
-    # Get type info
-    tractor_type = await get_tractor_type_by_name(session_ctx.tractor_type)
-    if not tractor_type:
-        tractor_type = await get_tractor_type_by_name("Farm Tractor")
+    session_ctx.quoted_plan = plan_type
 
-    # Calculate quote
-    quote = calculate_quote(
-        tractor_type,
+    # Type info and quote (O(1) lookup in the compiled rating table), usually
+    # already priced by the prefetch if the user asked for this plan
+    tractor_type, quote = await ctx.deps.memo.quote(
+        session_ctx.tractor_type,
         session_ctx.tractor_age,
         plan_type,
         session_ctx.has_modifications
     )
 
+    # Recorded by the write-behind queue, off the response path
+    persist_quote(
+        ctx.deps,
+        session_ctx,
+        plan_type,
+        quote['monthly_premium'],
+        {"plan": quote['plan'], "factors": quote['factors'], "annual_premium": quote['annual_premium']},
+    )
+    persist_tractor(ctx.deps, session_ctx)
+
     tractor_name = session_ctx.tractor_name or f"your {session_ctx.tractor_type}"
 
     return f"""Here's the quote for {tractor_name}:
@@ -328,8 +373,37 @@ Would you like to compare other plans or shall I explain what's included?"""
 
 
 @tracker_agent.tool
+@traced_tool
+async def compare_insurance_plans(ctx: RunContext[TrackerDeps]) -> str:
+    """Compare personalised prices for every plan at once. Call this when the user wants to compare plans."""
+    session_ctx = get_session_context(ctx.deps.session_id)
+
+    if not session_ctx.tractor_type or session_ctx.tractor_age is None:
+        return "I need to know the tractor type and age to compare prices. What type of tractor do you have, and how old is it?"
+
+    tractor_type = await ctx.deps.memo.tractor_type(session_ctx.tractor_type)
+    if not tractor_type:
+        tractor_type = await ctx.deps.memo.tractor_type("Farm Tractor")
+
+    rows = compare_plans(tractor_type or {}, session_ctx.tractor_age, session_ctx.has_modifications)
+    for row in rows:
+        persist_quote(ctx.deps, session_ctx, row['plan_type'], row['monthly_premium'], {**row, "comparison": True})
+    persist_tractor(ctx.deps, session_ctx)
+    tractor_name = session_ctx.tractor_name or f"your {session_ctx.tractor_type}"
+
+    result = f"Plan prices for {tractor_name} ({session_ctx.tractor_age} years old):\n"
+    for row in rows:
+        result += (
+            f"- {row['name']}: \u00a3{row['monthly_premium']:.2f}/mo (\u00a3{row['annual_premium']:,.2f}/yr), "
+            f"cover \u00a3{row['annual_coverage_limit']:,}, excess \u00a3{row['deductible']}\n"
+        )
+    return result + "\nWhich of these suits you best?"
+
+
+@tracker_agent.tool
+@traced_tool
 async def show_all_plans(ctx: RunContext[TrackerDeps]) -> str:
-    """Show all available insurance plans for comparison."""
+    """Show all available insurance plans with base prices. Use compare_insurance_plans once type and age are known."""
     plans = get_insurance_plans()
 
     result = "Here are our coverage options:\n\n"
@@ -343,12 +417,13 @@ async def show_all_plans(ctx: RunContext[TrackerDeps]) -> str:
 
 
 @tracker_agent.tool
+@traced_tool
 async def get_tractor_type_info(ctx: RunContext[TrackerDeps], type_name: str) -> str:
     """Get detailed information about a tractor type."""
-    tractor_type = await get_tractor_type_by_name(type_name)
+    tractor_type = await ctx.deps.memo.tractor_type(type_name)
 
     if not tractor_type:
-        matches = await search_tractor_types(type_name)
+        matches = await ctx.deps.memo.search_tractor_types(type_name)
         if matches:
             return f"Did you mean: {', '.join([t['name'] for t in matches[:3]])}?"
         return f"I couldn't find information about {type_name}."
@@ -364,14 +439,69 @@ async def get_tractor_type_info(ctx: RunContext[TrackerDeps], type_name: str) ->
 Premium multiplier: {tractor_type.get('base_premium_multiplier', 1.0)}x (based on risk category)"""
 
 
+@tracker_agent.tool
+@traced_tool
+async def get_my_account(ctx: RunContext[TrackerDeps]) -> str:
+    """Get a returning user's registered tractors and policies."""
+    # Only ever the authenticated user's own account, never an id the client sent
+    if not ctx.deps.user_id:
+        return "I can only look up saved tractors and policies once the user is signed in."
+
+    dashboard = await ctx.deps.memo.user_dashboard(ctx.deps.user_id)
+    if dashboard is None:
+        return "I couldn't load the account details right now."
+    if not dashboard["tractors"] and not dashboard["policies"]:
+        return "No tractors or policies saved on this account yet."
+
+    result = ""
+    if dashboard["tractors"]:
+        result += "**Registered tractors:**\n"
+        for tractor in dashboard["tractors"]:
+            result += f"- {tractor['name']}: {tractor['type_name']}, {tractor['age_years']} years old\n"
+    if dashboard["policies"]:
+        result += "**Policies:**\n"
+        for policy in dashboard["policies"]:
+            covered = f" for {policy['tractor_name']}" if policy.get("tractor_name") else ""
+            result += f"- {policy['plan_type'].title()} ({policy['status']}){covered}: £{policy['monthly_premium']}/month\n"
+    return result
+
+
 # =============================================================================
 # FASTAPI APPLICATION
 # =============================================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the database path and start background workers; drain and close on shutdown."""
+    configure_tracing()
+    if DB_WARMUP:
+        try:
+            await Database.warm()
+            # Catalog, resolver and rating table are all built from the first catalog load
+            await load_type_resolver()
+            await ensure_rating_table()
+            await start_user_cache_listener()
+        except Exception as e:
+            log.warning("Database warm-up failed, connecting lazily: %s", e)
+    await session_store.start()
+    await user_memory.start()
+    await start_write_behind()
+    try:
+        yield
+    finally:
+        await stop_write_behind()
+        await user_memory.stop()
+        await session_store.stop()
+        await Database.close()
+        shutdown_tracing()
+        stop_logging()
+
+
 app = FastAPI(
     title="Tracker - Tractor Insurance Agent",
     description="AI-powered tractor insurance advisor with voice support",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -380,13 +510,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# Outermost, so every log line of a request (tools and DB queries included) carries its id
+app.add_middleware(RequestIdMiddleware)
 
 
 @app.get("/health")
 async def health():
     """Health check endpoint for Railway."""
-    return {"status": "ok", "agent": "tracker", "version": "1.0.0"}
+    return {
+        "status": "ok",
+        "agent": "tracker",
+        "version": "1.0.0",
+        "db_pool": Database.stats(),
+        "db_coalescing": coalesce_stats(),
+        "admission": admission_stats(),
+        "auth": auth_stats(),
+        "queries": query_stats(),
+        "user_cache": user_cache.stats(),
+        "sessions": session_store.stats(),
+        "response_cache": response_cache.stats(),
+        "fast_path": router_stats.as_dict(),
+        "tool_memo": memo_stats.as_dict(),
+        "memory": user_memory.stats(),
+        "write_behind": write_behind_stats(),
+        "latency": stage_metrics.summary(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms and pool/queue gauges."""
+    pool = Database.stats()
+    writes = write_behind_stats()
+    coalescing = coalesce_stats()
+    admission = admission_stats()
+    gauges = {
+        "tracker_db_pool_size": pool.get("size", 0),
+        "tracker_db_pool_in_use": pool.get("in_use", 0),
+        "tracker_db_pool_waiting": pool.get("waiting", 0),
+        "tracker_db_reads_executed": coalescing["executed"],
+        "tracker_db_reads_coalesced": coalescing["coalesced"],
+        "tracker_write_queue_quotes_depth": writes["quotes"]["depth"],
+        "tracker_write_queue_tractors_depth": writes["tractors"]["depth"],
+        **{
+            f"tracker_admission_{name}_{metric}": value
+            for name, stats in admission.items()
+            for metric, value in (
+                ("in_use", stats["in_use"]),
+                ("queue_depth", stats["queue_depth"]),
+                ("rejected", sum(stats["rejected"].values())),
+            )
+        },
+    }
+    return PlainTextResponse(stage_metrics.render_prometheus(gauges), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
@@ -396,8 +574,11 @@ async def root():
         "message": "Tracker - Tractor Insurance Agent is ready!",
         "endpoints": {
             "/health": "Health check",
+            "/metrics": "Prometheus latency metrics",
             "/chat/completions": "OpenAI-compatible chat (for Hume EVI)",
             "/copilotkit": "CopilotKit AG-UI endpoint",
+            "/quotes/batch": "Bulk quote pricing (columnar)",
+            "/quotes/compare": "Price every plan for one tractor",
         }
     }
 
@@ -407,10 +588,9 @@ async def root():
 # =============================================================================
 
 def extract_session_id(request: Request, body: dict) -> Optional[str]:
-    """Extract custom_session_id from Hume request."""
+    """Extract custom_session_id from Hume request (raw: may still carry the identity token)."""
     session_id = request.query_params.get("custom_session_id") or request.query_params.get("customSessionId")
     if session_id:
-        print(f"[TRACKER] Session ID from query params: {session_id}", file=sys.stderr)
         return session_id
 
     session_id = body.get("custom_session_id") or body.get("customSessionId")
@@ -438,7 +618,10 @@ def extract_session_id(request: Request, body: dict) -> Optional[str]:
 
 
 def extract_user_from_session(session_id: Optional[str]) -> tuple[Optional[str], Optional[str]]:
-    """Extract user_name and user_id from session_id. Format: 'name|userId'"""
+    """Extract user_name and the claimed user_id from session_id. Format: 'name|userId'
+
+    The user_id is as sent by the client; auth.authenticated_user gives the verified one.
+    """
     if not session_id or '|' not in session_id:
         return None, None
 
@@ -482,28 +665,195 @@ def extract_user_from_messages(messages: list) -> tuple[Optional[str], Optional[
     return user_name, user_id, zep_context
 
 
+# =============================================================================
+# AGENT RUN HELPERS
+# =============================================================================
+
+async def fast_path_reply(user_message: str, ctx: Optional[SessionContext]) -> Optional[str]:
+    """Answer a slot-filling turn from templates, without the agent, if confident."""
+    if not FAST_PATH_ENABLED or ctx is None:
+        return None
+    route = route_utterance(user_message, await load_type_resolver(), ctx)
+    router_stats.record(route)
+    if route is None:
+        return None
+
+    confirmations = []
+    if route.type_mention:
+        confirmations.append(await apply_tractor_type(ctx, route.type_mention))
+    if route.age_years is not None:
+        confirmations.append(apply_tractor_age(ctx, route.age_years))
+    log.info("Fast path: %s (%.2f)", route.intent, route.confidence)
+    return " ".join(confirmations + [next_question(ctx)])
+
+
+def _remember_turn(
+    deps: TrackerDeps,
+    ctx: Optional[SessionContext],
+    user_message: Optional[str],
+    response_text: str,
+) -> None:
+    """Queue the exchange for long-term memory (fire-and-forget)."""
+    if user_message is not None:
+        user_memory.record_turn(deps.user_id, deps.session_id, ctx.user_name if ctx else None, user_message, response_text)
+
+
+def text_delta(event: AgentStreamEvent) -> str:
+    """Text added by one model stream event ("" for tool calls and other parts)."""
+    if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+        return event.part.content
+    if isinstance(event, PartDeltaEvent) and isinstance(event.delta, TextPartDelta):
+        return event.delta.content_delta
+    return ""
+
+
+async def _local_reply(
+    prompt: str,
+    deps: TrackerDeps,
+    ctx: Optional[SessionContext],
+    user_message: Optional[str],
+) -> Optional[str]:
+    """Answer from the fast path or the response cache (recording the turn), if possible."""
+    if user_message is None:
+        return None
+    reply = await fast_path_reply(user_message, ctx)
+    if reply is None:
+        reply = response_cache.lookup(user_message, ctx)
+    if reply is not None:
+        if ctx:
+            record_exchange(ctx, prompt, reply)
+            session_store.mark_dirty(deps.session_id)
+        _remember_turn(deps, ctx, user_message, reply)
+    return reply
+
+
+async def single_delta(text: str) -> AsyncGenerator[str, None]:
+    """A locally answered reply as a one-delta stream."""
+    yield text
+
+
+async def stream_agent_deltas(
+    prompt: str,
+    deps: TrackerDeps,
+    ctx: Optional[SessionContext],
+    message_history: list,
+    user_message: Optional[str] = None,
+) -> AsyncGenerator[str, None]:
+    """Run the agent with iter() and yield text deltas as the model writes them.
+
+    Every model response is streamed, including text written before a tool
+    call ("Let me check that."); the tool calls are then run and the run
+    continues until the model answers without calling a tool. The run is
+    recorded in the session history and the session is marked for
+    write-behind. Callers try _local_reply first and only take an admission
+    slot and call this when it has no answer; when user_message (the raw
+    utterance) is given, the finished run is offered to the response cache.
+    """
+    # Catalog and quote lookups the tools will probably need, concurrently with the model
+    speculate(deps.memo, user_message or prompt, ctx)
+    state = state_key(ctx)
+    response_text = ""
+    try:
+        async with tracker_agent.iter(prompt, deps=deps, message_history=message_history) as run:
+            async for node in run:
+                if not Agent.is_model_request_node(node):
+                    continue
+                # Keep text from separate responses apart ("Let me check. Here's...")
+                separate = bool(response_text) and not response_text[-1].isspace()
+                async with node.stream(run.ctx) as events:
+                    async for event in events:
+                        delta = text_delta(event)
+                        if not delta:
+                            continue
+                        if separate:
+                            delta = " " + delta
+                            separate = False
+                        response_text += delta
+                        yield delta
+            new_messages = run.result.new_messages()
+            if ctx:
+                record_run(ctx, new_messages)
+            # Answers shaped by a user's long-term memory are not generic
+            if user_message is not None and not deps.memory_context:
+                response_cache.store(user_message, ctx, response_text, new_messages, state)
+            _remember_turn(deps, ctx, user_message, response_text)
+    finally:
+        deps.memo.close()
+        session_store.mark_dirty(deps.session_id)
+
+
+async def run_agent_turn(
+    prompt: str,
+    deps: TrackerDeps,
+    ctx: Optional[SessionContext],
+    message_history: list,
+    user_message: Optional[str] = None,
+) -> str:
+    """Non-streaming counterpart of stream_agent_deltas; returns the full response."""
+    speculate(deps.memo, user_message or prompt, ctx)
+    state = state_key(ctx)
+    try:
+        result = await tracker_agent.run(prompt, deps=deps, message_history=message_history)
+        response_text = result.output if hasattr(result, 'output') else str(result.data)
+        new_messages = result.new_messages()
+        if ctx:
+            record_run(ctx, new_messages)
+        if user_message is not None and not deps.memory_context:
+            response_cache.store(user_message, ctx, response_text, new_messages, state)
+        _remember_turn(deps, ctx, user_message, response_text)
+        return response_text
+    finally:
+        deps.memo.close()
+        session_store.mark_dirty(deps.session_id)
+
+
 # =============================================================================
 # OPENAI-COMPATIBLE ENDPOINT (FOR HUME EVI)
 # =============================================================================
 
+def overloaded_response(error: Overloaded) -> JSONResponse:
+    """503 with Retry-After for a turn shed by admission control."""
+    return JSONResponse(
+        {"error": {"message": str(error), "type": "overloaded", "code": error.reason}},
+        status_code=503,
+        headers={"Retry-After": str(int(error.retry_after))},
+    )
+
+
 @app.post("/chat/completions")
 async def chat_completions(request: Request):
     """OpenAI-compatible chat completions endpoint for Hume EVI voice."""
+    request_start = time.perf_counter()
+    trace = start_trace()
+    # Voice turns are served ahead of chat when the agent is saturated
+    begin_request(VOICE)
+    ticket = None
+    streaming = False
     try:
         body = await request.json()
         messages = body.get("messages", [])
         stream = body.get("stream", True)
 
-        session_id = extract_session_id(request, body)
-        user_name, user_id = extract_user_from_session(session_id)
+        # The identity token is split off here, so it is never a session key,
+        # stored with a quote, sent to Zep or logged
+        session_id, session_token = split_session_id(extract_session_id(request, body))
+        log.debug("Session ID: %s", session_id)
+        user_name, claimed_id = extract_user_from_session(session_id)
         sys_name, sys_id, zep_context = extract_user_from_messages(messages)
 
         if sys_name:
             user_name = sys_name
-        if sys_id:
-            user_id = sys_id
+        # Account reads and writes only ever use the verified identity
+        user_id = authenticated_user(request, session_token)
+        if (sys_id or claimed_id) and (sys_id or claimed_id) != user_id:
+            log.debug("Ignoring unauthenticated user id from the request")
+
+        # The client may already have injected Zep context; otherwise fetch it
+        # concurrently with loading the session
+        if not zep_context:
+            user_memory.prefetch(user_id)
 
-        print(f"[TRACKER] User: {user_name}, ID: {user_id}, Zep context: {bool(zep_context)}", file=sys.stderr)
+        log.debug("User: %s, ID: %s, Zep context: %s", user_name, user_id, bool(zep_context))
 
         user_message = ""
         for msg in reversed(messages):
@@ -514,8 +864,9 @@ async def chat_completions(request: Request):
         if not user_message:
             user_message = "Hello!"
 
+        ctx = None
         if session_id:
-            ctx = get_session_context(session_id)
+            ctx = await session_store.load(session_id)
             if user_name and not ctx.user_name:
                 ctx.user_name = user_name
 
@@ -523,43 +874,51 @@ async def chat_completions(request: Request):
         if user_name:
             prompt = f"[User's name is {user_name}] {user_message}"
 
-        deps = TrackerDeps(session_id=session_id or str(uuid.uuid4()), user_id=user_id)
-        result = await tracker_agent.run(prompt, deps=deps)
+        # Reuse the session's bounded history instead of the client's full messages array
+        message_history = history_for_run(ctx) if ctx else []
+        if not message_history:
+            message_history = history_from_client_messages(messages)
 
-        response_text = result.output if hasattr(result, 'output') else str(result.data)
-        print(f"[TRACKER] Response: {response_text[:100]}...", file=sys.stderr)
+        memory_context = zep_context or await user_memory.get_context(user_id)
+        deps = TrackerDeps(session_id=session_id or str(uuid.uuid4()), user_id=user_id, memory_context=memory_context)
+
+        # Fast path and response cache answer without the model, so they never queue;
+        # a model run takes an admission slot (or is shed with a 503)
+        reply = await _local_reply(prompt, deps, ctx, user_message)
+        if reply is None:
+            ticket = await llm_admission.admit()
 
         if stream:
             async def stream_response() -> AsyncGenerator[str, None]:
-                chunk = {
-                    "id": f"chatcmpl-{uuid.uuid4()}",
-                    "object": "chat.completion.chunk",
-                    "created": int(time.time()),
-                    "model": "tracker-1.0",
-                    "choices": [{
-                        "index": 0,
-                        "delta": {"role": "assistant", "content": response_text},
-                        "finish_reason": None
-                    }]
-                }
-                yield f"data: {json.dumps(chunk)}\n\n"
-
-                done_chunk = {
-                    "id": f"chatcmpl-{uuid.uuid4()}",
-                    "object": "chat.completion.chunk",
-                    "created": int(time.time()),
-                    "model": "tracker-1.0",
-                    "choices": [{
-                        "index": 0,
-                        "delta": {},
-                        "finish_reason": "stop"
-                    }]
-                }
-                yield f"data: {json.dumps(done_chunk)}\n\n"
-                yield "data: [DONE]\n\n"
-
-            return StreamingResponse(
+                frames = CompletionChunks()
+                first_chunk_at: Optional[float] = None
+                response_text = ""
+                try:
+                    if reply is not None:
+                        deltas = single_delta(reply)
+                    else:
+                        deltas = stream_agent_deltas(prompt, deps, ctx, message_history, user_message=user_message)
+                    async for chunk in chunk_deltas(deltas):
+                        if first_chunk_at is None:
+                            first_chunk_at = time.perf_counter()
+                            log.debug("TTFT: %.0fms", (first_chunk_at - request_start) * 1000)
+                        response_text += chunk
+                        yield frames.content(chunk)
+                except Exception as e:
+                    log.exception("Error while streaming: %s", e)
+
+                total_ms = (time.perf_counter() - request_start) * 1000
+                ttft_ms = (first_chunk_at - request_start) * 1000 if first_chunk_at else total_ms
+                log.info("Streamed response: ttft=%.0fms total=%.0fms chars=%d spans: %s",
+                         ttft_ms, total_ms, len(response_text), trace.summary())
+                record("ttft", "chat_completions", ttft_ms / 1000)
+                record("request", "chat_completions", total_ms / 1000)
+                yield frames.done()
+
+            streaming = True
+            return HeldStreamingResponse(
                 stream_response(),
+                ticket=ticket,
                 media_type="text/event-stream",
                 headers={
                     "Cache-Control": "no-cache",
@@ -567,6 +926,15 @@ async def chat_completions(request: Request):
                 }
             )
         else:
+            if reply is not None:
+                response_text = reply
+            else:
+                response_text = await run_agent_turn(prompt, deps, ctx, message_history, user_message=user_message)
+            total_ms = (time.perf_counter() - request_start) * 1000
+            log.info("Response: total=%.0fms chars=%d spans: %s", total_ms, len(response_text), trace.summary())
+            record("request", "chat_completions", total_ms / 1000)
+            log.debug("Response text: %.100s...", response_text)
+
             return {
                 "id": f"chatcmpl-{uuid.uuid4()}",
                 "object": "chat.completion",
@@ -580,20 +948,126 @@ async def chat_completions(request: Request):
                 "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
             }
 
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
-        print(f"[TRACKER] Error in chat/completions: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        log.exception("Error in chat/completions: %s", e)
         return {"error": str(e)}, 500
+    finally:
+        # A streamed turn keeps its slot until the stream ends
+        if ticket and not streaming:
+            ticket.release()
+
+
+# =============================================================================
+# BATCH QUOTING ENDPOINT
+# =============================================================================
+
+MAX_BATCH_QUOTES = int(os.environ.get("MAX_BATCH_QUOTES", "10000"))
+
+
+@app.post("/quotes/batch")
+async def batch_quotes(request: Request):
+    """Price many quotes in one call from columnar inputs.
+
+    Body: {"type_names": [...], "ages": [...],
+           "plan_types": [...], "has_preexisting_conditions": [...]}
+    plan_types and has_preexisting_conditions are optional. Any type name not
+    in the catalog rejects the whole batch with a 400 listing them.
+    """
+    try:
+        body = await request.json()
+        type_names = body.get("type_names", [])
+        ages = body.get("ages", [])
+        count = len(type_names)
+        plan_types = body.get("plan_types") or [DEFAULT_PLAN_TYPE] * count
+        flags = body.get("has_preexisting_conditions") or [False] * count
+
+        if not (len(ages) == len(plan_types) == len(flags) == count):
+            return JSONResponse({"error": "All columns must have the same length"}, status_code=400)
+        if count > MAX_BATCH_QUOTES:
+            return JSONResponse({"error": f"Batch too large (max {MAX_BATCH_QUOTES})"}, status_code=400)
+
+        # Each distinct type is looked up once
+        tractor_types = {name: await get_tractor_type_by_name(name) for name in set(type_names)}
+        unknown = sorted(name for name, tractor_type in tractor_types.items() if not tractor_type)
+        if unknown:
+            return JSONResponse({"error": "Unknown tractor types", "unknown_types": unknown}, status_code=400)
+
+        quotes = columns_to_json(quote_batch(
+            [type_multiplier(tractor_types[name]) for name in type_names],
+            ages,
+            plan_types,
+            flags,
+        ))
+        quotes["type_name"] = [tractor_types[name]["name"] for name in type_names]
+        return {"count": count, "quotes": quotes}
+
+    except Exception as e:
+        log.error("Error in quotes/batch: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/quotes/compare")
+async def compare_quotes(request: Request):
+    """Price every plan for one tractor.
+
+    Body: {"type_name": "...", "age_years": 5, "has_preexisting_conditions": false}
+    """
+    try:
+        body = await request.json()
+        type_name = body.get("type_name")
+        age_years = body.get("age_years")
+        if not type_name or age_years is None:
+            return JSONResponse({"error": "type_name and age_years are required"}, status_code=400)
+
+        tractor_type = await get_tractor_type_by_name(type_name)
+        if not tractor_type:
+            return JSONResponse({"error": f"Unknown tractor type: {type_name}"}, status_code=404)
+
+        return {
+            "tractor_type": tractor_type["name"],
+            "age_years": age_years,
+            "plans": compare_plans(tractor_type, int(age_years), bool(body.get("has_preexisting_conditions"))),
+        }
+
+    except Exception as e:
+        log.error("Error in quotes/compare: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
 
 
 # =============================================================================
 # COPILOTKIT ENDPOINT (AG-UI PROTOCOL)
 # =============================================================================
 
+def extract_thread_id(request: Request, body: dict) -> Optional[str]:
+    """Extract the AG-UI / CopilotKit thread id used as a stable session key."""
+    forwarded = body.get("forwardedProps") or {}
+    return (
+        body.get("threadId")
+        or body.get("thread_id")
+        or forwarded.get("threadId")
+        or request.headers.get("x-copilotkit-thread-id")
+    )
+
+
+def ag_ui_event(event: dict) -> str:
+    """Encode one AG-UI event as an SSE frame."""
+    return f"data: {dumps(event)}\n\n"
+
+
 @app.post("/copilotkit")
 async def copilotkit_endpoint(request: Request):
-    """CopilotKit AG-UI protocol endpoint."""
+    """CopilotKit AG-UI protocol endpoint.
+
+    Streams AG-UI events (RUN_STARTED, TEXT_MESSAGE_*, RUN_FINISHED) when the
+    client accepts text/event-stream; otherwise returns a single JSON message.
+    """
+    request_start = time.perf_counter()
+    trace = start_trace()
+    begin_request(CHAT)
+    ticket = None
+    streaming = False
     try:
         body = await request.json()
         messages = body.get("messages", [])
@@ -614,24 +1088,91 @@ async def copilotkit_endpoint(request: Request):
         if not user_message:
             user_message = "Hello!"
 
-        session_id = str(uuid.uuid4())
-        deps = TrackerDeps(session_id=session_id)
-        result = await tracker_agent.run(user_message, deps=deps)
+        # Map the AG-UI thread onto a persistent session; one-off requests
+        # without a thread id get a throwaway id and no stored context
+        thread_id = extract_thread_id(request, body)
+        run_id = body.get("runId") or str(uuid.uuid4())
+        # forwardedProps.user_id is client-supplied; only a verified identity is used
+        user_id = authenticated_user(request)
+        user_memory.prefetch(user_id)
+
+        ctx = None
+        if thread_id:
+            session_id = f"copilotkit:{thread_id}"
+            ctx = await session_store.load(session_id)
+        else:
+            session_id = str(uuid.uuid4())
+
+        message_history = history_for_run(ctx) if ctx else []
+        if not message_history:
+            message_history = history_from_client_messages(messages)
+
+        deps = TrackerDeps(session_id=session_id, user_id=user_id, memory_context=await user_memory.get_context(user_id))
+
+        reply = await _local_reply(user_message, deps, ctx, user_message)
+        if reply is None:
+            ticket = await llm_admission.admit()
+
+        if "text/event-stream" in request.headers.get("accept", ""):
+            async def event_stream() -> AsyncGenerator[str, None]:
+                yield ag_ui_event({"type": "RUN_STARTED", "threadId": thread_id or session_id, "runId": run_id})
+                message_id = str(uuid.uuid4())
+                started = False
+                try:
+                    if reply is not None:
+                        deltas = single_delta(reply)
+                    else:
+                        deltas = stream_agent_deltas(user_message, deps, ctx, message_history, user_message=user_message)
+                    async for delta in deltas:
+                        if not started:
+                            yield ag_ui_event({"type": "TEXT_MESSAGE_START", "messageId": message_id, "role": "assistant"})
+                            started = True
+                        yield ag_ui_event({"type": "TEXT_MESSAGE_CONTENT", "messageId": message_id, "delta": delta})
+                    if started:
+                        yield ag_ui_event({"type": "TEXT_MESSAGE_END", "messageId": message_id})
+                    yield ag_ui_event({"type": "RUN_FINISHED", "threadId": thread_id or session_id, "runId": run_id})
+                except Exception as e:
+                    log.exception("Error while streaming copilotkit run: %s", e)
+                    yield ag_ui_event({"type": "RUN_ERROR", "message": str(e)})
+                total_ms = (time.perf_counter() - request_start) * 1000
+                log.info("CopilotKit run: total=%.0fms spans: %s", total_ms, trace.summary())
+                record("request", "copilotkit", total_ms / 1000)
+
+            streaming = True
+            return HeldStreamingResponse(
+                event_stream(),
+                ticket=ticket,
+                media_type="text/event-stream",
+                headers={
+                    "Cache-Control": "no-cache",
+                    "Connection": "keep-alive",
+                }
+            )
 
-        response_text = result.output if hasattr(result, 'output') else str(result.data)
+        if reply is not None:
+            response_text = reply
+        else:
+            response_text = await run_agent_turn(user_message, deps, ctx, message_history, user_message=user_message)
+        total_ms = (time.perf_counter() - request_start) * 1000
+        log.info("CopilotKit run: total=%.0fms spans: %s", total_ms, trace.summary())
+        record("request", "copilotkit", total_ms / 1000)
 
         return {
+            "threadId": thread_id,
             "messages": [{
                 "role": "assistant",
                 "content": response_text
             }]
         }
 
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
-        print(f"[TRACKER] Error in copilotkit: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        log.exception("Error in copilotkit: %s", e)
         return {"error": str(e)}, 500
+    finally:
+        if ticket and not streaming:
+            ticket.release()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""
+Caller identity for Tractor Insurance Agent (Tracker)
+
+The user ids that arrive with a turn (forwardedProps.user_id, the "user_id:"
+line of the Hume system prompt, the name|userId custom session id) are set by
+the client, so they are never used to read or write a user's data. Account
+lookups, long-term memory, saved tractors and the user on a recorded quote
+only come from an identity signed by the web app with the shared
+AGENT_AUTH_SECRET:
+
+    <user_id>.<expires unix seconds>.<hex HMAC-SHA256 of "<user_id>.<expires>">
+
+The token is read from:
+- the Authorization: Bearer header (CopilotKit runtime, server-to-server)
+- the third field of the custom session id, name|userId|token (Hume EVI,
+  which only forwards session settings to the agent). split_session_id()
+  strips it before the id is used anywhere, so the session key, stored
+  quotes, Zep thread ids and logs only ever see the stable name|userId.
+
+Web app side (not in this repo yet): a server route that knows the signed-in
+user mints the token with the same secret, e.g. in Node
+
+    const payload = `${userId}.${Math.floor(Date.now() / 1000) + 86400}`
+    const sig = createHmac("sha256", process.env.AGENT_AUTH_SECRET).update(payload).digest("hex")
+    const token = `${payload}.${sig}`
+
+and the client appends it to customSessionId / the CopilotKit runtime sends
+it as a bearer header.
+
+AUTH_ENABLED is false without AGENT_AUTH_SECRET: every caller is anonymous,
+so get_my_account, Zep memory and saved tractors are off (quotes are still
+recorded, with no user). /health reports this under "auth".
+
+Env: AGENT_AUTH_SECRET, AGENT_AUTH_TOKEN_TTL_SECONDS (default 86400, used by
+sign_identity).
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.requests import Request
+
+from .logs import get_logger, sampled
+
+log = get_logger("auth")
+
+AGENT_AUTH_SECRET = os.environ.get("AGENT_AUTH_SECRET", "")
+AGENT_AUTH_TOKEN_TTL_SECONDS = int(os.environ.get("AGENT_AUTH_TOKEN_TTL_SECONDS", "86400"))
+AUTH_ENABLED = bool(AGENT_AUTH_SECRET)
+
+if not AUTH_ENABLED:
+    log.warning("AGENT_AUTH_SECRET not set: every caller is anonymous, "
+                "account lookups, user memory and saved tractors are disabled")
+
+_counts = {"verified": 0, "anonymous": 0, "rejected": 0}
+
+
+def _signature(payload: str, secret: str) -> str:
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def sign_identity(user_id: str, ttl_seconds: int = AGENT_AUTH_TOKEN_TTL_SECONDS, secret: Optional[str] = None) -> str:
+    """Identity token for user_id (what the web app sends with each turn)."""
+    payload = f"{user_id}.{int(time.time()) + ttl_seconds}"
+    return f"{payload}.{_signature(payload, secret or AGENT_AUTH_SECRET)}"
+
+
+def verify_identity(token: Optional[str], secret: Optional[str] = None) -> Optional[str]:
+    """The user id a token was signed for, or None if it is missing, expired or forged."""
+    secret = secret or AGENT_AUTH_SECRET
+    if not secret or not token:
+        return None
+    try:
+        user_id, expires, signature = token.rsplit(".", 2)
+        if not user_id or int(expires) < time.time():
+            return None
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _signature(f"{user_id}.{expires}", secret)):
+        sampled(log, logging.WARNING, "auth.bad_signature", "Rejected identity token with a bad signature")
+        return None
+    return user_id
+
+
+def split_session_id(raw: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(stable session id, identity token) from a name|userId[|token] custom session id."""
+    if not raw or raw.count("|") < 2:
+        return raw, None
+    name, user_id, token = raw.split("|", 2)
+    return f"{name}|{user_id}", token or None
+
+
+def authenticated_user(request: Request, session_token: Optional[str] = None) -> Optional[str]:
+    """The verified user id for this request, or None for an anonymous caller.
+
+    session_token is the token split off the custom session id, if any.
+    """
+    authorization = request.headers.get("authorization", "")
+    token = authorization[7:].strip() if authorization[:7].lower() == "bearer " else session_token
+    user_id = verify_identity(token)
+    if user_id:
+        _counts["verified"] += 1
+    else:
+        _counts["rejected" if token else "anonymous"] += 1
+    return user_id
+
+
+def auth_stats() -> Dict[str, Any]:
+    return {"enabled": AUTH_ENABLED, **_counts}
@@ -0,0 +1,194 @@
+"""
+In-process tractor type catalog for Tractor Insurance Agent (Tracker)
+
+The dog_breeds table is tiny and changes rarely, so it is loaded once per
+process and indexed in memory:
+- normalized-name hash index for exact matches
+- prefix index for partial names ("farm" -> Farm Tractor)
+- trigram index for fuzzy matches on misspelt or misheard names
+
+The catalog refreshes itself after a TTL (stale-while-revalidate) and can be
+invalidated explicitly, e.g. from a Postgres LISTEN/NOTIFY callback. After a
+failed load it waits TRACTOR_CATALOG_RETRY_SECONDS before trying again, so an
+unavailable database is not queried twice per lookup (load + fallback query).
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .logs import get_logger
+
+log = get_logger("catalog")
+
+CATALOG_TTL_SECONDS = float(os.environ.get("TRACTOR_CATALOG_TTL_SECONDS", "300"))
+CATALOG_RETRY_SECONDS = float(os.environ.get("TRACTOR_CATALOG_RETRY_SECONDS", "10"))
+FUZZY_MIN_SIMILARITY = 0.3
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a type name for indexing: lowercase, punctuation folded to spaces."""
+    return _NON_ALNUM.sub(" ", (name or "").lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm-style trigrams: each word padded with two leading and one trailing space."""
+    grams: Set[str] = set()
+    for word in normalize_name(text).split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TractorTypeCatalog:
+    """Process-wide, indexed snapshot of the tractor types table."""
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        ttl_seconds: float = CATALOG_TTL_SECONDS,
+        retry_seconds: float = CATALOG_RETRY_SECONDS,
+    ):
+        self._loader = loader
+        self._ttl_seconds = ttl_seconds
+        self._retry_seconds = retry_seconds
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loaded_at = 0.0
+        # No load is attempted before this (monotonic time) after a failure
+        self._retry_at = 0.0
+        # Bumped on every load so derived structures know when to rebuild
+        self.version = 0
+
+        self._types: List[Dict[str, Any]] = []
+        self._names: List[str] = []
+        self._by_name: Dict[str, int] = {}
+        self._by_prefix: Dict[str, List[int]] = {}
+        self._by_trigram: Dict[str, List[int]] = {}
+        self._trigram_counts: List[int] = []
+
+    @property
+    def is_loaded(self) -> bool:
+        return bool(self._types)
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > self._ttl_seconds
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    async def ensure_loaded(self) -> bool:
+        """Load the catalog on first use; refresh in the background once stale.
+
+        False while the catalog has never loaded and the last attempt failed
+        less than retry_seconds ago.
+        """
+        if time.monotonic() < self._retry_at:
+            return self.is_loaded
+        if not self.is_loaded:
+            async with self._lock:
+                if not self.is_loaded and time.monotonic() >= self._retry_at:
+                    await self.refresh()
+        elif self.is_stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self.refresh())
+        return self.is_loaded
+
+    async def refresh(self) -> None:
+        """Reload all types from the loader and swap in a fresh index."""
+        try:
+            rows = await self._loader()
+        except Exception as e:
+            log.warning("Error loading tractor types: %s", e)
+            rows = None
+        if not rows:
+            # Keep serving the previous snapshot (if any) and back off
+            self._retry_at = time.monotonic() + self._retry_seconds
+            log.warning("Tractor type load failed, keeping current snapshot; retrying in %.0fs", self._retry_seconds)
+            return
+        self._retry_at = 0.0
+        self.load(rows)
+
+    def load(self, rows: List[Dict[str, Any]]) -> None:
+        """Build the indexes from rows and atomically replace the current snapshot."""
+        types = sorted((dict(row) for row in rows), key=lambda t: t["name"])
+        names = [normalize_name(t["name"]) for t in types]
+
+        by_name: Dict[str, int] = {}
+        by_prefix: Dict[str, List[int]] = {}
+        by_trigram: Dict[str, List[int]] = {}
+        trigram_counts: List[int] = []
+
+        for idx, name in enumerate(names):
+            by_name.setdefault(name, idx)
+            for i in range(1, len(name) + 1):
+                by_prefix.setdefault(name[:i], []).append(idx)
+            grams = trigrams(name)
+            trigram_counts.append(len(grams))
+            for gram in grams:
+                by_trigram.setdefault(gram, []).append(idx)
+
+        self._types, self._names = types, names
+        self._by_name, self._by_prefix = by_name, by_prefix
+        self._by_trigram, self._trigram_counts = by_trigram, trigram_counts
+        self._loaded_at = time.monotonic()
+        self.version += 1
+        log.info("Indexed %d tractor types", len(types))
+
+    def invalidate(self) -> None:
+        """Mark the snapshot stale so the next lookup triggers a background refresh."""
+        self._loaded_at = 0.0
+
+    def all(self) -> List[Dict[str, Any]]:
+        """All tractor types ordered by name."""
+        return [dict(t) for t in self._types]
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Exact match, then prefix match, then substring match (as LIKE '%name%')."""
+        key = normalize_name(name)
+        if not key:
+            return None
+
+        idx = self._by_name.get(key)
+        if idx is None:
+            prefixed = self._by_prefix.get(key)
+            if prefixed:
+                idx = prefixed[0]
+        if idx is None:
+            idx = next((i for i, n in enumerate(self._names) if key in n), None)
+
+        return dict(self._types[idx]) if idx is not None else None
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Substring matches ordered by name, falling back to trigram similarity."""
+        key = normalize_name(query)
+        if not key:
+            return []
+
+        matches = [i for i, n in enumerate(self._names) if key in n][:limit]
+        if not matches:
+            matches = [i for i, _ in self._rank_trigrams(key, limit, FUZZY_MIN_SIMILARITY)]
+        return [dict(self._types[i]) for i in matches]
+
+    def _rank_trigrams(self, query: str, limit: int, min_similarity: float) -> List[Tuple[int, float]]:
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for idx in self._by_trigram.get(gram, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+
+        scored = []
+        for idx, common in shared.items():
+            similarity = common / (len(grams) + self._trigram_counts[idx] - common)
+            if similarity >= min_similarity:
+                scored.append((idx, similarity))
+        scored.sort(key=lambda item: (-item[1], self._names[item[0]]))
+        return scored[:limit]
@@ -2,46 +2,233 @@
 Database queries for Tractor Insurance Agent (Tracker)
 """
 
+import asyncio
+import functools
+import logging
 import os
-import sys
+import time
 import asyncpg
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Optional, List, Dict, Any
+from typing import AsyncGenerator, Callable, Hashable, Optional, List, Dict, Any, Tuple
+
+from . import queries
+from .admission import db_admission
+from .catalog import TractorTypeCatalog, normalize_name
+from .logs import get_logger, sampled
+from .resolver import Resolution, TypeResolver
+from .tracing import span
+
+log = get_logger("db")
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "")
+# Optional LISTEN/NOTIFY channel used to invalidate the in-process type catalog
+CATALOG_NOTIFY_CHANNEL = os.environ.get("TRACTOR_CATALOG_NOTIFY_CHANNEL", "")
+# Optional LISTEN/NOTIFY channel carrying user ids whose cached reads are stale
+USER_CACHE_NOTIFY_CHANNEL = os.environ.get("USER_CACHE_NOTIFY_CHANNEL", "")
+
+
+# Pool tuning (Neon: keep max_size within the compute's connection limit)
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+DB_COMMAND_TIMEOUT = float(os.environ.get("DB_COMMAND_TIMEOUT", "30"))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_MAX_CACHED_STATEMENT_LIFETIME = float(os.environ.get("DB_MAX_CACHED_STATEMENT_LIFETIME", "300"))
+DB_MAX_INACTIVE_CONNECTION_LIFETIME = float(os.environ.get("DB_MAX_INACTIVE_CONNECTION_LIFETIME", "300"))
+DB_CONNECT_TIMEOUT = float(os.environ.get("DB_CONNECT_TIMEOUT", "10"))
+DB_WARMUP = os.environ.get("DB_WARMUP", "true").lower() == "true"
+# Concurrent identical reads share one query (see coalesce)
+DB_COALESCE = os.environ.get("DB_COALESCE", "true").lower() == "true"
+
+# Per-user read cache for profile/tractors/dashboard (TTL 0 disables)
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_USERS = int(os.environ.get("USER_CACHE_MAX_USERS", "1000"))
 
 
 class Database:
     """Async database connection manager for Neon PostgreSQL."""
 
     _pool: Optional[asyncpg.Pool] = None
+    _pool_lock: Optional[asyncio.Lock] = None
+    _waiting = 0
+    _max_waiting = 0
+    _acquired = 0
 
     @classmethod
     async def get_pool(cls) -> asyncpg.Pool:
         """Get or create connection pool."""
         if cls._pool is None:
-            cls._pool = await asyncpg.create_pool(
-                DATABASE_URL,
-                min_size=1,
-                max_size=5,
-                command_timeout=30,
-            )
+            if cls._pool_lock is None:
+                cls._pool_lock = asyncio.Lock()
+            # Concurrent first requests must not each open a pool
+            async with cls._pool_lock:
+                if cls._pool is None:
+                    options = {
+                        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+                        # Registry hook (prepares hot statements per connection) or PgBouncer-safe settings
+                        **queries.pool_options(),
+                    }
+                    cls._pool = await asyncpg.create_pool(
+                        DATABASE_URL,
+                        min_size=DB_POOL_MIN_SIZE,
+                        max_size=DB_POOL_MAX_SIZE,
+                        command_timeout=DB_COMMAND_TIMEOUT,
+                        max_cached_statement_lifetime=DB_MAX_CACHED_STATEMENT_LIFETIME,
+                        max_inactive_connection_lifetime=DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+                        timeout=DB_CONNECT_TIMEOUT,
+                        **options,
+                    )
+                    mode = "pgbouncer-safe" if queries.DB_PGBOUNCER_SAFE else "prepared"
+                    log.info("Pool created (min=%d, max=%d, %s)", DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, mode)
         return cls._pool
 
+    @classmethod
+    async def warm(cls) -> None:
+        """Create the pool and run a round-trip on min_size connections at once.
+
+        create_pool already opens min_size connections; the SELECT makes sure
+        TLS, auth and a woken Neon compute are paid for before traffic arrives.
+        """
+        pool = await cls.get_pool()
+        started = time.perf_counter()
+
+        async def ping() -> None:
+            async with pool.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+
+        await asyncio.gather(*(ping() for _ in range(DB_POOL_MIN_SIZE)))
+        log.info("Pool warmed in %.0fms", (time.perf_counter() - started) * 1000)
+
     @classmethod
     async def close(cls) -> None:
         """Close the connection pool."""
+        await stop_listeners()
         if cls._pool:
             await cls._pool.close()
             cls._pool = None
 
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Pool saturation for the health probe."""
+        if cls._pool is None:
+            return {"open": False, "min_size": DB_POOL_MIN_SIZE, "max_size": DB_POOL_MAX_SIZE}
+        size = cls._pool.get_size()
+        in_use = size - cls._pool.get_idle_size()
+        return {
+            "open": True,
+            "size": size,
+            "in_use": in_use,
+            "min_size": cls._pool.get_min_size(),
+            "max_size": cls._pool.get_max_size(),
+            "saturation": round(in_use / cls._pool.get_max_size(), 4),
+            "waiting": cls._waiting,
+            "max_waiting": cls._max_waiting,
+            "acquired": cls._acquired,
+        }
+
 
 @asynccontextmanager
 async def get_connection() -> AsyncGenerator[asyncpg.Connection, None]:
-    """Get a database connection from the pool."""
+    """Get a database connection from the pool.
+
+    Admission control (db_admission) runs first, so a burst queues by
+    request priority and is rejected with Overloaded rather than waiting
+    past the request's deadline.
+    """
     pool = await Database.get_pool()
-    async with pool.acquire() as conn:
+    Database._waiting += 1
+    Database._max_waiting = max(Database._max_waiting, Database._waiting)
+    try:
+        with span("db_acquire", "pool"):
+            ticket = await db_admission.admit()
+            try:
+                conn = await pool.acquire()
+            except BaseException:
+                ticket.release()
+                raise
+    finally:
+        Database._waiting -= 1
+    Database._acquired += 1
+    try:
         yield conn
+    finally:
+        try:
+            await pool.release(conn)
+        finally:
+            ticket.release()
+
+
+# =============================================================================
+# REQUEST COALESCING
+# =============================================================================
+# Under a burst many sessions run the same read at the same moment (the
+# catalog load, "Farm Tractor", one user's dashboard from two tabs). Each
+# read decorated with @coalesce runs once per key at a time: callers that
+# arrive while it is in flight await the same future instead of taking
+# another pool connection. Nothing is kept once it completes - caching is
+# the catalog's and user_cache's job.
+#
+# The shared call runs as its own task, so one caller being cancelled does
+# not cancel it for the others; its spans are recorded on the request that
+# started it.
+
+_inflight: Dict[Tuple[str, Hashable], "asyncio.Future[Any]"] = {}
+_coalesce_counts: Dict[str, Dict[str, int]] = {}
+
+
+def _args_key(*args: Any, **kwargs: Any) -> Hashable:
+    return args, tuple(sorted(kwargs.items()))
+
+
+def coalesce(key: Optional[Callable[..., Hashable]] = None) -> Callable:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    key maps the call's arguments to what makes two calls identical (default:
+    the arguments themselves, which must be hashable).
+    """
+    make_key = key or _args_key
+
+    def decorate(function: Callable[..., Any]) -> Callable[..., Any]:
+        name = function.__name__
+        counts = _coalesce_counts.setdefault(name, {"executed": 0, "coalesced": 0})
+
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not DB_COALESCE:
+                return await function(*args, **kwargs)
+            call_key = (name, make_key(*args, **kwargs))
+            future = _inflight.get(call_key)
+            if future is not None:
+                counts["coalesced"] += 1
+                return await asyncio.shield(future)
+
+            future = asyncio.ensure_future(function(*args, **kwargs))
+            _inflight[call_key] = future
+            counts["executed"] += 1
+
+            def done(finished: "asyncio.Future[Any]") -> None:
+                if _inflight.get(call_key) is finished:
+                    del _inflight[call_key]
+                if not finished.cancelled():
+                    finished.exception()  # retrieved even if every caller was cancelled
+
+            future.add_done_callback(done)
+            return await asyncio.shield(future)
+        return wrapper
+    return decorate
+
+
+def coalesce_stats() -> Dict[str, Any]:
+    """Executed vs coalesced calls per coalesced read."""
+    executed = sum(c["executed"] for c in _coalesce_counts.values())
+    coalesced = sum(c["coalesced"] for c in _coalesce_counts.values())
+    return {
+        "enabled": DB_COALESCE,
+        "executed": executed,
+        "coalesced": coalesced,
+        "in_flight": len(_inflight),
+        "by_call": {name: dict(c) for name, c in _coalesce_counts.items() if c["executed"]},
+    }
 
 
 # =============================================================================
@@ -55,76 +242,157 @@ async def get_connection() -> AsyncGenerator[asyncpg.Connection, None]:
 #   tractor_details -> DB column: dog_details
 # =============================================================================
 
+@coalesce()
 async def get_all_tractor_types() -> List[Dict[str, Any]]:
     """Get all tractor types from database."""
     try:
         async with get_connection() as conn:
-            rows = await conn.fetch("""
-                SELECT id, name, size, risk_category, avg_lifespan_years,
-                       common_health_issues, base_premium_multiplier
-                FROM dog_breeds
-                ORDER BY name
-            """)
-            print(f"[TRACKER DB] Retrieved {len(rows)} tractor types", file=sys.stderr)
+            rows = await queries.fetch(conn, "tractor_types.all")
+            log.info("Retrieved %d tractor types", len(rows))
             return [dict(row) for row in rows]
     except Exception as e:
-        print(f"[TRACKER DB] Error fetching tractor types: {e}", file=sys.stderr)
+        log.error("Error fetching tractor types: %s", e)
         return []
 
 
+# Process-wide snapshot of dog_breeds, loaded once and refreshed after a TTL
+tractor_catalog = TractorTypeCatalog(get_all_tractor_types)
+_listener_conn: Optional[asyncpg.Connection] = None
+_catalog_listening = False
+_catalog_listener_attempted = False
+
+
+async def _listen(channel: str, callback: Any) -> None:
+    """Add a NOTIFY callback on the shared listener connection."""
+    global _listener_conn
+    if _listener_conn is None:
+        # LISTEN needs a session-level connection outside the pool
+        _listener_conn = await asyncpg.connect(DATABASE_URL)
+    await _listener_conn.add_listener(channel, callback)
+
+
+async def start_catalog_listener() -> None:
+    """Invalidate the type catalog on NOTIFY from the dog_breeds trigger.
+
+    Expects a statement-level trigger on dog_breeds, e.g.:
+        CREATE FUNCTION notify_tractor_types_changed() RETURNS trigger AS $$
+        BEGIN PERFORM pg_notify('tractor_types_changed', ''); RETURN NULL; END
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER dog_breeds_changed AFTER INSERT OR UPDATE OR DELETE
+        ON dog_breeds FOR EACH STATEMENT EXECUTE FUNCTION notify_tractor_types_changed();
+    """
+    global _catalog_listening, _catalog_listener_attempted
+    _catalog_listener_attempted = True
+    if not CATALOG_NOTIFY_CHANNEL or _catalog_listening:
+        return
+    try:
+        await _listen(CATALOG_NOTIFY_CHANNEL, lambda *_: tractor_catalog.invalidate())
+        _catalog_listening = True
+        log.info("Listening for catalog changes on '%s'", CATALOG_NOTIFY_CHANNEL)
+    except Exception as e:
+        log.warning("Catalog listener unavailable, relying on TTL refresh: %s", e)
+
+
+async def stop_listeners() -> None:
+    """Close the LISTEN connection if one is open."""
+    global _listener_conn, _catalog_listening, _user_cache_listening
+    if _listener_conn is not None:
+        await _listener_conn.close()
+        _listener_conn = None
+    _catalog_listening = _user_cache_listening = False
+
+
+async def _catalog_ready() -> bool:
+    """Ensure the type catalog is loaded (and the listener started once)."""
+    ready = await tractor_catalog.ensure_loaded()
+    if ready and CATALOG_NOTIFY_CHANNEL and not _catalog_listener_attempted:
+        await start_catalog_listener()
+    return ready
+
+
+_type_resolver: Optional[TypeResolver] = None
+_type_resolver_version = -1
+
+
+def get_type_resolver() -> TypeResolver:
+    """Phonetic/alias resolver precomputed over the current catalog snapshot."""
+    global _type_resolver, _type_resolver_version
+    if _type_resolver is None or _type_resolver_version != tractor_catalog.version:
+        _type_resolver = TypeResolver(t["name"] for t in tractor_catalog.all())
+        _type_resolver_version = tractor_catalog.version
+    return _type_resolver
+
+
+async def load_type_resolver() -> TypeResolver:
+    """The resolver for the current catalog, loading the catalog first if needed."""
+    await _catalog_ready()
+    return get_type_resolver()
+
+
+async def resolve_tractor_mention(text: str) -> Optional[Resolution]:
+    """Resolve a heard type/brand mention ("cabota compact") to a catalog type and brand."""
+    return (await load_type_resolver()).resolve(text)
+
+
 async def get_tractor_type_by_name(name: str) -> Optional[Dict[str, Any]]:
     """Get tractor type by name (fuzzy match)."""
+    if await _catalog_ready():
+        tractor_type = tractor_catalog.get(name)
+        if tractor_type is None:
+            resolution = get_type_resolver().resolve(name)
+            if resolution and resolution.type_name:
+                tractor_type = tractor_catalog.get(resolution.type_name)
+        return tractor_type
+
+    # Catalog could not be loaded - query the database directly
+    return await _tractor_type_from_db(name)
+
+
+@coalesce(key=normalize_name)
+async def _tractor_type_from_db(name: str) -> Optional[Dict[str, Any]]:
     try:
         async with get_connection() as conn:
             # Try exact match first
-            row = await conn.fetchrow("""
-                SELECT id, name, size, risk_category, avg_lifespan_years,
-                       common_health_issues, base_premium_multiplier
-                FROM dog_breeds
-                WHERE LOWER(name) = LOWER($1)
-            """, name)
+            row = await queries.fetchrow(conn, "tractor_types.by_name", name)
 
             if row:
-                print(f"[TRACKER DB] Found exact tractor type match: {row['name']}", file=sys.stderr)
+                log.debug("Found exact tractor type match: %s", row["name"])
                 return dict(row)
 
             # Try fuzzy match
-            row = await conn.fetchrow("""
-                SELECT id, name, size, risk_category, avg_lifespan_years,
-                       common_health_issues, base_premium_multiplier
-                FROM dog_breeds
-                WHERE LOWER(name) LIKE LOWER($1)
-                ORDER BY
-                    CASE WHEN LOWER(name) = LOWER($2) THEN 0 ELSE 1 END
-                LIMIT 1
-            """, f"%{name}%", name)
+            row = await queries.fetchrow(conn, "tractor_types.best_like", f"%{name}%", name)
 
             if row:
-                print(f"[TRACKER DB] Found fuzzy tractor type match: {row['name']}", file=sys.stderr)
+                log.debug("Found fuzzy tractor type match: %s", row["name"])
                 return dict(row)
 
-            print(f"[TRACKER DB] No tractor type found for: {name}", file=sys.stderr)
+            log.debug("No tractor type found for: %s", name)
             return None
     except Exception as e:
-        print(f"[TRACKER DB] Error fetching tractor type by name: {e}", file=sys.stderr)
+        log.error("Error fetching tractor type by name: %s", e)
         return None
 
 
 async def search_tractor_types(query: str) -> List[Dict[str, Any]]:
     """Search tractor types by name."""
+    if await _catalog_ready():
+        matches = tractor_catalog.search(query, limit=5)
+        resolution = get_type_resolver().resolve(query)
+        if resolution and resolution.type_name:
+            resolved = tractor_catalog.get(resolution.type_name)
+            matches = [resolved] + [t for t in matches if t["name"] != resolved["name"]][:4]
+        return matches
+    return await _search_tractor_types_db(query)
+
+
+@coalesce(key=normalize_name)
+async def _search_tractor_types_db(query: str) -> List[Dict[str, Any]]:
     try:
         async with get_connection() as conn:
-            rows = await conn.fetch("""
-                SELECT id, name, size, risk_category, avg_lifespan_years,
-                       common_health_issues, base_premium_multiplier
-                FROM dog_breeds
-                WHERE LOWER(name) LIKE LOWER($1)
-                ORDER BY name
-                LIMIT 5
-            """, f"%{query}%")
+            rows = await queries.fetch(conn, "tractor_types.search", f"%{query}%")
             return [dict(row) for row in rows]
     except Exception as e:
-        print(f"[TRACKER DB] Error searching tractor types: {e}", file=sys.stderr)
+        log.error("Error searching tractor types: %s", e)
         return []
 
 
@@ -198,6 +466,13 @@ INSURANCE_PLANS = [
 ]
 
 
+DEFAULT_PLAN_TYPE = "standard"
+# Plans that carry the known-issues (pre-existing conditions) surcharge
+SURCHARGE_PLAN_TYPES = ("premium", "comprehensive")
+
+_PLANS_BY_TYPE: Dict[str, Dict[str, Any]] = {plan["type"]: plan for plan in INSURANCE_PLANS}
+
+
 def get_insurance_plans() -> List[Dict[str, Any]]:
     """Get all insurance plans."""
     return INSURANCE_PLANS
@@ -205,10 +480,7 @@ def get_insurance_plans() -> List[Dict[str, Any]]:
 
 def get_plan_by_type(plan_type: str) -> Optional[Dict[str, Any]]:
     """Get a specific insurance plan by type."""
-    for plan in INSURANCE_PLANS:
-        if plan["type"] == plan_type:
-            return plan
-    return None
+    return _PLANS_BY_TYPE.get(plan_type)
 
 
 def calculate_quote(
@@ -220,7 +492,7 @@ def calculate_quote(
     """Calculate insurance quote based on tractor type, age, and plan."""
     plan = get_plan_by_type(plan_type)
     if not plan:
-        plan = INSURANCE_PLANS[1]  # Default to standard
+        plan = _PLANS_BY_TYPE[DEFAULT_PLAN_TYPE]
 
     premium = plan["base_monthly_premium"]
 
@@ -239,7 +511,7 @@ def calculate_quote(
         premium *= 1.15  # Mid-life - moderate increase
 
     # Pre-existing conditions (known mechanical issues) surcharge
-    if has_preexisting_conditions and plan_type in ["premium", "comprehensive"]:
+    if has_preexisting_conditions and plan_type in SURCHARGE_PLAN_TYPES:
         premium *= 1.3
 
     monthly_premium = round(premium, 2)
@@ -257,41 +529,255 @@ def calculate_quote(
     }
 
 
+# =============================================================================
+# RATING TABLES (compiled pricing, see rating.py)
+# =============================================================================
+
+@coalesce()
+async def get_rating_table_payload(version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get a stored rating table by version (latest if not given)."""
+    try:
+        import json
+
+        async with get_connection() as conn:
+            row = await queries.fetchrow(conn, "rating_tables.get", version)
+            return json.loads(row["payload"]) if row else None
+    except Exception as e:
+        log.error("Error fetching rating table: %s", e)
+        return None
+
+
+async def save_rating_table_payload(version: str, payload: Dict[str, Any]) -> bool:
+    """Store a compiled rating table (rating_tables is created by scripts/setup-puppy-db.js)."""
+    try:
+        import json
+
+        async with get_connection() as conn:
+            await queries.execute(conn, "rating_tables.upsert", version, json.dumps(payload))
+            log.info("Saved rating table %s", version)
+            return True
+    except Exception as e:
+        log.error("Error saving rating table: %s", e)
+        return False
+
+
+# =============================================================================
+# AGENT SESSIONS (shared session backend, see sessions.py)
+# =============================================================================
+
+# The agent_sessions table is created by scripts/setup-puppy-db.js
+
+
+async def get_session_states(session_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get serialized session state for the given session ids."""
+    import json
+
+    async with get_connection() as conn:
+        rows = await queries.fetch(conn, "sessions.get_many", session_ids)
+        return {row["session_id"]: json.loads(row["data"]) for row in rows}
+
+
+async def save_session_states(states: List[tuple]) -> None:
+    """Upsert (session_id, state dict) pairs in one batch."""
+    import json
+
+    async with get_connection() as conn:
+        await queries.executemany(
+            conn, "sessions.upsert", [(session_id, json.dumps(data)) for session_id, data in states]
+        )
+
+
+async def delete_expired_session_states(ttl_seconds: float) -> None:
+    """Delete sessions not updated within ttl_seconds."""
+    async with get_connection() as conn:
+        await queries.execute(conn, "sessions.delete_expired", float(ttl_seconds))
+
+
+# =============================================================================
+# USER READ CACHE
+# =============================================================================
+
+_MISSING = object()
+
+
+class UserReadCache:
+    """Per-user LRU + TTL cache of profile/tractor/dashboard reads.
+
+    Entries are grouped by user so a write invalidates every read for that
+    user at once. A load that overlaps an invalidation is not stored, so a
+    read racing a write cannot cache the pre-write result.
+    """
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_users: int = USER_CACHE_MAX_USERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._users: "OrderedDict[str, Dict[str, Tuple[float, Any]]]" = OrderedDict()
+        self._invalidations = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.evicted = 0
+
+    def get(self, user_id: str, kind: str) -> Any:
+        """Cached value, or _MISSING."""
+        entry = self._users.get(user_id, {}).get(kind)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl_seconds:
+            self.misses += 1
+            return _MISSING
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def token(self) -> int:
+        """Taken before a load and handed back to put()."""
+        return self._invalidations
+
+    def put(self, user_id: str, kind: str, value: Any, token: int) -> None:
+        if self.ttl_seconds <= 0 or token != self._invalidations:
+            return
+        self._users.setdefault(user_id, {})[kind] = (time.monotonic(), value)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.evicted += 1
+
+    def invalidate(self, user_id: str) -> None:
+        self._invalidations += 1
+        if self._users.pop(user_id, None) is not None:
+            self.invalidated += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "max_users": self.max_users,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidated": self.invalidated,
+            "evicted": self.evicted,
+            "notify_channel": USER_CACHE_NOTIFY_CHANNEL or None,
+            "listening": _user_cache_listening,
+        }
+
+
+user_cache = UserReadCache()
+_user_cache_listening = False
+
+
+async def start_user_cache_listener() -> None:
+    """Invalidate cached user reads on NOTIFY from other workers or the database.
+
+    Writes made here notify USER_CACHE_NOTIFY_CHANNEL with the user id.
+    Writers outside the agent (e.g. policies created by the web app) can do
+    the same with a row-level trigger:
+        CREATE FUNCTION notify_user_changed() RETURNS trigger AS $$
+        BEGIN PERFORM pg_notify('user_cache_invalidate', NEW.user_id); RETURN NULL; END
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER insurance_policies_changed AFTER INSERT OR UPDATE
+        ON insurance_policies FOR EACH ROW EXECUTE FUNCTION notify_user_changed();
+    """
+    global _user_cache_listening
+    if not USER_CACHE_NOTIFY_CHANNEL or _user_cache_listening:
+        return
+    try:
+        await _listen(
+            USER_CACHE_NOTIFY_CHANNEL,
+            lambda _conn, _pid, _channel, user_id: user_cache.invalidate(user_id),
+        )
+        _user_cache_listening = True
+        log.info("Listening for user changes on '%s'", USER_CACHE_NOTIFY_CHANNEL)
+    except Exception as e:
+        log.warning("User cache listener unavailable, relying on TTL: %s", e)
+
+
+async def _user_changed(conn: asyncpg.Connection, user_ids: Any) -> None:
+    """Invalidate cached reads for users just written, here and in other workers."""
+    user_ids = set(user_ids)
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+    if USER_CACHE_NOTIFY_CHANNEL and user_ids:
+        # The write itself succeeded - a failed NOTIFY only leaves other workers on their TTL
+        try:
+            await queries.executemany(
+                conn, "users.notify_changed", [(USER_CACHE_NOTIFY_CHANNEL, user_id) for user_id in user_ids]
+            )
+        except Exception as e:
+            log.warning("Error notifying user cache invalidation: %s", e)
+
+
 # =============================================================================
 # USER & POLICY QUERIES
 # =============================================================================
 
+# The cache token is part of the key: a read started before a write to any
+# user is not shared with callers that arrive after it
+@coalesce(key=lambda name, method, user_id: (name, user_id, user_cache.token()))
+async def _user_read(name: str, method: str, user_id: str) -> Any:
+    """Run a registered per-user query (fetch or fetchrow)."""
+    async with get_connection() as conn:
+        return await getattr(queries, method)(conn, name, user_id)
+
+
 async def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
-    """Get user profile from database."""
+    """Get user profile from database (read-through user_cache)."""
+    profile = user_cache.get(user_id, "profile")
+    if profile is not _MISSING:
+        return profile
+    token = user_cache.token()
     try:
-        async with get_connection() as conn:
-            row = await conn.fetchrow("""
-                SELECT * FROM user_profiles WHERE user_id = $1
-            """, user_id)
-            return dict(row) if row else None
+        row = await _user_read("users.profile", "fetchrow", user_id)
     except Exception as e:
-        print(f"[TRACKER DB] Error fetching user profile: {e}", file=sys.stderr)
+        log.error("Error fetching user profile: %s", e)
         return None
+    profile = dict(row) if row else None
+    user_cache.put(user_id, "profile", profile, token)
+    return profile
 
 
 async def get_user_tractors(user_id: str) -> List[Dict[str, Any]]:
-    """Get all tractors registered by a user."""
+    """Get all tractors registered by a user (read-through user_cache)."""
+    tractors = user_cache.get(user_id, "tractors")
+    if tractors is not _MISSING:
+        return tractors
+    token = user_cache.token()
     try:
-        async with get_connection() as conn:
-            rows = await conn.fetch("""
-                SELECT d.id, d.user_id, d.name, d.breed_id as type_id,
-                       d.breed_name as type_name, d.age_years,
-                       d.has_preexisting_conditions, d.preexisting_conditions,
-                       b.name as type_name_full, b.size, b.risk_category
-                FROM user_dogs d
-                LEFT JOIN dog_breeds b ON d.breed_id = b.id
-                WHERE d.user_id = $1
-                ORDER BY d.created_at DESC
-            """, user_id)
-            return [dict(row) for row in rows]
+        rows = await _user_read("users.tractors", "fetch", user_id)
     except Exception as e:
-        print(f"[TRACKER DB] Error fetching user tractors: {e}", file=sys.stderr)
+        log.error("Error fetching user tractors: %s", e)
         return []
+    tractors = [dict(row) for row in rows]
+    user_cache.put(user_id, "tractors", tractors, token)
+    return tractors
+
+
+async def get_user_dashboard(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a user's profile, tractors and policies in one round-trip.
+
+    Returns {"profile": dict or None, "tractors": [...], "policies": [...]}
+    with only the columns the agent uses (read-through user_cache). None if
+    the query fails.
+    """
+    import json
+
+    dashboard = user_cache.get(user_id, "dashboard")
+    if dashboard is not _MISSING:
+        return dashboard
+    token = user_cache.token()
+    try:
+        row = await _user_read("users.dashboard", "fetchrow", user_id)
+    except Exception as e:
+        log.error("Error fetching user dashboard: %s", e)
+        return None
+
+    dashboard = {
+        "profile": json.loads(row["profile"]) if row["profile"] else None,
+        "tractors": json.loads(row["tractors"]),
+        "policies": json.loads(row["policies"]),
+    }
+    user_cache.put(user_id, "dashboard", dashboard, token)
+    return dashboard
 
 
 async def save_user_tractor(
@@ -308,41 +794,75 @@ async def save_user_tractor(
         type_id = tractor_type.get("id") if tractor_type else None
 
         async with get_connection() as conn:
-            result = await conn.fetchrow("""
-                INSERT INTO user_dogs (user_id, name, breed_id, breed_name, age_years,
-                                       has_preexisting_conditions, preexisting_conditions)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                RETURNING id
-            """, user_id, tractor_name, type_id, type_name, age_years,
+            result = await queries.fetchrow(conn, "users.insert_tractor_returning",
+                user_id, tractor_name, type_id, type_name, age_years,
                 has_preexisting_conditions, preexisting_conditions or [])
+            await _user_changed(conn, [user_id])
 
-            print(f"[TRACKER DB] Saved tractor {tractor_name} for user {user_id}", file=sys.stderr)
+            log.info("Saved tractor %s for user %s", tractor_name, user_id)
             return result["id"] if result else None
     except Exception as e:
-        print(f"[TRACKER DB] Error saving user tractor: {e}", file=sys.stderr)
+        log.error("Error saving user tractor: %s", e)
         return None
 
 
+async def save_user_tractors(rows: List[Tuple]) -> None:
+    """Insert many tractors in one round-trip.
+
+    Rows are (user_id, name, type_id, type_name, age_years,
+    has_preexisting_conditions, preexisting_conditions). Errors are raised
+    so the write-behind queue can retry.
+    """
+    async with get_connection() as conn:
+        await queries.executemany(conn, "users.insert_tractor", rows)
+        await _user_changed(conn, (row[0] for row in rows))
+    sampled(log, logging.INFO, "db.save_tractors", "Saved %d tractors", len(rows))
+
+
+@coalesce()
 async def get_user_policies(user_id: str) -> List[Dict[str, Any]]:
     """Get all policies for a user."""
     try:
         async with get_connection() as conn:
-            rows = await conn.fetch("""
-                SELECT p.id, p.policy_number, p.user_id, p.dog_id as tractor_id,
-                       p.plan_type, p.monthly_premium, p.annual_coverage_limit,
-                       p.deductible, p.coverage_details, p.start_date, p.end_date, p.status,
-                       d.name as tractor_name, d.breed_name as type_name
-                FROM insurance_policies p
-                LEFT JOIN user_dogs d ON p.dog_id = d.id
-                WHERE p.user_id = $1
-                ORDER BY p.created_at DESC
-            """, user_id)
+            rows = await queries.fetch(conn, "policies.by_user", user_id)
             return [dict(row) for row in rows]
     except Exception as e:
-        print(f"[TRACKER DB] Error fetching user policies: {e}", file=sys.stderr)
+        log.error("Error fetching user policies: %s", e)
         return []
 
 
+async def get_policy_portfolio(status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get policies joined to their tractors for re-pricing (optionally filtered by status)."""
+    try:
+        async with get_connection() as conn:
+            rows = await queries.fetch(conn, "policies.portfolio", status)
+            log.info("Retrieved %d policies for re-pricing", len(rows))
+            return [dict(row) for row in rows]
+    except Exception as e:
+        log.error("Error fetching policy portfolio: %s", e)
+        return []
+
+
+QUOTE_VALID_DAYS = 30
+
+
+def quote_record(
+    user_id: Optional[str],
+    session_id: str,
+    tractor_details: Dict[str, Any],
+    plan_type: str,
+    quoted_premium: float,
+    coverage_details: Dict[str, Any]
+) -> Tuple:
+    """Positional parameters for the quotes.insert statement."""
+    import json
+    from datetime import datetime, timedelta
+
+    valid_until = datetime.now() + timedelta(days=QUOTE_VALID_DAYS)
+    return (user_id, session_id, json.dumps(tractor_details), plan_type,
+            quoted_premium, json.dumps(coverage_details), valid_until)
+
+
 async def save_quote(
     user_id: Optional[str],
     session_id: str,
@@ -353,22 +873,21 @@ async def save_quote(
 ) -> Optional[int]:
     """Save a quote to the database (DB column: dog_details stores tractor_details)."""
     try:
-        import json
-        from datetime import datetime, timedelta
-
-        valid_until = datetime.now() + timedelta(days=30)
-
         async with get_connection() as conn:
-            result = await conn.fetchrow("""
-                INSERT INTO policy_quotes (user_id, session_id, dog_details, plan_type,
-                                          quoted_premium, coverage_details, valid_until)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                RETURNING id
-            """, user_id, session_id, json.dumps(tractor_details), plan_type,
-                quoted_premium, json.dumps(coverage_details), valid_until)
-
-            print(f"[TRACKER DB] Saved quote for session {session_id}", file=sys.stderr)
+            result = await queries.fetchrow(
+                conn, "quotes.insert_returning",
+                *quote_record(user_id, session_id, tractor_details, plan_type, quoted_premium, coverage_details),
+            )
+
+            log.info("Saved quote for session %s", session_id)
             return result["id"] if result else None
     except Exception as e:
-        print(f"[TRACKER DB] Error saving quote: {e}", file=sys.stderr)
+        log.error("Error saving quote: %s", e)
         return None
+
+
+async def save_quotes(rows: List[Tuple]) -> None:
+    """Insert many quotes (rows from quote_record) in one round-trip; errors are raised."""
+    async with get_connection() as conn:
+        await queries.executemany(conn, "quotes.insert", rows)
+    sampled(log, logging.INFO, "db.save_quotes", "Saved %d quotes", len(rows))
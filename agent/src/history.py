@@ -0,0 +1,181 @@
+"""
+Conversation history for Tractor Insurance Agent (Tracker)
+
+Each session keeps the pydantic-ai message history of its previous turns so
+the model does not re-ask for details it has already been given. History is
+bounded by an approximate token budget: the oldest whole turns are dropped
+and replaced by a short summary built from the session's known facts.
+
+Stored history never contains system prompts or instructions - the agent's
+instructions are sent with every request, and the summary is rebuilt per run.
+"""
+
+import os
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_MAX_TURNS = int(os.environ.get("HISTORY_MAX_TURNS", "12"))
+# Rough chars-per-token ratio used for budgeting (no tokenizer round-trip)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: List[ModelMessage]) -> int:
+    """Approximate token count of the content of a message list."""
+    chars = 0
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, (UserPromptPart, SystemPromptPart, TextPart)):
+                chars += len(part.content) if isinstance(part.content, str) else 200
+            elif isinstance(part, ToolCallPart):
+                chars += len(part.tool_name) + len(part.args_as_json_str())
+            elif isinstance(part, ToolReturnPart):
+                chars += len(part.model_response_str())
+    return chars // CHARS_PER_TOKEN
+
+
+def split_turns(messages: List[ModelMessage]) -> List[List[ModelMessage]]:
+    """Group messages into turns, each starting at a request with a user prompt.
+
+    Cutting only at turn boundaries keeps tool calls paired with their returns.
+    """
+    turns: List[List[ModelMessage]] = []
+    for message in messages:
+        starts_turn = isinstance(message, ModelRequest) and any(
+            isinstance(part, UserPromptPart) for part in message.parts
+        )
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def trim_history(
+    messages: List[ModelMessage],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    max_turns: int = HISTORY_MAX_TURNS,
+) -> Tuple[List[ModelMessage], int]:
+    """Keep the newest whole turns within budget; returns (kept, dropped turn count)."""
+    turns = split_turns(messages)
+    kept: List[List[ModelMessage]] = []
+    used = 0
+    for turn in reversed(turns):
+        cost = estimate_tokens(turn)
+        if kept and (used + cost > token_budget or len(kept) >= max_turns):
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    return [message for turn in kept for message in turn], len(turns) - len(kept)
+
+
+def strip_for_storage(messages: List[ModelMessage]) -> List[ModelMessage]:
+    """Drop system prompt parts and per-request instructions before storing."""
+    stripped: List[ModelMessage] = []
+    for message in messages:
+        if isinstance(message, ModelRequest):
+            parts = [part for part in message.parts if not isinstance(part, SystemPromptPart)]
+            if not parts:
+                continue
+            message = replace(message, parts=parts, instructions=None)
+        stripped.append(message)
+    return stripped
+
+
+def summarize_session(session_ctx: Any, dropped_turns: int) -> Optional[str]:
+    """Short summary standing in for dropped turns, built from known session facts."""
+    facts = []
+    if session_ctx.user_name:
+        facts.append(f"user's name is {session_ctx.user_name}")
+    if session_ctx.tractor_type:
+        brand = f" ({session_ctx.tractor_brand})" if session_ctx.tractor_brand else ""
+        facts.append(f"tractor type {session_ctx.tractor_type}{brand}")
+    if session_ctx.tractor_age is not None:
+        facts.append(f"{session_ctx.tractor_age} years old")
+    if session_ctx.tractor_name:
+        facts.append(f"named {session_ctx.tractor_name}")
+    if session_ctx.has_modifications:
+        facts.append("has modifications or prior damage")
+    if not facts and not dropped_turns:
+        return None
+    summary = f"Earlier conversation ({dropped_turns} older turns omitted)."
+    if facts:
+        summary += " Already confirmed: " + ", ".join(facts) + ". Do not ask for these again."
+    return summary
+
+
+def history_for_run(session_ctx: Any) -> List[ModelMessage]:
+    """Message history to pass to the agent for the next turn of a session."""
+    history = list(session_ctx.message_history)
+    if not history:
+        return history
+    summary = summarize_session(session_ctx, session_ctx.history_dropped_turns)
+    if summary and isinstance(history[0], ModelRequest):
+        history[0] = replace(history[0], parts=[SystemPromptPart(summary), *history[0].parts])
+    return history
+
+
+def record_run(session_ctx: Any, new_messages: List[ModelMessage]) -> None:
+    """Append a finished run's messages to the session and re-apply the budget."""
+    messages = list(session_ctx.message_history) + strip_for_storage(new_messages)
+    kept, dropped = trim_history(messages)
+    session_ctx.message_history = kept
+    session_ctx.history_dropped_turns += dropped
+
+
+def record_exchange(session_ctx: Any, prompt: str, response_text: str) -> None:
+    """Record a turn answered without an agent run (e.g. from the response cache)."""
+    record_run(session_ctx, [
+        ModelRequest(parts=[UserPromptPart(prompt)]),
+        ModelResponse(parts=[TextPart(response_text)]),
+    ])
+
+
+def history_from_client_messages(
+    messages: List[Dict[str, Any]],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+) -> List[ModelMessage]:
+    """Fallback history from an OpenAI-style messages array (excluding the last user turn).
+
+    Used when no stored history exists, e.g. a session first seen by this worker.
+    """
+    history: List[ModelMessage] = []
+    last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+    for msg in messages[:last_user]:
+        content = msg.get("content")
+        if isinstance(content, list):
+            content = " ".join(
+                item.get("text", "") for item in content if isinstance(item, dict) and item.get("type") == "text"
+            )
+        if not isinstance(content, str) or not content:
+            continue
+        if msg.get("role") == "user":
+            history.append(ModelRequest(parts=[UserPromptPart(content)]))
+        elif msg.get("role") == "assistant":
+            history.append(ModelResponse(parts=[TextPart(content)]))
+    kept, _ = trim_history(history, token_budget)
+    # History must start with a request
+    while kept and not isinstance(kept[0], ModelRequest):
+        kept.pop(0)
+    return kept
+
+
+def dump_history(messages: List[ModelMessage]) -> List[Dict[str, Any]]:
+    """JSON-compatible form of a message history for session backends."""
+    return ModelMessagesTypeAdapter.dump_python(messages, mode="json")
+
+
+def load_history(data: List[Dict[str, Any]]) -> List[ModelMessage]:
+    return ModelMessagesTypeAdapter.validate_python(data or [])
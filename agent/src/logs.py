@@ -0,0 +1,158 @@
+"""
+Logging for Tractor Insurance Agent (Tracker)
+
+Modules log through get_logger("db"), get_logger("writes"), ... instead of
+printing to stderr. Records are put on an in-memory queue and written by a
+background thread (QueueHandler/QueueListener), so a slow stderr never blocks
+the event loop. Messages use %-style arguments, which are only formatted when
+the level is enabled.
+
+Every log line carries the current request id. RequestIdMiddleware sets it
+per HTTP request (from X-Request-ID, or a new one) and echoes it on the
+response; asyncio copies it into tool calls and database queries run by that
+request.
+
+High-frequency events (per-lookup, per-batch) go through sampled(), which
+keeps 1 in every LOG_SAMPLE_EVERY calls.
+
+Env: LOG_LEVEL (default INFO), LOG_FORMAT (text | json), LOG_SAMPLE_EVERY.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_EVERY = max(1, int(os.environ.get("LOG_SAMPLE_EVERY", "100")))
+REQUEST_ID_HEADER = "x-request-id"
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_sample_counts: Dict[str, int] = {}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the "tracker" namespace, e.g. get_logger("db") -> tracker.db."""
+    return logging.getLogger(f"tracker.{name}")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def sampled(logger: logging.Logger, level: int, event: str, msg: str, *args: Any) -> None:
+    """Log 1 in LOG_SAMPLE_EVERY occurrences of a high-frequency event."""
+    if not logger.isEnabledFor(level):
+        return
+    count = _sample_counts.get(event, 0)
+    _sample_counts[event] = count + 1
+    if count % LOG_SAMPLE_EVERY == 0:
+        logger.log(level, msg, *args, extra={"sampled": LOG_SAMPLE_EVERY})
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": record.request_id,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "sampled", None):
+            entry["sampled"] = record.sampled
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """Route the tracker loggers through a queue to a stderr writer thread (idempotent)."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        stream.setFormatter(_JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(name)s] req=%(request_id)s %(message)s"
+        ))
+
+    # The request id is read in the calling task, before the record crosses to the writer thread
+    handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    handler.addFilter(_RequestIdFilter())
+
+    root = logging.getLogger("tracker")
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    root.propagate = False
+
+    _queue_handler = handler
+    _listener = logging.handlers.QueueListener(handler.queue, stream)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread.
+
+    The queue handler is detached too, so records logged after shutdown
+    propagate to the root logger instead of piling up in an undrained queue.
+    configure_logging() can be called again afterwards.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        root = logging.getLogger("tracker")
+        root.removeHandler(_queue_handler)
+        root.propagate = True
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: bind a request id for the request and return it as X-Request-ID."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or new_request_id()
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.encode(), request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
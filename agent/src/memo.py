@@ -0,0 +1,180 @@
+"""
+Request-scoped lookup memo for Tractor Insurance Agent (Tracker)
+
+One agent run often repeats a lookup: confirm_tractor_type resolves and
+searches the name it was given, generate_insurance_quote looks the session's
+type up again (and "Farm Tractor" when that fails), and Gemini sometimes
+calls two tools at once that need the same row. RequestMemo sits on
+TrackerDeps.memo for the length of one request and shares each distinct
+lookup between every tool in the run:
+- a repeated call gets the stored result
+- a call made while the same lookup is in flight waits for it (single-flight)
+- a failed lookup is not kept, so the next call tries again
+
+Speculative lookups (prefetch.py) are entries started before any tool asks
+for them. Entries still running when the request ends are cancelled.
+
+Counters for /health: calls, executed, saved (round-trips avoided), joined
+(of which, waited on an in-flight call) and the prefetch hit counts.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Hashable, List, Optional, Set, Tuple
+
+from .catalog import normalize_name
+from .database import get_tractor_type_by_name, get_user_dashboard, resolve_tractor_mention, search_tractor_types
+from .logs import get_logger
+from .rating import ensure_rating_table, quote_from_table
+from .resolver import Resolution
+
+log = get_logger("memo")
+
+
+class MemoStats:
+    """Counters for /health, across all requests."""
+
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.joined = 0
+        self.prefetched = 0
+        self.prefetch_used = 0
+        self.prefetch_wasted = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            # A prefetched result saves latency, not a round-trip
+            "saved": self.calls - self.executed - self.prefetch_used,
+            "joined": self.joined,
+            "prefetch": {
+                "started": self.prefetched,
+                "used": self.prefetch_used,
+                "wasted": self.prefetch_wasted,
+                "use_rate": round(self.prefetch_used / self.prefetched, 4) if self.prefetched else None,
+            },
+        }
+
+
+memo_stats = MemoStats()
+
+
+class RequestMemo:
+    """Lookups made while handling one request, shared by every tool in its agent run."""
+
+    def __init__(self):
+        self._entries: Dict[Hashable, asyncio.Task] = {}
+        self._speculative: Set[Hashable] = set()
+        self._background: List[asyncio.Task] = []
+        self.calls = 0
+        self.executed = 0
+        self.prefetch_used = 0
+
+    def _valid(self, key: Hashable) -> Optional[asyncio.Task]:
+        task = self._entries.get(key)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            return None
+        return task
+
+    async def call(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """factory()'s result, run at most once per key while it keeps succeeding."""
+        self.calls += 1
+        memo_stats.calls += 1
+        task = self._valid(key)
+        if task is None:
+            task = self._entries[key] = asyncio.ensure_future(factory())
+            self.executed += 1
+            memo_stats.executed += 1
+        else:
+            if not task.done():
+                memo_stats.joined += 1
+            if key in self._speculative:
+                self._speculative.discard(key)
+                self.prefetch_used += 1
+                memo_stats.prefetch_used += 1
+        # Shielded: a cancelled caller must not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    def start(self, key: Hashable, coro: Coroutine[Any, Any, Any]) -> None:
+        """Begin a lookup before anyone asks for it (no-op if already started)."""
+        if self._valid(key) is not None:
+            coro.close()
+            return
+        self._entries[key] = asyncio.ensure_future(coro)
+        self._speculative.add(key)
+        memo_stats.prefetched += 1
+
+    def background(self, coro: Coroutine[Any, Any, Any]) -> None:
+        """Run a coroutine for this request; cancelled by close() if unfinished."""
+        self._background.append(asyncio.ensure_future(coro))
+
+    @property
+    def saved(self) -> int:
+        """Round-trips this request avoided."""
+        return self.calls - self.executed - self.prefetch_used
+
+    def close(self) -> None:
+        """Cancel unfinished work and count speculation nobody used."""
+        for task in self._background:
+            task.cancel()
+        memo_stats.prefetch_wasted += len(self._speculative)
+        for task in self._entries.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # retrieved, so a failed lookup is not reported as unhandled
+        if self.calls:
+            log.debug("Request memo: %d calls, %d executed, %d prefetched", self.calls, self.executed, self.prefetch_used)
+
+    # -------------------------------------------------------------------------
+    # Memoized lookups
+    # -------------------------------------------------------------------------
+
+    async def tractor_type(self, name: str) -> Optional[Dict[str, Any]]:
+        return await self.call(tractor_type_key(name), lambda: get_tractor_type_by_name(name))
+
+    async def search_tractor_types(self, query: str) -> List[Dict[str, Any]]:
+        return await self.call(("search", normalize_name(query)), lambda: search_tractor_types(query))
+
+    async def resolve_mention(self, text: str) -> Optional[Resolution]:
+        return await self.call(("resolve", normalize_name(text)), lambda: resolve_tractor_mention(text))
+
+    async def user_dashboard(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.call(("dashboard", user_id), lambda: get_user_dashboard(user_id))
+
+    async def quote(
+        self,
+        type_name: str,
+        age_years: int,
+        plan_type: str,
+        has_modifications: bool,
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Tractor type row and quote, as generate_insurance_quote prices them."""
+        return await self.call(
+            quote_key(type_name, age_years, plan_type, has_modifications),
+            lambda: price_quote(self, type_name, age_years, plan_type, has_modifications),
+        )
+
+
+def tractor_type_key(name: str) -> Tuple[str, str]:
+    return ("tractor_type", normalize_name(name))
+
+
+def quote_key(type_name: str, age_years: int, plan_type: str, has_modifications: bool) -> Tuple[Any, ...]:
+    return ("quote", normalize_name(type_name), age_years, plan_type, bool(has_modifications))
+
+
+async def price_quote(
+    memo: RequestMemo,
+    type_name: str,
+    age_years: int,
+    plan_type: str,
+    has_modifications: bool,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """Tractor type row (Farm Tractor if unknown) and its quote from the rating table."""
+    tractor_type = await memo.tractor_type(type_name)
+    if not tractor_type:
+        tractor_type = await memo.tractor_type("Farm Tractor")
+    await ensure_rating_table()
+    return tractor_type, quote_from_table(tractor_type, age_years, plan_type, has_modifications)
@@ -0,0 +1,368 @@
+"""
+User memory (Zep) for Tractor Insurance Agent (Tracker)
+
+Returning users get the facts Zep has learned about them and their tractor.
+Memory must never slow the voice path down:
+- Reads are prefetched as soon as the user id is known, run concurrently with
+  the rest of request handling, are cached per user with a TTL, and are only
+  awaited for a short budget (a late result still fills the cache for the
+  next turn).
+- Writes are queued and sent in batches by a background task; the request
+  path only appends to the queue.
+
+Backends:
+- zep:   Zep Cloud (zep-cloud) - users, threads and graph search
+- local: in-process stub for tests and offline development
+- none:  memory disabled
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .logs import get_logger
+
+log = get_logger("memory")
+
+# Zep memory integration
+try:
+    from zep_cloud.client import AsyncZep
+    from zep_cloud.types import Message as ZepMessage
+    ZEP_AVAILABLE = True
+except ImportError:
+    ZEP_AVAILABLE = False
+    log.warning("zep-cloud not installed, memory features disabled")
+
+MEMORY_BACKEND = os.environ.get("MEMORY_BACKEND", "").lower()
+MEMORY_CACHE_SIZE = int(os.environ.get("MEMORY_CACHE_SIZE", "5000"))
+MEMORY_CACHE_TTL_SECONDS = float(os.environ.get("MEMORY_CACHE_TTL_SECONDS", "300"))
+# How long a request may wait for a prefetch that has not finished yet
+MEMORY_FETCH_BUDGET_SECONDS = float(os.environ.get("MEMORY_FETCH_BUDGET_SECONDS", "0.25"))
+MEMORY_FLUSH_INTERVAL = float(os.environ.get("MEMORY_FLUSH_INTERVAL", "2.0"))
+MEMORY_FLUSH_BATCH = int(os.environ.get("MEMORY_FLUSH_BATCH", "30"))
+MEMORY_MAX_PENDING = int(os.environ.get("MEMORY_MAX_PENDING", "5000"))
+
+# Same query the web app uses for /api/zep-context
+MEMORY_SEARCH_QUERY = "tractor type name age condition insurance plan coverage preferences"
+MEMORY_SEARCH_LIMIT = 15
+
+
+# =============================================================================
+# ZEP MEMORY CLIENT
+# =============================================================================
+
+_zep_client: Optional["AsyncZep"] = None
+
+def get_zep_client() -> Optional["AsyncZep"]:
+    """Get or create Zep client singleton."""
+    global _zep_client
+    if _zep_client is None and ZEP_AVAILABLE:
+        api_key = os.environ.get("ZEP_API_KEY")
+        if api_key:
+            _zep_client = AsyncZep(api_key=api_key)
+            log.info("Zep memory client initialized")
+        else:
+            log.info("ZEP_API_KEY not set, memory disabled")
+    return _zep_client
+
+
+def get_zep_user_id(user_id: str) -> str:
+    """Prefix user_id with project name to separate from other projects."""
+    return f"tractorinsurance_{user_id}"
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+@dataclass
+class MemoryTurn:
+    """One user/assistant exchange waiting to be written."""
+    user_id: str
+    thread_id: str
+    user_name: Optional[str]
+    user_text: str
+    assistant_text: str
+
+
+class MemoryBackend:
+    """Long-term user memory. The base class remembers nothing."""
+
+    enabled = False
+
+    async def search_facts(self, user_id: str) -> List[str]:
+        return []
+
+    async def add_turns(self, user_id: str, thread_id: str, turns: List[MemoryTurn]) -> None:
+        pass
+
+
+class ZepMemoryBackend(MemoryBackend):
+    """Zep Cloud: facts come from graph search, turns are added to a thread per session."""
+
+    enabled = True
+
+    def __init__(self, client: "AsyncZep"):
+        self.client = client
+        self._known_threads: Set[Tuple[str, str]] = set()
+
+    async def search_facts(self, user_id: str) -> List[str]:
+        results = await self.client.graph.search(
+            user_id=get_zep_user_id(user_id),
+            query=MEMORY_SEARCH_QUERY,
+            limit=MEMORY_SEARCH_LIMIT,
+            scope="edges",
+        )
+        return [edge.fact for edge in (results.edges or []) if edge.fact]
+
+    async def _ensure_thread(self, user_id: str, thread_id: str, user_name: Optional[str]) -> None:
+        if (user_id, thread_id) in self._known_threads:
+            return
+        zep_user_id = get_zep_user_id(user_id)
+        # Both calls fail harmlessly when the user/thread already exists
+        try:
+            await self.client.user.add(user_id=zep_user_id, first_name=user_name or None)
+        except Exception:
+            pass
+        try:
+            await self.client.thread.create(thread_id=thread_id, user_id=zep_user_id)
+        except Exception:
+            pass
+        self._known_threads.add((user_id, thread_id))
+
+    async def add_turns(self, user_id: str, thread_id: str, turns: List[MemoryTurn]) -> None:
+        await self._ensure_thread(user_id, thread_id, turns[0].user_name)
+        messages = []
+        for turn in turns:
+            messages.append(ZepMessage(role="user", name=turn.user_name, content=turn.user_text))
+            messages.append(ZepMessage(role="assistant", name="Tracker", content=turn.assistant_text))
+        await self.client.thread.add_messages(thread_id, messages=messages)
+
+
+class LocalMemoryBackend(MemoryBackend):
+    """In-process stand-in for Zep (tests, offline development).
+
+    Facts are whatever was seeded with remember(); written turns are kept in
+    self.turns so callers can assert on them.
+    """
+
+    enabled = True
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.facts: Dict[str, List[str]] = {}
+        self.turns: List[MemoryTurn] = []
+        self.searches = 0
+
+    def remember(self, user_id: str, fact: str) -> None:
+        self.facts.setdefault(user_id, []).append(fact)
+
+    async def search_facts(self, user_id: str) -> List[str]:
+        self.searches += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return list(self.facts.get(user_id, []))[:MEMORY_SEARCH_LIMIT]
+
+    async def add_turns(self, user_id: str, thread_id: str, turns: List[MemoryTurn]) -> None:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        self.turns.extend(turns)
+
+
+def create_memory_backend() -> MemoryBackend:
+    """Backend selected by MEMORY_BACKEND (defaults to Zep when configured)."""
+    backend = MEMORY_BACKEND or "zep"
+    if backend == "local":
+        return LocalMemoryBackend()
+    if backend == "zep":
+        client = get_zep_client()
+        if client is not None:
+            return ZepMemoryBackend(client)
+    return MemoryBackend()
+
+
+# =============================================================================
+# USER MEMORY (PREFETCH CACHE + BATCHED WRITES)
+# =============================================================================
+
+def format_facts(facts: List[str]) -> Optional[str]:
+    """Facts as the bullet list used in the agent's instructions."""
+    if not facts:
+        return None
+    return "\n".join(f"- {fact}" for fact in facts)
+
+
+class UserMemory:
+    """Per-user memory cache with prefetching and fire-and-forget batched writes."""
+
+    def __init__(
+        self,
+        backend: MemoryBackend,
+        max_users: int = MEMORY_CACHE_SIZE,
+        ttl_seconds: float = MEMORY_CACHE_TTL_SECONDS,
+        flush_interval: float = MEMORY_FLUSH_INTERVAL,
+        flush_batch: int = MEMORY_FLUSH_BATCH,
+        max_pending: int = MEMORY_MAX_PENDING,
+    ):
+        self.backend = backend
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_pending = max_pending
+
+        self._cache: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._pending: List[MemoryTurn] = []
+        self._flush_needed = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.late = 0
+        self.fetch_errors = 0
+        self.queued_turns = 0
+        self.dropped_turns = 0
+        self.written_turns = 0
+        self.write_errors = 0
+
+    def _cached(self, user_id: str) -> Optional[Tuple[float, Optional[str]]]:
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            self._cache.move_to_end(user_id)
+        return entry
+
+    async def _fetch(self, user_id: str) -> Optional[str]:
+        try:
+            context = format_facts(await self.backend.search_facts(user_id))
+        except Exception as e:
+            self.fetch_errors += 1
+            log.error("Error fetching memory for %s: %s", user_id, e)
+            # Keep serving the stale context and back off for a TTL instead of retrying every turn
+            entry = self._cache.get(user_id)
+            context = entry[1] if entry else None
+        finally:
+            self._inflight.pop(user_id, None)
+        self._cache[user_id] = (time.monotonic(), context)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_users:
+            self._cache.popitem(last=False)
+        return context
+
+    def prefetch(self, user_id: Optional[str]) -> None:
+        """Start loading a user's memory in the background if it is not fresh."""
+        if not user_id or not self.backend.enabled or user_id in self._inflight:
+            return
+        entry = self._cached(user_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+            return
+        self._inflight[user_id] = asyncio.create_task(self._fetch(user_id))
+
+    async def get_context(self, user_id: Optional[str], budget_seconds: float = MEMORY_FETCH_BUDGET_SECONDS) -> Optional[str]:
+        """Memory context for a user, waiting at most budget_seconds for a fetch.
+
+        Stale cached context is served while a refresh is running.
+        """
+        if not user_id or not self.backend.enabled:
+            return None
+        self.prefetch(user_id)
+        entry = self._cached(user_id)
+        task = self._inflight.get(user_id)
+        if task is None:
+            self.hits += 1
+            return entry[1] if entry else None
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=budget_seconds)
+        except asyncio.TimeoutError:
+            self.late += 1
+            return None
+
+    def record_turn(
+        self,
+        user_id: Optional[str],
+        thread_id: str,
+        user_name: Optional[str],
+        user_text: str,
+        assistant_text: str,
+    ) -> None:
+        """Queue a finished exchange for the background writer (never blocks)."""
+        if not user_id or not self.backend.enabled or not user_text or not assistant_text:
+            return
+        self._pending.append(MemoryTurn(user_id, thread_id, user_name, user_text, assistant_text))
+        self.queued_turns += 1
+        if len(self._pending) > self.max_pending:
+            overflow = len(self._pending) - self.max_pending
+            del self._pending[:overflow]
+            self.dropped_turns += overflow
+        if len(self._pending) >= self.flush_batch:
+            self._flush_needed.set()
+
+    async def _write(self, user_id: str, thread_id: str, turns: List[MemoryTurn]) -> None:
+        try:
+            await self.backend.add_turns(user_id, thread_id, turns)
+            self.written_turns += len(turns)
+        except Exception as e:
+            self.write_errors += 1
+            log.error("Error writing %d turns for %s: %s", len(turns), user_id, e)
+
+    async def flush(self) -> None:
+        """Write all queued turns, one batch per (user, thread), concurrently."""
+        while self._pending:
+            batch, self._pending = self._pending[:self.flush_batch], self._pending[self.flush_batch:]
+            by_thread: Dict[Tuple[str, str], List[MemoryTurn]] = {}
+            for turn in batch:
+                by_thread.setdefault((turn.user_id, turn.thread_id), []).append(turn)
+            await asyncio.gather(*(
+                self._write(user_id, thread_id, turns) for (user_id, thread_id), turns in by_thread.items()
+            ))
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self.backend.enabled and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        for task in list(self._inflight.values()):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "cached_users": len(self._cache),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "late": self.late,
+            "fetch_errors": self.fetch_errors,
+            "pending_turns": len(self._pending),
+            "queued_turns": self.queued_turns,
+            "written_turns": self.written_turns,
+            "dropped_turns": self.dropped_turns,
+            "write_errors": self.write_errors,
+        }
+
+
+user_memory = UserMemory(create_memory_backend())
@@ -0,0 +1,82 @@
+"""
+Speculative tool prefetch for Tractor Insurance Agent (Tracker)
+
+Agent tools only start their lookups once Gemini has decided to call them,
+so tool time adds to model time. Before the model call, speculate() scans
+the user's message and the session for the work the tools are likely to
+need and starts it in the background:
+- the catalog row for a tractor type named in the message (exact names and
+  aliases, e.g. "kubota compact") and for the session's known type
+- the quote for a plan the user asks about (or the default plan when they
+  ask for a price), once the session knows the type and age
+
+The lookups are started as entries of the request's memo (TrackerDeps.memo,
+see memo.py), under the keys the tools will ask for, so a guessed-right
+lookup is awaited instead of run again and anything else is computed as
+before. Unused work is cancelled when the run ends; hit counts are in the
+memo's /health counters.
+
+Speculation only reads - quotes are still recorded by the tool that returns
+them.
+
+Env: PREFETCH_ENABLED (default true), PREFETCH_MIN_CONFIDENCE.
+"""
+
+import os
+import re
+from typing import Any, Optional
+
+from .database import DEFAULT_PLAN_TYPE, INSURANCE_PLANS, get_tractor_type_by_name, load_type_resolver
+from .logs import get_logger
+from .memo import RequestMemo, price_quote, quote_key, tractor_type_key
+
+log = get_logger("prefetch")
+
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_MIN_CONFIDENCE = float(os.environ.get("PREFETCH_MIN_CONFIDENCE", "0.7"))
+
+_PLAN_TYPES = {plan["type"] for plan in INSURANCE_PLANS}
+_WORDS = re.compile(r"[a-z]+")
+_PRICE_WORDS = frozenset({"quote", "price", "prices", "cost", "costs", "premium", "much"})
+
+
+def _mentioned_plan(words: set) -> Optional[str]:
+    plans = words & _PLAN_TYPES
+    if len(plans) == 1:
+        return next(iter(plans))
+    if not plans and words & _PRICE_WORDS:
+        return DEFAULT_PLAN_TYPE
+    return None
+
+
+def speculate(memo: RequestMemo, user_message: Optional[str], session_ctx: Any) -> None:
+    """Start the lookups this turn's tools are likely to need (returns immediately)."""
+    if PREFETCH_ENABLED and user_message:
+        memo.background(_speculate(memo, user_message, session_ctx))
+
+
+async def _speculate(memo: RequestMemo, user_message: str, session_ctx: Any) -> None:
+    try:
+        # Exact and alias matches only: fuzzy matching a whole sentence costs
+        # tens of milliseconds of event loop time
+        resolution = (await load_type_resolver()).resolve_exact(user_message)
+    except Exception as e:
+        log.debug("Prefetch scan failed: %s", e)
+        return
+    mentioned = None
+    if resolution and resolution.type_name and resolution.confidence >= PREFETCH_MIN_CONFIDENCE:
+        mentioned = resolution.type_name
+
+    known = getattr(session_ctx, "tractor_type", None)
+    for name in {mentioned, known} - {None}:
+        memo.start(tractor_type_key(name), get_tractor_type_by_name(name))
+
+    plan_type = _mentioned_plan(set(_WORDS.findall(user_message.lower())))
+    type_name = mentioned or known
+    age_years = getattr(session_ctx, "tractor_age", None)
+    if plan_type and type_name and age_years is not None:
+        has_modifications = bool(getattr(session_ctx, "has_modifications", False))
+        memo.start(
+            quote_key(type_name, age_years, plan_type, has_modifications),
+            price_quote(memo, type_name, age_years, plan_type, has_modifications),
+        )
@@ -0,0 +1,193 @@
+"""
+Vectorized batch pricing for Tractor Insurance Agent (Tracker)
+
+Prices whole columns of (tractor type, age, plan, known issues) at once with
+NumPy. The rating rules and rounding are bit-identical to the scalar
+database.calculate_quote, which stays the reference implementation.
+
+Re-price the policy portfolio at current rates:
+    python -m src.pricing reprice [--status active] [--out repriced.json]
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .database import INSURANCE_PLANS, DEFAULT_PLAN_TYPE, SURCHARGE_PLAN_TYPES, get_policy_portfolio, tractor_catalog
+
+PLAN_TYPES: List[str] = [plan["type"] for plan in INSURANCE_PLANS]
+_PLAN_INDEX: Dict[str, int] = {plan_type: i for i, plan_type in enumerate(PLAN_TYPES)}
+_PLAN_BASE = np.array([float(plan["base_monthly_premium"]) for plan in INSURANCE_PLANS])
+_PLAN_SURCHARGE = np.array([plan_type in SURCHARGE_PLAN_TYPES for plan_type in PLAN_TYPES])
+
+# Distance from a half-cent tie below which rint(x * 100) may disagree with round(x, 2)
+_TIE_TOLERANCE = 1e-6
+
+
+def round_2dp(values: np.ndarray) -> np.ndarray:
+    """Round to 2dp exactly as Python's round(x, 2) does, element-wise.
+
+    rint(x * 100) / 100 is correct except when x * 100 lands within floating
+    point error of a .5 tie; those few elements are re-rounded with round().
+    """
+    scaled = values * 100.0
+    rounded = np.rint(scaled) / 100.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < _TIE_TOLERANCE
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def age_factors(ages: np.ndarray) -> np.ndarray:
+    """Age adjustment factor per tractor (same bands as calculate_quote)."""
+    return np.select(
+        [ages <= 2, ages >= 15, ages >= 10, ages >= 5],
+        [0.9, 1.6, 1.4, 1.15],
+        default=1.0,
+    )
+
+
+def age_adjustment_labels(ages: np.ndarray) -> np.ndarray:
+    """The 'age_adjustment' factor label reported by calculate_quote."""
+    return np.where(ages >= 10, "veteran", np.where(ages <= 2, "new", "standard"))
+
+
+def plan_indices(plan_types: Sequence[str]) -> np.ndarray:
+    """Index into INSURANCE_PLANS per row; unknown plans fall back to the default plan."""
+    default = _PLAN_INDEX[DEFAULT_PLAN_TYPE]
+    return np.fromiter((_PLAN_INDEX.get(p, default) for p in plan_types), dtype=np.intp, count=len(plan_types))
+
+
+def quote_batch(
+    type_multipliers: Sequence[float],
+    ages: Sequence[float],
+    plan_types: Sequence[str],
+    has_preexisting_conditions: Sequence[bool],
+) -> Dict[str, np.ndarray]:
+    """Price equal-length columns of quotes in one pass.
+
+    Returns columns: plan_type, monthly_premium, annual_premium, age_adjustment.
+    """
+    multipliers = np.asarray(type_multipliers, dtype=np.float64)
+    # Not truncated: calculate_quote compares the age as given (2.5 is not "new")
+    ages = np.asarray(ages, dtype=np.float64)
+    flags = np.asarray(has_preexisting_conditions, dtype=bool)
+    plans = plan_indices(plan_types)
+    if not (len(multipliers) == len(ages) == len(flags) == len(plans)):
+        raise ValueError("All batch columns must have the same length")
+
+    # Same multiplication order as calculate_quote; multiplying by 1.0 is exact
+    premium = _PLAN_BASE[plans] * multipliers
+    premium = premium * age_factors(ages)
+    surcharge = flags & _PLAN_SURCHARGE[plans]
+    premium = premium * np.where(surcharge, 1.3, 1.0)
+
+    monthly = round_2dp(premium)
+    annual = round_2dp(monthly * 12)
+
+    return {
+        "plan_type": np.array(PLAN_TYPES, dtype=object)[plans],
+        "monthly_premium": monthly,
+        "annual_premium": annual,
+        "age_adjustment": age_adjustment_labels(ages),
+    }
+
+
+def type_multiplier(tractor_type: Optional[Dict[str, Any]]) -> float:
+    """Risk multiplier of a tractor type row (1.0 when unknown)."""
+    return float((tractor_type or {}).get("base_premium_multiplier", 1.0))
+
+
+def quote_all_plans(
+    tractor_type: Dict[str, Any],
+    age_years: int,
+    has_preexisting_conditions: bool = False,
+) -> Dict[str, np.ndarray]:
+    """Price every plan for one tractor in a single batch."""
+    n = len(PLAN_TYPES)
+    return quote_batch(
+        [type_multiplier(tractor_type)] * n,
+        [age_years] * n,
+        PLAN_TYPES,
+        [has_preexisting_conditions] * n,
+    )
+
+
+def compare_plans(
+    tractor_type: Dict[str, Any],
+    age_years: int,
+    has_preexisting_conditions: bool = False,
+) -> List[Dict[str, Any]]:
+    """One row per plan (premiums plus headline cover), priced in a single batch."""
+    quotes = quote_all_plans(tractor_type, age_years, has_preexisting_conditions)
+    return [
+        {
+            "plan_type": plan["type"],
+            "name": plan["name"],
+            "monthly_premium": float(quotes["monthly_premium"][i]),
+            "annual_premium": float(quotes["annual_premium"][i]),
+            "annual_coverage_limit": plan["annual_coverage_limit"],
+            "deductible": plan["deductible"],
+        }
+        for i, plan in enumerate(INSURANCE_PLANS)
+    ]
+
+
+def reprice_portfolio(
+    policies: List[Dict[str, Any]],
+    tractor_types: List[Dict[str, Any]],
+) -> Dict[str, np.ndarray]:
+    """Re-price policy rows from get_policy_portfolio at current rates.
+
+    Types are matched by type_id, then by type_name; unmatched rows price at 1.0x.
+    """
+    by_id = {t["id"]: t for t in tractor_types}
+    by_name = {t["name"].lower(): t for t in tractor_types}
+
+    multipliers = []
+    for row in policies:
+        tractor_type = by_id.get(row.get("type_id")) or by_name.get((row.get("type_name") or "").lower())
+        multipliers.append(type_multiplier(tractor_type))
+
+    quotes = quote_batch(
+        multipliers,
+        [row.get("age_years") or 0 for row in policies],
+        [row.get("plan_type") or DEFAULT_PLAN_TYPE for row in policies],
+        [bool(row.get("has_preexisting_conditions")) for row in policies],
+    )
+    current = np.array([float(row.get("monthly_premium") or 0) for row in policies])
+    quotes["policy_id"] = np.array([row.get("policy_id") for row in policies], dtype=object)
+    quotes["current_monthly_premium"] = current
+    quotes["monthly_change"] = round_2dp(quotes["monthly_premium"] - current)
+    return quotes
+
+
+def columns_to_json(columns: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """Convert NumPy result columns to JSON-serialisable lists."""
+    return {name: values.tolist() for name, values in columns.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import json
+
+    parser = argparse.ArgumentParser(description="Re-price policies at the current catalog rates")
+    parser.add_argument("command", choices=["reprice"])
+    parser.add_argument("--status", help="Only policies with this status (e.g. active)")
+    parser.add_argument("--out", help="Write the repriced columns to this JSON file")
+    args = parser.parse_args()
+
+    async def main() -> None:
+        await tractor_catalog.ensure_loaded()
+        policies = await get_policy_portfolio(args.status)
+        quotes = reprice_portfolio(policies, tractor_catalog.all())
+        change = float(quotes["monthly_change"].sum())
+        print(f"Re-priced {len(policies)} policies: monthly total "
+              f"{quotes['current_monthly_premium'].sum():.2f} -> {quotes['monthly_premium'].sum():.2f} "
+              f"({change:+.2f})")
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(columns_to_json(quotes), f)
+
+    asyncio.run(main())
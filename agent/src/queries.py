@@ -0,0 +1,325 @@
+"""
+Query registry for Tractor Insurance Agent (Tracker)
+
+Every SQL statement database.py runs is registered here by name. Hot
+statements are prepared once per pooled connection (pool init hook) and the
+prepared statements are reused for the life of the connection; the rest are
+prepared on first use. Each call is timed per query name.
+
+PgBouncer-safe mode (DB_PGBOUNCER_SAFE=true, for Neon's pooled endpoint in
+transaction mode): named prepared statements do not survive between
+transactions there, so nothing is prepared or cached per connection and each
+call runs as an unnamed statement.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+from .logs import get_logger
+from .tracing import span
+
+log = get_logger("db")
+
+DB_PGBOUNCER_SAFE = os.environ.get("DB_PGBOUNCER_SAFE", "false").lower() == "true"
+DB_SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", "250"))
+
+
+@dataclass(frozen=True)
+class Query:
+    name: str
+    sql: str
+    # Prepared when a connection is opened rather than on first use
+    hot: bool = False
+
+
+@dataclass
+class QueryStats:
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+QUERIES: Dict[str, Query] = {}
+_stats: Dict[str, QueryStats] = {}
+
+
+def register(name: str, sql: str, hot: bool = False) -> Query:
+    if name in QUERIES:
+        raise ValueError(f"Query {name!r} is already registered")
+    query = Query(name, sql.strip(), hot)
+    QUERIES[name] = query
+    _stats[name] = QueryStats()
+    return query
+
+
+# =============================================================================
+# STATEMENTS
+# =============================================================================
+# Legacy table names: dog_breeds = tractor types, user_dogs = user tractors
+# (see the mapping notes in database.py)
+
+_TRACTOR_TYPE_COLUMNS = """
+    id, name, size, risk_category, avg_lifespan_years,
+    common_health_issues, base_premium_multiplier
+"""
+
+register("tractor_types.all", f"""
+    SELECT {_TRACTOR_TYPE_COLUMNS}
+    FROM dog_breeds
+    ORDER BY name
+""", hot=True)
+
+register("tractor_types.by_name", f"""
+    SELECT {_TRACTOR_TYPE_COLUMNS}
+    FROM dog_breeds
+    WHERE LOWER(name) = LOWER($1)
+""", hot=True)
+
+register("tractor_types.best_like", f"""
+    SELECT {_TRACTOR_TYPE_COLUMNS}
+    FROM dog_breeds
+    WHERE LOWER(name) LIKE LOWER($1)
+    ORDER BY
+        CASE WHEN LOWER(name) = LOWER($2) THEN 0 ELSE 1 END
+    LIMIT 1
+""")
+
+register("tractor_types.search", f"""
+    SELECT {_TRACTOR_TYPE_COLUMNS}
+    FROM dog_breeds
+    WHERE LOWER(name) LIKE LOWER($1)
+    ORDER BY name
+    LIMIT 5
+""")
+
+register("rating_tables.get", """
+    SELECT payload FROM rating_tables
+    WHERE $1::text IS NULL OR version = $1
+    ORDER BY created_at DESC
+    LIMIT 1
+""")
+
+register("rating_tables.upsert", """
+    INSERT INTO rating_tables (version, payload) VALUES ($1, $2)
+    ON CONFLICT (version) DO UPDATE SET payload = EXCLUDED.payload
+""")
+
+register("sessions.get_many", """
+    SELECT session_id, data FROM agent_sessions WHERE session_id = ANY($1::text[])
+""", hot=True)
+
+register("sessions.upsert", """
+    INSERT INTO agent_sessions (session_id, data, updated_at) VALUES ($1, $2, NOW())
+    ON CONFLICT (session_id) DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+""", hot=True)
+
+register("sessions.delete_expired", """
+    DELETE FROM agent_sessions WHERE updated_at < NOW() - make_interval(secs => $1)
+""")
+
+register("users.profile", """
+    SELECT * FROM user_profiles WHERE user_id = $1
+""", hot=True)
+
+register("users.tractors", """
+    SELECT d.id, d.user_id, d.name, d.breed_id as type_id,
+           d.breed_name as type_name, d.age_years,
+           d.has_preexisting_conditions, d.preexisting_conditions,
+           b.name as type_name_full, b.size, b.risk_category
+    FROM user_dogs d
+    LEFT JOIN dog_breeds b ON d.breed_id = b.id
+    WHERE d.user_id = $1
+    ORDER BY d.created_at DESC
+""", hot=True)
+
+# Profile, tractors and policies in one round-trip; user_dogs is scanned once
+# and policies join the user's tractors rather than the table again
+register("users.dashboard", """
+    WITH tractors AS (
+        SELECT d.id, d.name, d.breed_id as type_id, d.breed_name as type_name,
+               d.age_years, d.has_preexisting_conditions, d.preexisting_conditions,
+               b.size, b.risk_category, d.created_at
+        FROM user_dogs d
+        LEFT JOIN dog_breeds b ON d.breed_id = b.id
+        WHERE d.user_id = $1
+    )
+    SELECT
+        (SELECT json_build_object(
+                    'user_id', u.user_id, 'name', u.name, 'email', u.email,
+                    'preferences', u.preferences,
+                    'onboarding_completed', u.onboarding_completed)
+         FROM user_profiles u WHERE u.user_id = $1) as profile,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'id', t.id, 'name', t.name, 'type_id', t.type_id,
+                    'type_name', t.type_name, 'age_years', t.age_years,
+                    'has_preexisting_conditions', t.has_preexisting_conditions,
+                    'preexisting_conditions', t.preexisting_conditions,
+                    'size', t.size, 'risk_category', t.risk_category)
+                ORDER BY t.created_at DESC), '[]'::json)
+         FROM tractors t) as tractors,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'id', p.id, 'policy_number', p.policy_number, 'tractor_id', p.dog_id,
+                    'plan_type', p.plan_type, 'monthly_premium', p.monthly_premium,
+                    'annual_coverage_limit', p.annual_coverage_limit,
+                    'deductible', p.deductible, 'start_date', p.start_date,
+                    'end_date', p.end_date, 'status', p.status,
+                    'tractor_name', t.name, 'type_name', t.type_name)
+                ORDER BY p.created_at DESC), '[]'::json)
+         FROM insurance_policies p
+         LEFT JOIN tractors t ON p.dog_id = t.id
+         WHERE p.user_id = $1) as policies
+""", hot=True)
+
+_INSERT_USER_TRACTOR = """
+    INSERT INTO user_dogs (user_id, name, breed_id, breed_name, age_years,
+                           has_preexisting_conditions, preexisting_conditions)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+"""
+register("users.insert_tractor", _INSERT_USER_TRACTOR, hot=True)
+register("users.insert_tractor_returning", _INSERT_USER_TRACTOR + " RETURNING id")
+
+register("users.notify_changed", """
+    SELECT pg_notify($1, $2)
+""")
+
+register("policies.by_user", """
+    SELECT p.id, p.policy_number, p.user_id, p.dog_id as tractor_id,
+           p.plan_type, p.monthly_premium, p.annual_coverage_limit,
+           p.deductible, p.coverage_details, p.start_date, p.end_date, p.status,
+           d.name as tractor_name, d.breed_name as type_name
+    FROM insurance_policies p
+    LEFT JOIN user_dogs d ON p.dog_id = d.id
+    WHERE p.user_id = $1
+    ORDER BY p.created_at DESC
+""", hot=True)
+
+register("policies.portfolio", """
+    SELECT p.id as policy_id, p.plan_type, p.monthly_premium, p.status,
+           d.breed_id as type_id, d.breed_name as type_name, d.age_years,
+           d.has_preexisting_conditions
+    FROM insurance_policies p
+    JOIN user_dogs d ON p.dog_id = d.id
+    WHERE $1::text IS NULL OR p.status = $1
+    ORDER BY p.id
+""")
+
+_INSERT_QUOTE = """
+    INSERT INTO policy_quotes (user_id, session_id, dog_details, plan_type,
+                              quoted_premium, coverage_details, valid_until)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+"""
+register("quotes.insert", _INSERT_QUOTE, hot=True)
+register("quotes.insert_returning", _INSERT_QUOTE + " RETURNING id")
+
+
+# =============================================================================
+# CONNECTIONS & EXECUTION
+# =============================================================================
+
+class RegistryConnection(asyncpg.Connection):
+    """asyncpg connection that keeps the registry's prepared statements."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.registry_statements: Dict[str, PreparedStatement] = {}
+
+
+async def prepare_connection(conn: RegistryConnection) -> None:
+    """Pool init hook: prepare every hot statement on a new connection.
+
+    A statement whose table does not exist yet (e.g. agent_sessions before
+    scripts/setup-puppy-db.js has run) is skipped and prepared lazily later.
+    """
+    for query in QUERIES.values():
+        if query.hot:
+            try:
+                conn.registry_statements[query.name] = await conn.prepare(query.sql)
+            except asyncpg.PostgresError as e:
+                log.info("Deferred preparing %s: %s", query.name, e)
+
+
+def pool_options() -> Dict[str, Any]:
+    """Extra asyncpg.create_pool arguments for the current mode."""
+    if DB_PGBOUNCER_SAFE:
+        return {"statement_cache_size": 0}
+    return {"connection_class": RegistryConnection, "init": prepare_connection}
+
+
+async def _statement(conn: Any, query: Query, refresh: bool = False) -> Optional[PreparedStatement]:
+    statements = None if DB_PGBOUNCER_SAFE else getattr(conn, "registry_statements", None)
+    if statements is None:
+        return None
+    statement = None if refresh else statements.get(query.name)
+    if statement is None:
+        statement = statements[query.name] = await conn.prepare(query.sql)
+    return statement
+
+
+async def _execute(conn: Any, query: Query, method: str, args: Sequence[Any]) -> Any:
+    statement = await _statement(conn, query)
+    if statement is None:
+        return await getattr(conn, method)(query.sql, *args)
+    # PreparedStatement has no execute(); fetch() of a statement without RETURNING is equivalent
+    method = "fetch" if method == "execute" else method
+    try:
+        return await getattr(statement, method)(*args)
+    except (asyncpg.exceptions.InvalidCachedStatementError,
+            asyncpg.exceptions.OutdatedSchemaCacheError):
+        # Schema changed under the prepared statement - prepare it again once
+        statement = await _statement(conn, query, refresh=True)
+        return await getattr(statement, method)(*args)
+
+
+async def _run(conn: Any, name: str, method: str, args: Sequence[Any]) -> Any:
+    query = QUERIES[name]
+    stats = _stats[name]
+    started = time.perf_counter()
+    try:
+        with span("db_query", name):
+            return await _execute(conn, query, method, args)
+    except Exception:
+        stats.errors += 1
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats.calls += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if elapsed_ms > DB_SLOW_QUERY_MS:
+            log.warning("Slow query %s: %.0fms", name, elapsed_ms)
+
+
+async def fetch(conn: Any, name: str, *args: Any) -> List[asyncpg.Record]:
+    return await _run(conn, name, "fetch", args)
+
+
+async def fetchrow(conn: Any, name: str, *args: Any) -> Optional[asyncpg.Record]:
+    return await _run(conn, name, "fetchrow", args)
+
+
+async def execute(conn: Any, name: str, *args: Any) -> None:
+    """Run a registered statement for its side effects."""
+    await _run(conn, name, "execute", args)
+
+
+async def executemany(conn: Any, name: str, rows: Sequence[Sequence[Any]]) -> None:
+    await _run(conn, name, "executemany", (rows,))
+
+
+def query_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-query call counts and timings (queries that have run at least once)."""
+    return {
+        name: {
+            "calls": stats.calls,
+            "errors": stats.errors,
+            "avg_ms": round(stats.total_ms / stats.calls, 2),
+            "max_ms": round(stats.max_ms, 2),
+        }
+        for name, stats in _stats.items() if stats.calls
+    }
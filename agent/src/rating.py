@@ -0,0 +1,301 @@
+"""
+Precompiled rating tables for Tractor Insurance Agent (Tracker)
+
+The rating rules in database.calculate_quote are compiled into a dense table
+indexed by (type id, age band, plan, known-issues flag), so a quote becomes
+an O(1) lookup. calculate_quote remains the reference implementation: every
+table is parity-checked cell by cell against it before it is used.
+
+Tables are versioned and can be stored as JSON files or in the
+rating_tables table (created by scripts/setup-puppy-db.js):
+    python -m src.rating compile --out rating_table.json
+    python -m src.rating compile --save-db
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .database import (
+    INSURANCE_PLANS,
+    DEFAULT_PLAN_TYPE,
+    calculate_quote,
+    get_plan_by_type,
+    get_rating_table_payload,
+    save_rating_table_payload,
+    tractor_catalog,
+)
+from .logs import get_logger
+
+log = get_logger("rating")
+
+RATING_TABLE_PATH = os.environ.get("RATING_TABLE_PATH", "")
+# "file", "db" or "compile" (build from the catalog at startup)
+RATING_TABLE_SOURCE = os.environ.get("RATING_TABLE_SOURCE", "file" if RATING_TABLE_PATH else "compile")
+
+# (min_age, max_age) per band; must match the branches in calculate_quote
+AGE_BANDS: List[Tuple[Optional[int], Optional[int]]] = [
+    (None, 2),   # new
+    (3, 4),
+    (5, 9),      # mid-life
+    (10, 14),    # older
+    (15, None),  # very old
+]
+# Bands 2-4 start at these ages (inclusive); band 0 is age <= 2, band 1 the rest
+_BAND_LOWER_BOUNDS = [5, 10, 15]
+
+# Ages checked by verify_parity in addition to one representative per band,
+# including fractional ages either side of each boundary
+PARITY_AGES = [*range(-1, 41), *(age + 0.5 for age in range(-1, 20)), 2.01, 4.99, 9.99, 14.99]
+
+
+def age_band(age_years: float) -> int:
+    """Index into AGE_BANDS for an age, with calculate_quote's comparisons (2.5 is band 1)."""
+    if age_years <= 2:
+        return 0
+    return bisect.bisect_right(_BAND_LOWER_BOUNDS, age_years) + 1
+
+
+def _band_representative(band: int) -> int:
+    low, high = AGE_BANDS[band]
+    return high if low is None else low
+
+
+@dataclass
+class RatingTable:
+    """Dense premium table: arrays shaped (types, age bands, plans, known-issues flag)."""
+    version: str
+    type_ids: List[int]
+    type_multipliers: List[float]
+    plan_types: List[str]
+    monthly: np.ndarray
+    annual: np.ndarray
+    created_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self._type_index = {type_id: i for i, type_id in enumerate(self.type_ids)}
+        self._plan_index = {plan_type: i for i, plan_type in enumerate(self.plan_types)}
+        # Nested lists of Python floats: indexing them is cheaper than NumPy scalar access
+        self._cells = [
+            [[list(zip(m_flags, a_flags)) for m_flags, a_flags in zip(m_plans, a_plans)]
+             for m_plans, a_plans in zip(m_bands, a_bands)]
+            for m_bands, a_bands in zip(self.monthly.tolist(), self.annual.tolist())
+        ]
+
+    def lookup(self, type_id: int, age_years: int, plan_type: str, has_preexisting_conditions: bool) -> Optional[Tuple[float, float]]:
+        """(monthly, annual) premium, or None if the type is not in the table."""
+        t = self._type_index.get(type_id)
+        if t is None:
+            return None
+        p = self._plan_index.get(plan_type)
+        if p is None:
+            p = self._plan_index[DEFAULT_PLAN_TYPE]
+        return self._cells[t][age_band(age_years)][p][1 if has_preexisting_conditions else 0]
+
+    def to_payload(self) -> Dict[str, Any]:
+        """JSON-serialisable form for files and the rating_tables table."""
+        return {
+            "version": self.version,
+            "created_at": self.created_at,
+            "type_ids": self.type_ids,
+            "type_multipliers": self.type_multipliers,
+            "plan_types": self.plan_types,
+            "age_bands": AGE_BANDS,
+            "monthly": self.monthly.tolist(),
+            "annual": self.annual.tolist(),
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "RatingTable":
+        if [tuple(band) for band in payload["age_bands"]] != AGE_BANDS:
+            raise ValueError(f"Rating table {payload['version']} uses different age bands")
+        return cls(
+            version=payload["version"],
+            type_ids=list(payload["type_ids"]),
+            type_multipliers=[float(m) for m in payload["type_multipliers"]],
+            plan_types=list(payload["plan_types"]),
+            monthly=np.array(payload["monthly"], dtype=np.float64),
+            annual=np.array(payload["annual"], dtype=np.float64),
+            created_at=payload.get("created_at", time.time()),
+        )
+
+
+# =============================================================================
+# COMPILATION & PARITY
+# =============================================================================
+
+def compile_rating_table(tractor_types: List[Dict[str, Any]], version: Optional[str] = None) -> RatingTable:
+    """Fill every cell of a new table from the calculate_quote reference."""
+    plan_types = [plan["type"] for plan in INSURANCE_PLANS]
+    shape = (len(tractor_types), len(AGE_BANDS), len(plan_types), 2)
+    monthly = np.zeros(shape)
+    annual = np.zeros(shape)
+
+    for t, tractor_type in enumerate(tractor_types):
+        for band in range(len(AGE_BANDS)):
+            age = _band_representative(band)
+            for p, plan_type in enumerate(plan_types):
+                for flag in (0, 1):
+                    quote = calculate_quote(tractor_type, age, plan_type, bool(flag))
+                    monthly[t, band, p, flag] = quote["monthly_premium"]
+                    annual[t, band, p, flag] = quote["annual_premium"]
+
+    type_ids = [t["id"] for t in tractor_types]
+    multipliers = [float(t.get("base_premium_multiplier", 1.0)) for t in tractor_types]
+    if version is None:
+        fingerprint = json.dumps([type_ids, multipliers, INSURANCE_PLANS], sort_keys=True, default=str)
+        version = "rt-" + hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+
+    return RatingTable(version, type_ids, multipliers, plan_types, monthly, annual)
+
+
+def verify_parity(table: RatingTable, tractor_types: List[Dict[str, Any]]) -> List[str]:
+    """Check every cell (and every age in PARITY_AGES) against calculate_quote.
+
+    Returns a list of mismatch descriptions; empty means the table is exact.
+    """
+    mismatches = []
+    plan_types = [plan["type"] for plan in INSURANCE_PLANS]
+    if set(table.type_ids) != {t["id"] for t in tractor_types}:
+        mismatches.append("type ids differ from the catalog")
+
+    for tractor_type in tractor_types:
+        for age in PARITY_AGES:
+            for plan_type in plan_types:
+                for flag in (False, True):
+                    expected = calculate_quote(tractor_type, age, plan_type, flag)
+                    actual = table.lookup(tractor_type["id"], age, plan_type, flag)
+                    if actual != (expected["monthly_premium"], expected["annual_premium"]):
+                        mismatches.append(
+                            f"{tractor_type['name']} age={age} plan={plan_type} issues={flag}: "
+                            f"table={actual} reference={(expected['monthly_premium'], expected['annual_premium'])}"
+                        )
+    return mismatches
+
+
+# =============================================================================
+# LOADING & ACTIVE TABLE
+# =============================================================================
+
+def load_rating_table_file(path: str) -> RatingTable:
+    with open(path) as f:
+        return RatingTable.from_payload(json.load(f))
+
+
+def save_rating_table_file(table: RatingTable, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(table.to_payload(), f)
+
+
+async def load_rating_table_db(version: Optional[str] = None) -> Optional[RatingTable]:
+    payload = await get_rating_table_payload(version)
+    return RatingTable.from_payload(payload) if payload else None
+
+
+_active_table: Optional[RatingTable] = None
+_active_catalog_version = -1
+
+
+async def ensure_rating_table() -> Optional[RatingTable]:
+    """Load (or compile) the active table for the current catalog snapshot."""
+    global _active_table, _active_catalog_version
+
+    if not await tractor_catalog.ensure_loaded():
+        return None
+    if _active_table is not None and _active_catalog_version == tractor_catalog.version:
+        return _active_table
+
+    tractor_types = tractor_catalog.all()
+    table = None
+    try:
+        if RATING_TABLE_SOURCE == "file" and RATING_TABLE_PATH:
+            table = load_rating_table_file(RATING_TABLE_PATH)
+        elif RATING_TABLE_SOURCE == "db":
+            table = await load_rating_table_db()
+    except Exception as e:
+        log.warning("Could not load rating table (%s): %s", RATING_TABLE_SOURCE, e)
+
+    if table is not None:
+        mismatches = verify_parity(table, tractor_types)
+        if mismatches:
+            log.warning("Table %s failed parity (%d cells), e.g. %s - recompiling",
+                        table.version, len(mismatches), mismatches[0])
+            table = None
+
+    if table is None:
+        table = compile_rating_table(tractor_types)
+
+    _active_table = table
+    _active_catalog_version = tractor_catalog.version
+    log.info("Active rating table %s (%d types x %d bands x %d plans)",
+             table.version, len(table.type_ids), len(AGE_BANDS), len(table.plan_types))
+    return table
+
+
+def active_rating_table() -> Optional[RatingTable]:
+    """The active table, if it matches the current catalog snapshot."""
+    if _active_catalog_version != tractor_catalog.version:
+        return None
+    return _active_table
+
+
+def quote_from_table(
+    tractor_type: Dict[str, Any],
+    age_years: int,
+    plan_type: str = "standard",
+    has_preexisting_conditions: bool = False
+) -> Dict[str, Any]:
+    """calculate_quote-compatible quote served from the active rating table.
+
+    Falls back to calculate_quote when no table is active or the type is unknown.
+    """
+    table = active_rating_table()
+    premiums = table.lookup(tractor_type.get("id"), age_years, plan_type, has_preexisting_conditions) if table else None
+    if premiums is None:
+        return calculate_quote(tractor_type, age_years, plan_type, has_preexisting_conditions)
+
+    monthly_premium, annual_premium = premiums
+    return {
+        "monthly_premium": monthly_premium,
+        "annual_premium": annual_premium,
+        "plan": get_plan_by_type(plan_type) or get_plan_by_type(DEFAULT_PLAN_TYPE),
+        "factors": {
+            "type_multiplier": float(tractor_type.get("base_premium_multiplier", 1.0)),
+            "age_adjustment": "veteran" if age_years >= 10 else "new" if age_years <= 2 else "standard",
+            "preexisting_adjustment": has_preexisting_conditions,
+        }
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Compile the rating table from the live catalog")
+    parser.add_argument("command", choices=["compile"])
+    parser.add_argument("--out", help="Write the table to this JSON file")
+    parser.add_argument("--save-db", action="store_true", help="Store the table in rating_tables")
+    parser.add_argument("--version", help="Explicit version label")
+    args = parser.parse_args()
+
+    async def main() -> None:
+        await tractor_catalog.ensure_loaded()
+        tractor_types = tractor_catalog.all()
+        table = compile_rating_table(tractor_types, args.version)
+        mismatches = verify_parity(table, tractor_types)
+        if mismatches:
+            sys.exit(f"Parity check failed: {mismatches[:5]}")
+        print(f"Compiled {table.version}: {table.monthly.size} cells, parity OK")
+        if args.out:
+            save_rating_table_file(table, args.out)
+        if args.save_db:
+            await save_rating_table_payload(table.version, table.to_payload())
+
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+"""
+Phonetic and alias resolver for Tractor Insurance Agent (Tracker)
+
+Voice transcription mangles tractor types and brands ("cabota", "massey
+fergie", "sit on"). The resolver maps a free-text mention onto a catalog type
+and/or brand in one local step by combining:
+- an alias table for known mishearings and colloquial names
+- phonetic keys (Double Metaphone when installed, Soundex otherwise)
+- edit-distance ranking between the heard phrase and the candidates
+
+All keys are precomputed when the resolver is built over the catalog.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .logs import get_logger
+
+log = get_logger("resolver")
+
+try:
+    from metaphone import doublemetaphone
+    METAPHONE_AVAILABLE = True
+except ImportError:
+    METAPHONE_AVAILABLE = False
+    log.warning("metaphone not installed, falling back to Soundex keys")
+
+
+# =============================================================================
+# ALIAS TABLES
+# =============================================================================
+
+# Colloquial / misheard phrases -> catalog type name
+TYPE_ALIASES: Dict[str, str] = {
+    "sub compact": "Compact Tractor",
+    "subcompact": "Compact Tractor",
+    "compact": "Compact Tractor",
+    "ride on": "Ride-on Mower",
+    "sit on": "Ride-on Mower",
+    "sit on mower": "Ride-on Mower",
+    "ride on lawnmower": "Ride-on Mower",
+    "lawn mower": "Ride-on Mower",
+    "vintage": "Vintage Tractor",
+    "classic": "Vintage Tractor",
+    "classic tractor": "Vintage Tractor",
+    "old tractor": "Vintage Tractor",
+    "antique tractor": "Vintage Tractor",
+    "lawn tractor": "Garden Tractor",
+    "garden": "Garden Tractor",
+    "mini": "Mini Tractor",
+    "farm": "Farm Tractor",
+    "utility": "Utility Tractor",
+}
+
+# Brand spellings and mishearings -> canonical brand
+BRAND_ALIASES: Dict[str, str] = {
+    "john deere": "John Deere",
+    "john deer": "John Deere",
+    "jon deere": "John Deere",
+    "deere": "John Deere",
+    "massey": "Massey Ferguson",
+    "massey fergie": "Massey Ferguson",
+    "massey ferguson": "Massey Ferguson",
+    "ferguson": "Massey Ferguson",
+    "new holland": "New Holland",
+    "kubota": "Kubota",
+    "cabota": "Kubota",
+    "kabota": "Kubota",
+    "case ih": "Case IH",
+    "fendt": "Fendt",
+    "claas": "Claas",
+    "ford": "Ford",
+}
+
+# Type assumed when only a brand is heard
+BRAND_DEFAULT_TYPES: Dict[str, str] = {
+    "John Deere": "Farm Tractor",
+    "Massey Ferguson": "Farm Tractor",
+    "New Holland": "Farm Tractor",
+    "Case IH": "Farm Tractor",
+    "Fendt": "Farm Tractor",
+    "Claas": "Farm Tractor",
+    "Ford": "Vintage Tractor",
+    "Kubota": "Compact Tractor",
+}
+
+# Words that never start or end a candidate phrase
+STOPWORDS = frozenset({
+    "a", "an", "the", "my", "our", "its", "it", "s", "is", "i", "have", "got",
+    "it's", "of", "one", "and", "with", "years", "year",
+})
+
+PHONETIC_MIN_SCORE = 0.6
+EDIT_DISTANCE_MIN_SCORE = 0.75
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_phrase(text: str) -> str:
+    """Lowercase and fold punctuation to spaces."""
+    return _NON_ALNUM.sub(" ", (text or "").lower()).strip()
+
+
+# =============================================================================
+# PHONETIC KEYS & EDIT DISTANCE
+# =============================================================================
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"), "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+
+
+def soundex(word: str) -> str:
+    """American Soundex code for a single word."""
+    word = "".join(ch for ch in word.lower() if ch.isalpha())
+    if not word:
+        return ""
+    code = word[0].upper()
+    last = _SOUNDEX_CODES.get(word[0], "")
+    for ch in word[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != last:
+            code += digit
+        if ch not in "hw":
+            last = digit
+    return (code + "000")[:4]
+
+
+def phonetic_keys(word: str) -> Tuple[str, ...]:
+    """Phonetic keys for a word: Double Metaphone primary/secondary, or Soundex."""
+    if METAPHONE_AVAILABLE:
+        return tuple(k for k in doublemetaphone(word) if k)
+    key = soundex(word)
+    return (key,) if key else ()
+
+
+def phrase_keys(phrase: str) -> List[str]:
+    """Every phonetic key combination for a multi-word phrase."""
+    keys = [""]
+    for word in phrase.split():
+        word_keys = phonetic_keys(word) or (word,)
+        keys = [f"{prefix} {k}".strip() for prefix in keys for k in word_keys]
+    return keys
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def similarity(a: str, b: str) -> float:
+    """1.0 for identical strings, falling towards 0.0 with edit distance."""
+    if not a or not b:
+        return 0.0
+    return 1.0 - levenshtein(a, b) / max(len(a), len(b))
+
+
+# =============================================================================
+# RESOLVER
+# =============================================================================
+
+@dataclass(frozen=True)
+class Resolution:
+    """Result of resolving a heard tractor mention."""
+    type_name: Optional[str]
+    brand: Optional[str]
+    confidence: float
+    method: str  # exact | alias | phonetic | edit_distance | brand_default
+
+
+@dataclass(frozen=True)
+class _Candidate:
+    phrase: str
+    kind: str  # "type" or "brand"
+    canonical: str
+    is_alias: bool
+
+
+class TypeResolver:
+    """Resolves free text to a catalog type and brand, precomputed over the catalog."""
+
+    def __init__(self, type_names: Iterable[str]):
+        type_names = list(type_names)
+        known_types = set(type_names)
+
+        candidates: List[_Candidate] = []
+        for name in type_names:
+            candidates.append(_Candidate(normalize_phrase(name), "type", name, False))
+        for phrase, name in TYPE_ALIASES.items():
+            if name in known_types:
+                candidates.append(_Candidate(phrase, "type", name, True))
+        for phrase, brand in BRAND_ALIASES.items():
+            candidates.append(_Candidate(phrase, "brand", brand, phrase != normalize_phrase(brand)))
+
+        self._known_types = known_types
+        self._exact: Dict[str, _Candidate] = {}
+        self._phonetic: Dict[str, List[_Candidate]] = {}
+        for candidate in candidates:
+            self._exact.setdefault(candidate.phrase, candidate)
+            for key in phrase_keys(candidate.phrase):
+                self._phonetic.setdefault(key, []).append(candidate)
+        self._type_candidates = [c for c in candidates if c.kind == "type"]
+        # Every word that can be part of a type or brand mention
+        self.vocabulary = frozenset(word for c in candidates for word in c.phrase.split())
+        self._max_words = max((len(c.phrase.split()) for c in candidates), default=1)
+
+    def resolve(self, text: str) -> Optional[Resolution]:
+        """Resolve a mention like "kubota compact" or "massey fergie"."""
+        words = normalize_phrase(text).split()
+        if not words:
+            return None
+
+        best: Dict[str, Tuple[float, str, str]] = {}  # kind -> (score, canonical, method)
+
+        def offer(kind: str, score: float, canonical: str, method: str) -> None:
+            if kind not in best or score > best[kind][0]:
+                best[kind] = (score, canonical, method)
+
+        for phrase in self._phrases(words):
+            candidate = self._exact.get(phrase)
+            if candidate:
+                offer(candidate.kind, 1.0, candidate.canonical, "alias" if candidate.is_alias else "exact")
+                continue
+            if len(phrase.replace(" ", "")) < 3:
+                continue
+            for key in phrase_keys(phrase):
+                for candidate in self._phonetic.get(key, ()):
+                    score = similarity(phrase, candidate.phrase)
+                    if score >= PHONETIC_MIN_SCORE:
+                        offer(candidate.kind, 0.5 + 0.45 * score, candidate.canonical, "phonetic")
+
+        if "type" not in best:
+            for phrase in self._phrases(words):
+                for candidate in self._type_candidates:
+                    score = similarity(phrase, candidate.phrase)
+                    if score >= EDIT_DISTANCE_MIN_SCORE:
+                        offer("type", 0.4 + 0.5 * score, candidate.canonical, "edit_distance")
+
+        brand = best.get("brand")
+        if "type" in best:
+            score, type_name, method = best["type"]
+            return Resolution(type_name, brand[1] if brand else None, score, method)
+        if brand:
+            default_type = BRAND_DEFAULT_TYPES.get(brand[1])
+            if default_type not in self._known_types:
+                default_type = None
+            return Resolution(default_type, brand[1], brand[0] * 0.7, "brand_default")
+        return None
+
+    def resolve_exact(self, text: str) -> Optional[Resolution]:
+        """Like resolve() but exact and alias matches only - cheap enough for whole sentences."""
+        type_match = brand_match = None
+        for phrase in self._phrases(normalize_phrase(text).split()):
+            candidate = self._exact.get(phrase)
+            if candidate is None:
+                continue
+            if candidate.kind == "type" and type_match is None:
+                type_match = candidate
+            elif candidate.kind == "brand" and brand_match is None:
+                brand_match = candidate
+        brand = brand_match.canonical if brand_match else None
+        if type_match:
+            return Resolution(type_match.canonical, brand, 1.0, "alias" if type_match.is_alias else "exact")
+        if brand:
+            default_type = BRAND_DEFAULT_TYPES.get(brand)
+            return Resolution(default_type if default_type in self._known_types else None, brand, 0.7, "brand_default")
+        return None
+
+    def _phrases(self, words: List[str]) -> Iterable[str]:
+        """Candidate n-grams, longest first, not starting or ending on a stopword."""
+        for n in range(min(self._max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                gram = words[i:i + n]
+                if gram[0] in STOPWORDS or gram[-1] in STOPWORDS:
+                    continue
+                yield " ".join(gram)
@@ -0,0 +1,285 @@
+"""
+Response cache for Tractor Insurance Agent (Tracker)
+
+Generic questions ("what does Premium cover?", "why are vintage tractors
+expensive?") are answered from a local cache instead of a full Gemini run.
+
+- Key: normalized prompt + the session state that can change the answer
+  (tractor type, age, modifications, last quoted plan)
+- Near-duplicates: MinHash signatures over content words, bucketed with LSH
+  and confirmed with exact Jaccard similarity. Type, brand and plan words
+  must match exactly: "premium cover on a kubota" never answers "premium
+  cover on a deere", however similar the rest of the prompt is
+- Bounded LRU with TTL, plus hit/miss/bypass counters
+- Bypass: context-dependent prompts ("yes", "what about that one"), prompts
+  carrying slot values (numbers), runs that changed session state through
+  tools, and responses that mention the user's or tractor's name
+"""
+
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart
+
+from .database import INSURANCE_PLANS, get_type_resolver
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "2000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MIN_SIMILARITY = float(os.environ.get("RESPONSE_CACHE_MIN_SIMILARITY", "0.75"))
+
+# Tools whose results depend only on the prompt and the keyed session state.
+# Quote tools are excluded: every quote must be recorded, so they always run.
+READ_ONLY_TOOLS = frozenset({
+    "show_all_plans",
+    "get_tractor_type_info",
+})
+
+# Words that make a prompt depend on the previous turn
+CONTEXTUAL_WORDS = frozenset({
+    "yes", "yeah", "yep", "no", "nope", "ok", "okay", "sure", "it", "that",
+    "this", "those", "them", "one", "again", "else", "more",
+})
+
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "um", "uh", "er", "please", "hey", "hi", "tracker",
+    "can", "could", "you", "tell", "me", "i", "would", "like", "to", "know",
+    "is", "are", "do", "does", "what", "whats", "s", "of", "for", "about",
+})
+
+MIN_PROMPT_WORDS = 3
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 16  # 2 rows per band
+
+_WORD = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (zlib.crc32(f"a{i}".encode()) | 1, zlib.crc32(f"b{i}".encode()))
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+
+def prompt_words(prompt: str) -> List[str]:
+    return _WORD.findall((prompt or "").lower().replace("'", ""))
+
+
+def content_words(words: List[str]) -> FrozenSet[str]:
+    return frozenset(w for w in words if w not in FILLER_WORDS)
+
+
+def minhash(tokens: FrozenSet[str]) -> Tuple[int, ...]:
+    """MinHash signature of a token set."""
+    hashes = [zlib.crc32(t.encode()) for t in tokens]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def lsh_buckets(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+PLAN_WORDS = frozenset(plan["type"] for plan in INSURANCE_PLANS)
+
+
+def key_vocabulary() -> FrozenSet[str]:
+    """Words that name a tractor type, brand or plan (current catalog snapshot)."""
+    return get_type_resolver().vocabulary | PLAN_WORDS
+
+
+def state_key(session_ctx: Any) -> Tuple:
+    """Session facts that can change an answer."""
+    if session_ctx is None:
+        return (None, None, False, None)
+    return (
+        session_ctx.tractor_type,
+        session_ctx.tractor_age,
+        session_ctx.has_modifications,
+        session_ctx.quoted_plan,
+    )
+
+
+def tool_names(messages: List[ModelMessage]) -> Set[str]:
+    return {
+        part.tool_name
+        for message in messages if isinstance(message, ModelResponse)
+        for part in message.parts if isinstance(part, ToolCallPart)
+    }
+
+
+class _CachedResponse:
+    __slots__ = ("text", "tokens", "buckets", "stored_at")
+
+    def __init__(self, text: str, tokens: FrozenSet[str], buckets: List[Tuple]):
+        self.text = text
+        self.tokens = tokens
+        self.buckets = buckets
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    """LRU + TTL cache of agent responses with MinHash near-duplicate lookup."""
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_SIZE,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        min_similarity: float = RESPONSE_CACHE_MIN_SIMILARITY,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+        vocabulary: Callable[[], FrozenSet[str]] = key_vocabulary,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_similarity = min_similarity
+        self.enabled = enabled
+        self.vocabulary = vocabulary
+
+        self._entries: "OrderedDict[Tuple, _CachedResponse]" = OrderedDict()
+        self._lsh: Dict[Tuple, Set[Tuple]] = {}
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cacheable_prompt(self, words: List[str]) -> bool:
+        if len(words) < MIN_PROMPT_WORDS:
+            return False
+        if any(w in CONTEXTUAL_WORDS or w.isdigit() for w in words):
+            return False
+        return bool(content_words(words))
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key)
+        for bucket in entry.buckets:
+            keys = self._lsh.get(bucket)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._lsh[bucket]
+
+    def _live(self, key: Tuple) -> Optional[_CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl_seconds:
+            self._remove(key)
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def lookup(self, prompt: str, session_ctx: Any = None) -> Optional[str]:
+        """Cached response for a prompt in this session state, if any."""
+        words = prompt_words(prompt)
+        if not self.enabled or not self._cacheable_prompt(words):
+            self.bypassed += 1
+            return None
+
+        state = state_key(session_ctx)
+        entry = self._live((" ".join(words), state))
+        if entry is not None:
+            self.exact_hits += 1
+            return entry.text
+
+        tokens = content_words(words)
+        candidates: Set[Tuple] = set()
+        for band, rows in lsh_buckets(minhash(tokens)):
+            candidates |= self._lsh.get((state, band, rows), set())
+
+        vocabulary = self.vocabulary() if candidates else frozenset()
+        key_words = tokens & vocabulary
+        best_key, best_score = None, self.min_similarity
+        for key in candidates:
+            candidate = self._entries.get(key)
+            if candidate is not None and candidate.tokens & vocabulary == key_words:
+                score = jaccard(tokens, candidate.tokens)
+                if score >= best_score:
+                    best_key, best_score = key, score
+        if best_key is not None:
+            entry = self._live(best_key)
+            if entry is not None:
+                self.near_hits += 1
+                return entry.text
+
+        self.misses += 1
+        return None
+
+    def store(
+        self,
+        prompt: str,
+        session_ctx: Any,
+        response_text: str,
+        new_messages: List[ModelMessage],
+        state: Optional[Tuple] = None,
+    ) -> bool:
+        """Cache a finished run's response if it is safe to reuse.
+
+        state should be the state_key taken before the run, the key lookup()
+        missed on. Only read-only tools ran, but another turn on the same
+        session may have changed its state in the meantime.
+        """
+        words = prompt_words(prompt)
+        if not self.enabled or not response_text or not self._cacheable_prompt(words):
+            return False
+
+        # Runs that changed session state, or personalised answers, are never reused
+        personal = [getattr(session_ctx, "user_name", None), getattr(session_ctx, "tractor_name", None)]
+        if not tool_names(new_messages) <= READ_ONLY_TOOLS or any(
+            name and name.lower() in response_text.lower() for name in personal
+        ):
+            self.rejected += 1
+            return False
+
+        if state is None:
+            state = state_key(session_ctx)
+        key = (" ".join(words), state)
+        if key in self._entries:
+            self._remove(key)
+        tokens = content_words(words)
+        buckets = [(state, band, rows) for band, rows in lsh_buckets(minhash(tokens))]
+        self._entries[key] = _CachedResponse(response_text, tokens, buckets)
+        for bucket in buckets:
+            self._lsh.setdefault(bucket, set()).add(key)
+        self.stores += 1
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._lsh.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,223 @@
+"""
+Fast-path router for Tractor Insurance Agent (Tracker)
+
+Slot-filling turns such as "it's 7 years old" or "it's a Kubota compact"
+only ever lead to confirm_tractor_age / confirm_tractor_type, which return
+templated text. The router extracts those slots locally (regex, number
+parsing and the catalog resolver) so the turn can be answered without a
+Gemini call. Anything it is not confident about - questions, negations,
+other intents, unexplained words - falls back to the agent.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .resolver import Resolution, TypeResolver
+
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MIN_CONFIDENCE = float(os.environ.get("FAST_PATH_MIN_CONFIDENCE", "0.85"))
+
+MAX_ROUTED_WORDS = 12
+MAX_AGE_YEARS = 80
+
+# Words that carry no slot information in a slot-filling answer
+FILLER_WORDS = frozenset({
+    "it", "its", "s", "is", "a", "an", "the", "my", "our", "i", "ive", "im",
+    "have", "has", "got", "own", "we", "weve", "he", "hes", "she", "shes", "about",
+    "around", "roughly", "approximately", "nearly", "almost", "just", "yes",
+    "yeah", "yep", "well", "um", "uh", "er", "so", "oh", "right", "ok", "okay",
+    "old", "thanks", "please",
+})
+
+# Nouns that refer to the machine without naming a type
+GENERIC_NOUNS = frozenset({"tractor", "machine", "one"})
+
+# Words that signal another intent or a statement the router must not guess at
+DEFER_WORDS = frozenset({
+    "not", "no", "dont", "doesnt", "isnt", "never", "but", "maybe", "think",
+    "quote", "price", "prices", "cost", "costs", "cheap", "cheaper", "cover",
+    "covered", "coverage", "plan", "plans", "premium", "insurance", "policy",
+    "modified", "modification", "modifications", "damage", "damaged",
+    "accident", "name", "named", "called", "call", "claim", "compare",
+    "sell", "sold", "want", "looking", "half", "few", "several", "over",
+    "under", "more", "less",
+})
+
+QUESTION_WORDS = frozenset({
+    "what", "whats", "how", "why", "which", "when", "where", "who", "can",
+    "could", "would", "should", "will", "do", "does", "did", "are", "is",
+})
+
+_UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80}
+
+_NUMBER = r"(\d{{1,2}}|(?:{tens})(?: (?:{units}))?|{units}|a couple of|a couple|a)".format(
+    tens="|".join(_TENS),
+    units="|".join(sorted(_UNITS, key=len, reverse=True)),
+)
+_AGE_YEARS = re.compile(rf"\b{_NUMBER} (?:years?|yrs?)(?: old)?\b")
+_AGE_MONTHS = re.compile(rf"\b{_NUMBER} months?(?: old)?\b")
+_MODEL_YEAR = re.compile(r"\b(?:(?:from|in|since|a|an) (19[5-9]\d|20\d\d)|(19[5-9]\d|20\d\d) model)\b")
+_BRAND_NEW = re.compile(r"\bbrand new\b")
+_BARE_NUMBER = re.compile(rf"^{_NUMBER}$")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def parse_number(text: str) -> Optional[int]:
+    """Parse "7", "seven", "twenty five" or "a couple of" into an int."""
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    if text in ("a", "an"):
+        return 1
+    if text.startswith("a couple"):
+        return 2
+    words = text.split()
+    if len(words) == 1:
+        return _UNITS.get(words[0], _TENS.get(words[0]))
+    if len(words) == 2 and words[0] in _TENS and words[1] in _UNITS and _UNITS[words[1]] < 10:
+        return _TENS[words[0]] + _UNITS[words[1]]
+    return None
+
+
+def normalize_utterance(text: str) -> str:
+    """Lowercase, drop apostrophes and fold punctuation/hyphens to spaces."""
+    return _NON_ALNUM.sub(" ", (text or "").lower().replace("'", "").replace("’", "")).strip()
+
+
+@dataclass(frozen=True)
+class Route:
+    """Slots extracted from a turn the fast path can answer."""
+    intent: str  # provide_age | provide_type | provide_type_and_age
+    confidence: float
+    age_years: Optional[int] = None
+    type_mention: Optional[str] = None
+    type_name: Optional[str] = None
+    brand: Optional[str] = None
+
+
+def _extract_age(text: str, awaiting_age: bool) -> Tuple[Optional[int], float, str]:
+    """(age, confidence, text with the age phrase removed)."""
+    for pattern, to_years, confidence in (
+        (_AGE_YEARS, lambda n: n, 0.95),
+        (_AGE_MONTHS, lambda n: n // 12, 0.95),
+    ):
+        matches = list(pattern.finditer(text))
+        if len(matches) == 1:
+            value = parse_number(matches[0].group(1))
+            if value is None:
+                return None, 0.0, text
+            return to_years(value), confidence, pattern.sub(" ", text)
+        if len(matches) > 1:
+            return None, 0.0, text
+
+    match = _MODEL_YEAR.search(text)
+    if match:
+        year = int(match.group(1) or match.group(2))
+        return time.localtime().tm_year - year, 0.9, _MODEL_YEAR.sub(" ", text)
+
+    if _BRAND_NEW.search(text):
+        return 0, 0.9, _BRAND_NEW.sub(" ", text)
+
+    # A bare number is only an age when the agent is waiting for one
+    if awaiting_age:
+        words = [w for w in text.split() if w not in FILLER_WORDS]
+        match = _BARE_NUMBER.match(" ".join(words))
+        if match:
+            value = parse_number(match.group(1))
+            if value is not None:
+                return value, 0.85, ""
+    return None, 0.0, text
+
+
+def route_utterance(
+    text: str,
+    resolver: TypeResolver,
+    session_ctx: Any = None,
+    min_confidence: float = FAST_PATH_MIN_CONFIDENCE,
+) -> Optional[Route]:
+    """Route a user turn to the fast path, or None to fall back to the agent."""
+    if not text or "?" in text:
+        return None
+    normalized = normalize_utterance(text)
+    words = normalized.split()
+    if not words or len(words) > MAX_ROUTED_WORDS:
+        return None
+    if words[0] in QUESTION_WORDS or any(w in DEFER_WORDS for w in words):
+        return None
+
+    awaiting_age = bool(
+        session_ctx is not None and session_ctx.tractor_type and session_ctx.tractor_age is None
+    )
+    age, age_confidence, rest = _extract_age(normalized, awaiting_age)
+    if age is not None and not 0 <= age <= MAX_AGE_YEARS:
+        return None
+
+    leftover = [w for w in rest.split() if w not in FILLER_WORDS]
+    mention = [w for w in leftover if w not in GENERIC_NOUNS]
+    resolution: Optional[Resolution] = None
+    if mention:
+        # Every remaining word must be part of a known type/brand phrase
+        if any(w not in resolver.vocabulary for w in leftover):
+            return None
+        resolution = resolver.resolve(" ".join(leftover))
+        if resolution is None or resolution.type_name is None:
+            return None
+
+    if age is not None and resolution is not None:
+        route = Route("provide_type_and_age", min(age_confidence, resolution.confidence), age,
+                      " ".join(leftover), resolution.type_name, resolution.brand)
+    elif age is not None:
+        route = Route("provide_age", age_confidence, age)
+    elif resolution is not None:
+        route = Route("provide_type", resolution.confidence, None,
+                      " ".join(leftover), resolution.type_name, resolution.brand)
+    else:
+        return None
+    return route if route.confidence >= min_confidence else None
+
+
+def next_question(session_ctx: Any) -> str:
+    """Follow-up for the next missing detail, in the system prompt's flow order."""
+    if not session_ctx.tractor_type:
+        return "What type of tractor is it?"
+    if session_ctx.tractor_age is None:
+        return "And how old is your machine?"
+    if not session_ctx.tractor_name:
+        return "Does it have a name or identifier?"
+    return "Any modifications or prior damage I should know about?"
+
+
+class RouterStats:
+    """Counters for /health."""
+
+    def __init__(self):
+        self.routed: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def record(self, route: Optional[Route]) -> None:
+        if route is None:
+            self.fallbacks += 1
+        else:
+            self.routed[route.intent] = self.routed.get(route.intent, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        routed = sum(self.routed.values())
+        total = routed + self.fallbacks
+        return {
+            "enabled": FAST_PATH_ENABLED,
+            "routed": dict(self.routed),
+            "fallbacks": self.fallbacks,
+            "routed_rate": round(routed / total, 4) if total else None,
+        }
+
+
+router_stats = RouterStats()
@@ -0,0 +1,395 @@
+"""
+Session state for Tractor Insurance Agent (Tracker)
+
+Every worker keeps SessionContexts in a local LRU with TTL. A pluggable
+backend shares them between workers and restarts:
+- memory:   local LRU only (single worker, nothing persisted)
+- sqlite:   a file shared by the workers on one host
+- postgres: the agent_sessions table (created by scripts/setup-puppy-db.js),
+            through the existing Database pool
+
+Handlers call load() before a turn (local hit, or read-through from the
+backend) and mark_dirty() after it. Dirty sessions are written back in
+batches by a background task and flushed on shutdown.
+
+If the backend read fails, the turn gets a context that is marked as not
+loaded: it is served for that turn but never written back (so a transient
+error cannot overwrite the stored session with a blank one), and the next
+load() reads the backend again.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+from .database import get_session_states, save_session_states, delete_expired_session_states
+from .history import dump_history, load_history
+from .logs import get_logger
+
+log = get_logger("sessions")
+
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_SQLITE_PATH = os.environ.get("SESSION_SQLITE_PATH", "sessions.db")
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "20000"))
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "7200"))
+SESSION_FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", "1.0"))
+SESSION_FLUSH_BATCH = int(os.environ.get("SESSION_FLUSH_BATCH", "200"))
+# Clean local copies are re-read from a shared backend after this long,
+# in case another worker has served the session meanwhile
+SESSION_REVALIDATE_SECONDS = float(os.environ.get("SESSION_REVALIDATE_SECONDS", "2.0"))
+
+
+@dataclass(slots=True)
+class SessionContext:
+    """Track conversation state per session."""
+    turns_since_name_used: int = 0
+    name_used_in_greeting: bool = False
+    greeted_this_session: bool = False
+    last_topic: str = ""
+    last_interaction_time: float = field(default_factory=time.time)
+
+    # User context
+    user_name: Optional[str] = None
+    context_fetched: bool = False
+
+    # Tractor context
+    tractor_name: Optional[str] = None
+    tractor_type: Optional[str] = None
+    tractor_brand: Optional[str] = None
+    tractor_age: Optional[int] = None
+    has_modifications: bool = False
+    quoted_plan: Optional[str] = None
+    # Set once the tractor has been queued for user_dogs
+    tractor_saved: bool = False
+
+    # Bounded pydantic-ai message history (see history.py)
+    message_history: List[Any] = field(default_factory=list)
+    history_dropped_turns: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data["message_history"] = dump_history(self.message_history)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionContext":
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in data.items() if k in known}
+        values["message_history"] = load_history(values.get("message_history") or [])
+        return cls(**values)
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class SessionBackend:
+    """Shared storage for serialized sessions. The base class stores nothing."""
+
+    shared = False
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    async def save_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        return None
+
+    async def purge_expired(self, ttl_seconds: float) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in a local SQLite file (WAL mode, safe across worker processes)."""
+
+    shared = True
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS agent_sessions (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM agent_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        now = time.time()
+        rows = [(session_id, json.dumps(data), now) for session_id, data in items]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("""
+                INSERT INTO agent_sessions (session_id, data, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+            """, rows)
+            self._conn.execute("COMMIT")
+
+    def _purge(self, ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM agent_sessions WHERE updated_at < ?", (time.time() - ttl_seconds,))
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._load, session_id)
+
+    async def save_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        await asyncio.to_thread(self._save_many, items)
+
+    async def purge_expired(self, ttl_seconds: float) -> None:
+        await asyncio.to_thread(self._purge, ttl_seconds)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PostgresSessionBackend(SessionBackend):
+    """Sessions in the agent_sessions table via the shared asyncpg pool."""
+
+    shared = True
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        states = await get_session_states([session_id])
+        return states.get(session_id)
+
+    async def save_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        await save_session_states(items)
+
+    async def purge_expired(self, ttl_seconds: float) -> None:
+        await delete_expired_session_states(ttl_seconds)
+
+
+def create_backend(name: str = SESSION_BACKEND) -> SessionBackend:
+    if name == "sqlite":
+        return SQLiteSessionBackend()
+    if name == "postgres":
+        return PostgresSessionBackend()
+    return SessionBackend()
+
+
+# =============================================================================
+# SESSION STORE
+# =============================================================================
+
+class _Entry:
+    __slots__ = ("ctx", "touched_at", "synced_at", "loaded")
+
+    def __init__(self, ctx: SessionContext, synced_at: float = 0.0, loaded: bool = True):
+        self.ctx = ctx
+        self.touched_at = time.monotonic()
+        self.synced_at = synced_at
+        # False when the backend read failed: never written back, re-read on next load()
+        self.loaded = loaded
+
+
+class SessionStore:
+    """Local LRU + TTL cache of SessionContexts with batched write-behind."""
+
+    def __init__(
+        self,
+        backend: SessionBackend,
+        max_sessions: int = SESSION_CACHE_SIZE,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        flush_interval: float = SESSION_FLUSH_INTERVAL,
+        flush_batch: int = SESSION_FLUSH_BATCH,
+    ):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._dirty: Dict[str, SessionContext] = {}
+        self._flush_needed = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.backend_loads = 0
+        self.load_errors = 0
+        self.unsaved = 0
+        self.evicted_size = 0
+        self.evicted_ttl = 0
+        self.flushes = 0
+        self.flushed_sessions = 0
+        self.flush_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, session_id: str) -> Optional[_Entry]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.touched_at > self.ttl_seconds:
+            del self._entries[session_id]
+            self.evicted_ttl += 1
+            return None
+        entry.touched_at = time.monotonic()
+        self._entries.move_to_end(session_id)
+        return entry
+
+    def _insert(self, session_id: str, entry: _Entry) -> None:
+        self._entries[session_id] = entry
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_sessions:
+            # Dirty sessions stay in _dirty until flushed, so nothing is lost
+            self._entries.popitem(last=False)
+            self.evicted_size += 1
+
+    def get(self, session_id: str) -> SessionContext:
+        """Get or create a session from the local cache (no backend I/O)."""
+        entry = self._lookup(session_id)
+        if entry is not None:
+            self.hits += 1
+            return entry.ctx
+        self.misses += 1
+        ctx = self._dirty.get(session_id) or SessionContext()
+        self._insert(session_id, _Entry(ctx))
+        return ctx
+
+    async def load(self, session_id: str) -> SessionContext:
+        """Get a session, reading through to the shared backend when needed."""
+        entry = self._lookup(session_id)
+        fresh = entry is not None and entry.loaded and (
+            not self.backend.shared
+            or session_id in self._dirty
+            or time.monotonic() - entry.synced_at < SESSION_REVALIDATE_SECONDS
+        )
+        if fresh:
+            self.hits += 1
+            return entry.ctx
+
+        self.misses += 1
+        if session_id in self._dirty:
+            ctx = self._dirty[session_id]
+        else:
+            try:
+                data = await self.backend.load(session_id)
+                self.backend_loads += 1
+            except Exception as e:
+                self.load_errors += 1
+                log.error("Error loading session %s: %s", session_id, e)
+                if entry is not None and entry.loaded:
+                    # Serve the last synced copy; synced_at is left as is, so
+                    # the next load() tries the backend again
+                    return entry.ctx
+                # Nothing known: a blank context for this turn only
+                ctx = entry.ctx if entry is not None else SessionContext()
+                self._insert(session_id, _Entry(ctx, loaded=False))
+                return ctx
+            if data is not None:
+                ctx = SessionContext.from_dict(data)
+            elif entry is not None:
+                ctx = entry.ctx
+            else:
+                ctx = SessionContext()
+
+        self._insert(session_id, _Entry(ctx, synced_at=time.monotonic()))
+        return ctx
+
+    def mark_dirty(self, session_id: str) -> None:
+        """Queue a session for write-behind after it has been modified."""
+        entry = self._entries.get(session_id)
+        if entry is None or not self.backend.shared:
+            return
+        if not entry.loaded:
+            # Would overwrite the stored session with one we failed to read
+            self.unsaved += 1
+            return
+        self._dirty[session_id] = entry.ctx
+        if len(self._dirty) >= self.flush_batch:
+            self._flush_needed.set()
+
+    async def flush(self) -> None:
+        """Write all dirty sessions to the backend in batches."""
+        while self._dirty:
+            batch = list(self._dirty.items())[:self.flush_batch]
+            for session_id, _ in batch:
+                del self._dirty[session_id]
+            try:
+                await self.backend.save_many([(sid, ctx.to_dict()) for sid, ctx in batch])
+                self.flushes += 1
+                self.flushed_sessions += len(batch)
+                now = time.monotonic()
+                for session_id, _ in batch:
+                    entry = self._entries.get(session_id)
+                    if entry is not None:
+                        entry.synced_at = now
+            except Exception as e:
+                self.flush_errors += 1
+                log.error("Error flushing %d sessions: %s", len(batch), e)
+                for session_id, ctx in batch:
+                    self._dirty.setdefault(session_id, ctx)
+                return
+
+    async def _flush_loop(self) -> None:
+        last_purge = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            await self.flush()
+            if time.monotonic() - last_purge > self.ttl_seconds / 4:
+                last_purge = time.monotonic()
+                try:
+                    await self.backend.purge_expired(self.ttl_seconds)
+                except Exception as e:
+                    log.error("Error purging expired sessions: %s", e)
+
+    async def start(self) -> None:
+        if self.backend.shared and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "sessions": len(self._entries),
+            "max_sessions": self.max_sessions,
+            "dirty": len(self._dirty),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "backend_loads": self.backend_loads,
+            "load_errors": self.load_errors,
+            "unsaved": self.unsaved,
+            "evicted_size": self.evicted_size,
+            "evicted_ttl": self.evicted_ttl,
+            "flushes": self.flushes,
+            "flushed_sessions": self.flushed_sessions,
+            "flush_errors": self.flush_errors,
+        }
+
+
+session_store = SessionStore(create_backend())
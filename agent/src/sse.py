@@ -0,0 +1,179 @@
+"""
+Streaming output stage for Tractor Insurance Agent (Tracker)
+
+Hume EVI starts synthesising speech from the first content chunk it receives
+and speaks each chunk as a unit, so token-sized chunks waste TTS start-ups
+and one long chunk delays the first audio. SentenceChunker buffers model
+deltas into sentence- or clause-sized chunks instead:
+- the first chunk is flushed early, at the first clause boundary after
+  SSE_FIRST_CHUNK_MIN_CHARS, or at a word boundary once SSE_FIRST_CHUNK_MS
+  has passed since the first token (checked as tokens arrive)
+- later chunks end at a sentence boundary, or at a clause boundary once they
+  are SSE_MAX_CHUNK_CHARS long
+
+CompletionChunks serialises chat.completion.chunk frames from a template
+built once per completion (one id and created timestamp), so each chunk only
+encodes its content string. JSON goes through orjson when it is installed.
+
+Per chunk, the time from its first token to its emission is recorded as the
+sse_chunk stage, and the first emitted chunk as ttft.
+
+Env: SSE_CHUNKING (default true; false streams model deltas as they arrive),
+SSE_FIRST_CHUNK_MIN_CHARS, SSE_FIRST_CHUNK_MS, SSE_MAX_CHUNK_CHARS.
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, AsyncGenerator, AsyncIterator, List, Optional
+
+from .tracing import record
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+SSE_CHUNKING = os.environ.get("SSE_CHUNKING", "true").lower() == "true"
+SSE_FIRST_CHUNK_MIN_CHARS = int(os.environ.get("SSE_FIRST_CHUNK_MIN_CHARS", "12"))
+SSE_FIRST_CHUNK_MS = float(os.environ.get("SSE_FIRST_CHUNK_MS", "150"))
+SSE_MAX_CHUNK_CHARS = int(os.environ.get("SSE_MAX_CHUNK_CHARS", "160"))
+
+COMPLETION_MODEL = "tracker-1.0"
+
+# Boundary = the punctuation plus the whitespace after it (the space stays
+# with the chunk so the concatenated transcript is unchanged)
+_SENTENCE_END = re.compile(r"[.!?](?:[\"')\]]*)\s+")
+_CLAUSE_END = re.compile(r"[,;:—](?:[\"')\]]*)\s+|\s[-–]\s")
+_WORD_END = re.compile(r"\s+")
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON, via orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+# =============================================================================
+# CHUNKING
+# =============================================================================
+
+def _last_boundary(pattern: "re.Pattern[str]", text: str, start: int = 0) -> int:
+    """End of the last boundary match in text[start:], or 0 if none."""
+    end = 0
+    for match in pattern.finditer(text, start):
+        end = match.end()
+    return end
+
+
+class SentenceChunker:
+    """Buffers text deltas into sentence- or clause-sized chunks."""
+
+    def __init__(
+        self,
+        first_min_chars: int = SSE_FIRST_CHUNK_MIN_CHARS,
+        first_max_ms: float = SSE_FIRST_CHUNK_MS,
+        max_chars: int = SSE_MAX_CHUNK_CHARS,
+    ):
+        self.first_min_chars = first_min_chars
+        self.first_max_seconds = first_max_ms / 1000
+        self.max_chars = max_chars
+        self.buffer = ""
+        self.emitted = 0
+        self.first_token_at: Optional[float] = None
+        # When the oldest buffered text arrived (per-chunk latency)
+        self.buffered_since: Optional[float] = None
+
+    def feed(self, delta: str, now: Optional[float] = None) -> List[str]:
+        """Add a delta; return the chunks that are ready to send."""
+        if not delta:
+            return []
+        now = time.perf_counter() if now is None else now
+        if self.first_token_at is None:
+            self.first_token_at = now
+        if not self.buffer:
+            self.buffered_since = now
+        self.buffer += delta
+
+        chunks = []
+        while True:
+            cut = self._cut(now)
+            if not cut:
+                break
+            chunks.append(self._take(cut, now))
+        return chunks
+
+    def flush(self, now: Optional[float] = None) -> List[str]:
+        """Whatever is left once the model has finished."""
+        if not self.buffer:
+            return []
+        return [self._take(len(self.buffer), time.perf_counter() if now is None else now)]
+
+    def _cut(self, now: float) -> int:
+        text = self.buffer
+        if self.emitted == 0:
+            # First chunk: get audio started as soon as there is a phrase to say
+            if len(text) >= self.first_min_chars:
+                cut = _last_boundary(_SENTENCE_END, text) or _last_boundary(_CLAUSE_END, text)
+                if cut:
+                    return cut
+            if now - self.first_token_at >= self.first_max_seconds:
+                return _last_boundary(_WORD_END, text)
+            return 0
+
+        cut = _last_boundary(_SENTENCE_END, text)
+        if cut:
+            return cut
+        if len(text) >= self.max_chars:
+            return _last_boundary(_CLAUSE_END, text) or _last_boundary(_WORD_END, text) or len(text)
+        return 0
+
+    def _take(self, cut: int, now: float) -> str:
+        chunk, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        if self.buffered_since is not None:
+            record("sse_chunk", "first" if self.emitted == 0 else "next", now - self.buffered_since)
+        self.emitted += 1
+        self.buffered_since = now if self.buffer else None
+        return chunk
+
+
+async def chunk_deltas(deltas: AsyncIterator[str], chunking: bool = SSE_CHUNKING) -> AsyncGenerator[str, None]:
+    """Re-chunk a stream of model deltas for TTS (pass-through when chunking is off)."""
+    if not chunking:
+        async for delta in deltas:
+            if delta:
+                yield delta
+        return
+    chunker = SentenceChunker()
+    async for delta in deltas:
+        for chunk in chunker.feed(delta):
+            yield chunk
+    for chunk in chunker.flush():
+        yield chunk
+
+
+# =============================================================================
+# CHAT COMPLETION FRAMES
+# =============================================================================
+
+class CompletionChunks:
+    """SSE frames for one streamed chat completion, from a pre-serialised template."""
+
+    def __init__(self, model: str = COMPLETION_MODEL):
+        self.id = f"chatcmpl-{uuid.uuid4()}"
+        head = dumps({"id": self.id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model})
+        # Everything around the content string, serialised once
+        self._prefix = 'data: ' + head[:-1] + ',"choices":[{"index":0,"delta":{"role":"assistant","content":'
+        self._suffix = '},"finish_reason":null}]}\n\n'
+        self._done = 'data: ' + head[:-1] + ',"choices":[{"index":0,"delta":{},"finish_reason":"stop"}]}\n\ndata: [DONE]\n\n'
+
+    def content(self, text: str) -> str:
+        return self._prefix + dumps(text) + self._suffix
+
+    def done(self) -> str:
+        """The finish_reason=stop frame followed by the [DONE] sentinel."""
+        return self._done
@@ -0,0 +1,290 @@
+"""
+Latency tracing for Tractor Insurance Agent (Tracker)
+
+Stages of a turn are timed with span(stage, name):
+- request / ttft  - whole HTTP turn and time to first token
+- llm             - each model request (TimedModel wraps the agent's model)
+- tool            - each agent tool (@traced_tool)
+- db_acquire      - waiting for a pool connection (get_connection)
+- db_query        - each registered query (queries.py)
+
+Every span feeds an in-process histogram per (stage, name), served in
+Prometheus text format at /metrics together with p50/p95/p99 over a recent
+window. Spans inside a request are also collected on a per-request trace so
+the request log line can say where the time went.
+
+If an OTLP endpoint is configured (OTEL_EXPORTER_OTLP_ENDPOINT) and the
+OpenTelemetry SDK and exporter are installed, every span is also exported as
+an OpenTelemetry span.
+"""
+
+import functools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from pydantic_ai.models import Model, infer_model
+from pydantic_ai.models.wrapper import WrapperModel
+
+from .logs import get_logger, request_id_var
+
+log = get_logger("tracing")
+
+try:
+    from opentelemetry import trace as otel_trace
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+OTEL_EXPORTER_OTLP_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+TRACE_QUANTILE_WINDOW = int(os.environ.get("TRACE_QUANTILE_WINDOW", "1024"))
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_tracer: Any = None
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+class LatencyHistogram:
+    """Cumulative bucket counts plus a window of recent samples for quantiles."""
+
+    def __init__(self, window: int = TRACE_QUANTILE_WINDOW):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self.recent:
+            return {}
+        ordered = sorted(self.recent)
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class StageMetrics:
+    """Latency histograms keyed by (stage, name)."""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def observe(self, stage: str, name: str, seconds: float) -> None:
+        series = self._series.get((stage, name))
+        if series is None:
+            series = self._series[(stage, name)] = LatencyHistogram()
+        series.observe(seconds)
+
+    def reset(self) -> None:
+        self._series.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage count and p50/p95/p99 in ms (all names of a stage merged)."""
+        merged: Dict[str, List[float]] = {}
+        counts: Dict[str, int] = {}
+        for (stage, _), series in self._series.items():
+            merged.setdefault(stage, []).extend(series.recent)
+            counts[stage] = counts.get(stage, 0) + series.count
+        result = {}
+        for stage, samples in merged.items():
+            samples.sort()
+            result[stage] = {"count": counts[stage]}
+            for q in QUANTILES:
+                result[stage][f"p{int(q * 100)}_ms"] = round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+        return result
+
+    def render_prometheus(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text exposition of every series, plus optional plain gauges."""
+        lines = [
+            "# HELP tracker_stage_duration_seconds Latency of each stage of a turn.",
+            "# TYPE tracker_stage_duration_seconds histogram",
+        ]
+        for (stage, name), series in sorted(self._series.items()):
+            labels = f'stage="{_escape(stage)}",name="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, series.bucket_counts):
+                cumulative += count
+                lines.append(f'tracker_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'tracker_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {series.count}')
+            lines.append(f"tracker_stage_duration_seconds_sum{{{labels}}} {series.sum:.6f}")
+            lines.append(f"tracker_stage_duration_seconds_count{{{labels}}} {series.count}")
+
+        lines += [
+            f"# HELP tracker_stage_duration_quantile_seconds Latency quantiles over the last {TRACE_QUANTILE_WINDOW} samples.",
+            "# TYPE tracker_stage_duration_quantile_seconds gauge",
+        ]
+        for (stage, name), series in sorted(self._series.items()):
+            labels = f'stage="{_escape(stage)}",name="{_escape(name)}"'
+            for q, value in series.quantiles().items():
+                lines.append(f'tracker_stage_duration_quantile_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+
+        for metric, value in (gauges or {}).items():
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_metrics = StageMetrics()
+
+
+# =============================================================================
+# PER-REQUEST TRACES
+# =============================================================================
+
+class RequestTrace:
+    """Spans recorded while handling one request."""
+
+    def __init__(self):
+        self.spans: List[Tuple[str, str, float]] = []
+
+    def add(self, stage: str, name: str, seconds: float) -> None:
+        self.spans.append((stage, name, seconds))
+
+    def breakdown(self) -> Dict[str, float]:
+        """Total ms per stage."""
+        totals: Dict[str, float] = {}
+        for stage, _, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+        return totals
+
+    def summary(self) -> str:
+        """e.g. "llm=812ms(2) tool=41ms(1) db_acquire=1ms(2) db_query=30ms(2)"."""
+        counts: Dict[str, int] = {}
+        for stage, _, _ in self.spans:
+            counts[stage] = counts.get(stage, 0) + 1
+        return " ".join(f"{stage}={ms:.0f}ms({counts[stage]})" for stage, ms in self.breakdown().items()) or "-"
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def start_trace() -> RequestTrace:
+    """Collect this request's spans (the context is copied into its tool and DB calls)."""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def record(stage: str, name: str, seconds: float) -> None:
+    """Record a measured duration without opening a span."""
+    stage_metrics.observe(stage, name, seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, name, seconds)
+
+
+@contextmanager
+def span(stage: str, name: str = "") -> Iterator[None]:
+    """Time a block as one stage of the current request."""
+    otel_span = None
+    if _tracer is not None:
+        otel_span = _tracer.start_as_current_span(
+            f"{stage} {name}".strip(),
+            attributes={"tracker.stage": stage, "tracker.name": name, "tracker.request_id": request_id_var.get()},
+        )
+        otel_span.__enter__()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, name, time.perf_counter() - started)
+        if otel_span is not None:
+            otel_span.__exit__(None, None, None)
+
+
+def traced_tool(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Time an agent tool; apply below @tracker_agent.tool (the signature is preserved)."""
+    @functools.wraps(function)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with span("tool", function.__name__):
+            return await function(*args, **kwargs)
+    return wrapper
+
+
+class TimedModel(WrapperModel):
+    """Wraps the agent's model to time each LLM request.
+
+    The wrapped model is resolved on first use, so importing the agent does
+    not need provider credentials.
+    """
+
+    def __init__(self, wrapped: Any):
+        Model.__init__(self)
+        self._wrapped_spec = wrapped
+        self._wrapped: Optional[Model] = None
+
+    def __repr__(self) -> str:
+        return f"TimedModel({self._wrapped_spec!r})"
+
+    @property
+    def wrapped(self) -> Model:
+        if self._wrapped is None:
+            self._wrapped = infer_model(self._wrapped_spec)
+        return self._wrapped
+
+    async def request(self, *args: Any, **kwargs: Any) -> Any:
+        with span("llm", self.model_name):
+            return await self.wrapped.request(*args, **kwargs)
+
+    @asynccontextmanager
+    async def request_stream(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        # Covers the whole stream: from sending the request to the last chunk consumed
+        with span("llm", self.model_name):
+            async with self.wrapped.request_stream(*args, **kwargs) as response_stream:
+                yield response_stream
+
+
+# =============================================================================
+# OPENTELEMETRY EXPORT
+# =============================================================================
+
+def configure_tracing() -> None:
+    """Export spans over OTLP when an endpoint is configured and the SDK is installed."""
+    global _tracer
+    if not OTEL_EXPORTER_OTLP_ENDPOINT or _tracer is not None:
+        return
+    if not OTEL_AVAILABLE:
+        log.warning("OTEL_EXPORTER_OTLP_ENDPOINT set but opentelemetry is not installed, export disabled")
+        return
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        log.warning("opentelemetry-sdk / OTLP exporter not installed, span export disabled")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": os.environ.get("OTEL_SERVICE_NAME", "tracker-agent")}))
+    # Batched in a background thread; the exporter reads the endpoint from the environment
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    otel_trace.set_tracer_provider(provider)
+    _tracer = otel_trace.get_tracer("tracker")
+    log.info("Exporting spans to %s", OTEL_EXPORTER_OTLP_ENDPOINT)
+
+
+def shutdown_tracing() -> None:
+    """Flush spans still waiting for export."""
+    if _tracer is not None:
+        provider = otel_trace.get_tracer_provider()
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()
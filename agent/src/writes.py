@@ -0,0 +1,221 @@
+"""
+Write-behind persistence for Tractor Insurance Agent (Tracker)
+
+Quotes and tractors are recorded from the voice path without waiting on the
+database: records are queued in memory and a background task inserts them in
+batches (one executemany per batch), flushing when a batch fills up or the
+flush interval passes. Failed batches are retried; queues are drained on
+shutdown.
+
+Queues are bounded. When one is full new records are dropped and counted -
+the depth, high-water mark and drop counters are exposed for /health so
+backpressure is visible before it costs data.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .database import (
+    get_tractor_type_by_name,
+    quote_record,
+    save_quotes,
+    save_user_tractors,
+)
+from .logs import get_logger
+
+log = get_logger("writes")
+
+WRITE_QUEUE_MAX = int(os.environ.get("WRITE_QUEUE_MAX", "10000"))
+WRITE_FLUSH_INTERVAL = float(os.environ.get("WRITE_FLUSH_INTERVAL", "1.0"))
+WRITE_FLUSH_BATCH = int(os.environ.get("WRITE_FLUSH_BATCH", "200"))
+WRITE_MAX_ATTEMPTS = int(os.environ.get("WRITE_MAX_ATTEMPTS", "5"))
+# Fraction of capacity at which a queue reports itself as saturated
+WRITE_SATURATION = 0.8
+
+
+class WriteBehindQueue:
+    """Bounded queue of insert records, written in batches by a background task."""
+
+    def __init__(
+        self,
+        name: str,
+        writer: Callable[[List[Tuple]], Awaitable[None]],
+        max_size: int = WRITE_QUEUE_MAX,
+        flush_interval: float = WRITE_FLUSH_INTERVAL,
+        flush_batch: int = WRITE_FLUSH_BATCH,
+        max_attempts: int = WRITE_MAX_ATTEMPTS,
+    ):
+        self.name = name
+        self.writer = writer
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_attempts = max_attempts
+
+        self._records: List[Tuple] = []
+        self._flush_needed = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._failed_attempts = 0
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+        self.high_water = 0
+        self.last_flush_ms: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def saturated(self) -> bool:
+        return len(self._records) >= self.max_size * WRITE_SATURATION
+
+    def submit(self, record: Tuple) -> bool:
+        """Queue a record without blocking; False if it was dropped because the queue is full."""
+        if len(self._records) >= self.max_size:
+            self.dropped += 1
+            self._flush_needed.set()
+            return False
+        self._records.append(record)
+        self.submitted += 1
+        self.high_water = max(self.high_water, len(self._records))
+        if len(self._records) >= self.flush_batch:
+            self._flush_needed.set()
+        return True
+
+    async def flush(self) -> bool:
+        """Write everything queued; False if a batch failed and was put back."""
+        async with self._flush_lock:
+            while self._records:
+                batch = self._records[:self.flush_batch]
+                del self._records[:len(batch)]
+                started = time.perf_counter()
+                try:
+                    await self.writer(batch)
+                except Exception as e:
+                    self._failed_attempts += 1
+                    if self._failed_attempts >= self.max_attempts:
+                        self.failed += len(batch)
+                        self._failed_attempts = 0
+                        log.error("Giving up on %d %s after %d attempts: %s",
+                                  len(batch), self.name, self.max_attempts, e)
+                        continue
+                    self.retries += 1
+                    log.warning("Error writing %d %s (attempt %d): %s",
+                                len(batch), self.name, self._failed_attempts, e)
+                    # Retry first, ahead of newer records
+                    self._records[:0] = batch
+                    return False
+                self._failed_attempts = 0
+                self.batches += 1
+                self.written += len(batch)
+                self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return True
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            if not await self.flush():
+                # Back off before retrying a failed batch
+                await asyncio.sleep(self.flush_interval * self._failed_attempts)
+
+    async def start(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the background task and drain the queue (retrying failed batches)."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        while self._records and not await self.flush():
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._records),
+            "max_size": self.max_size,
+            "saturated": self.saturated,
+            "high_water": self.high_water,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "last_flush_ms": round(self.last_flush_ms, 1) if self.last_flush_ms is not None else None,
+        }
+
+
+async def _write_user_tractors(rows: List[Tuple]) -> None:
+    """Fill in catalog type ids (once per distinct type name), then insert."""
+    type_ids: Dict[str, Optional[int]] = {}
+    for row in rows:
+        type_name = row[3]
+        if type_name not in type_ids:
+            tractor_type = await get_tractor_type_by_name(type_name)
+            type_ids[type_name] = tractor_type.get("id") if tractor_type else None
+    await save_user_tractors([
+        (user_id, name, type_ids[type_name], type_name, age, has_conditions, conditions)
+        for user_id, name, _, type_name, age, has_conditions, conditions in rows
+    ])
+
+
+quote_writes = WriteBehindQueue("quotes", save_quotes)
+tractor_writes = WriteBehindQueue("tractors", _write_user_tractors)
+
+
+def record_quote(
+    user_id: Optional[str],
+    session_id: str,
+    tractor_details: Dict[str, Any],
+    plan_type: str,
+    quoted_premium: float,
+    coverage_details: Dict[str, Any],
+) -> bool:
+    """Queue a quote for policy_quotes (same arguments as database.save_quote)."""
+    return quote_writes.submit(
+        quote_record(user_id, session_id, tractor_details, plan_type, quoted_premium, coverage_details)
+    )
+
+
+def record_user_tractor(
+    user_id: str,
+    tractor_name: str,
+    type_name: str,
+    age_years: int,
+    has_preexisting_conditions: bool = False,
+    preexisting_conditions: Optional[List[str]] = None,
+) -> bool:
+    """Queue a tractor for user_dogs (same arguments as database.save_user_tractor)."""
+    return tractor_writes.submit(
+        (user_id, tractor_name, None, type_name, age_years,
+         has_preexisting_conditions, preexisting_conditions or [])
+    )
+
+
+async def start_write_behind() -> None:
+    await quote_writes.start()
+    await tractor_writes.start()
+
+
+async def stop_write_behind() -> None:
+    await asyncio.gather(quote_writes.stop(), tractor_writes.stop())
+
+
+def write_behind_stats() -> Dict[str, Any]:
+    return {"quotes": quote_writes.stats(), "tractors": tractor_writes.stats()}
@@ -0,0 +1,8 @@
+"""Test configuration: the app is imported without credentials or external services."""
+
+import os
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("MEMORY_BACKEND", "none")
+os.environ.setdefault("SESSION_BACKEND", "memory")
@@ -0,0 +1,58 @@
+"""Admission control sheds model runs, never turns answered locally."""
+
+import asyncio
+
+import httpx
+from starlette.requests import ClientDisconnect
+
+from src import agent as agent_module
+from src.admission import AdmissionController, HeldStreamingResponse, llm_admission
+from src.agent import app
+
+
+async def _post_chat(content: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(
+            "/chat/completions",
+            json={"stream": False, "messages": [{"role": "user", "content": content}]},
+        )
+
+
+def test_saturated_agent_still_serves_local_replies(monkeypatch):
+    async def fast_path(user_message, ctx):
+        return "Local answer." if user_message == "fast" else None
+
+    monkeypatch.setattr(agent_module, "fast_path_reply", fast_path)
+    # Every slot taken and no room to queue
+    monkeypatch.setattr(llm_admission, "in_use", llm_admission.limit)
+    monkeypatch.setattr(llm_admission, "max_queue", 0)
+
+    local = asyncio.run(_post_chat("fast"))
+    assert local.status_code == 200
+    assert local.json()["choices"][0]["message"]["content"] == "Local answer."
+
+    shed = asyncio.run(_post_chat("something only the model can answer"))
+    assert shed.status_code == 503
+    assert "retry-after" in shed.headers
+
+
+def test_streamed_slot_released_when_client_is_gone_before_the_body():
+    controller = AdmissionController("test", limit=1, max_queue=0, max_wait=1.0)
+
+    async def body():
+        yield "never sent"
+
+    async def gone(message):
+        raise OSError("client went away")
+
+    async def scenario() -> None:
+        ticket = await controller.admit()
+        response = HeldStreamingResponse(body(), ticket=ticket, media_type="text/event-stream")
+        try:
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, gone)
+        except ClientDisconnect:
+            pass
+
+    asyncio.run(scenario())
+    assert controller.in_use == 0
@@ -0,0 +1,150 @@
+"""Only a signed identity token makes a caller a known user."""
+
+import asyncio
+import time
+from typing import List, Tuple
+
+import httpx
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from starlette.requests import Request
+
+from src import agent as agent_module
+from src import auth
+from src.agent import app, tracker_agent
+from src.auth import authenticated_user, sign_identity, split_session_id, verify_identity
+from src.sessions import session_store
+from src.writes import quote_writes, tractor_writes
+
+SECRET = "test-secret"
+
+
+def _request(headers=None) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": raw, "query_string": b""})
+
+
+def test_signed_token_round_trips():
+    assert verify_identity(sign_identity("user-1", secret=SECRET), secret=SECRET) == "user-1"
+
+
+def test_forged_expired_and_missing_tokens_are_anonymous():
+    token = sign_identity("user-1", secret=SECRET)
+    payload, signature = token.rsplit(".", 1)
+    forged = f"user-2.{payload.split('.', 1)[1]}.{signature}"
+    expired = sign_identity("user-1", ttl_seconds=-int(time.time()) - 1, secret=SECRET)
+    assert verify_identity(forged, secret=SECRET) is None
+    assert verify_identity(expired, secret=SECRET) is None
+    assert verify_identity(token, secret="other-secret") is None
+    assert verify_identity("user-1", secret=SECRET) is None
+    assert verify_identity(None, secret=SECRET) is None
+
+
+def test_request_identity_comes_from_the_token_only(monkeypatch):
+    monkeypatch.setattr(auth, "AGENT_AUTH_SECRET", SECRET)
+    token = sign_identity("user-1")
+    assert authenticated_user(_request({"Authorization": f"Bearer {token}"})) == "user-1"
+    assert split_session_id(f"Sam|user-1|{token}") == ("Sam|user-1", token)
+    assert authenticated_user(_request(), token) == "user-1"
+    # A bare claimed id, in the session id or anywhere else, is not an identity
+    assert split_session_id("Sam|user-2") == ("Sam|user-2", None)
+    assert authenticated_user(_request(), None) is None
+    assert authenticated_user(_request({"Authorization": "Bearer user-2"})) is None
+
+
+def _account_lookup(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+    returns = [p for m in messages for p in m.parts if isinstance(p, ToolReturnPart)]
+    if not returns:
+        return ModelResponse(parts=[ToolCallPart("get_my_account", {})])
+    return ModelResponse(parts=[TextPart(returns[0].content)])
+
+
+async def _post_copilotkit(body: dict) -> str:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/copilotkit", json=body)
+    return response.json()["messages"][0]["content"]
+
+
+def test_copilotkit_ignores_forwarded_user_id(monkeypatch):
+    monkeypatch.setattr(auth, "AGENT_AUTH_SECRET", SECRET)
+    monkeypatch.setattr(agent_module, "FAST_PATH_ENABLED", False)
+    body = {
+        "messages": [{"role": "user", "content": "What policies do I have on my account?"}],
+        "forwardedProps": {"user_id": "someone-else"},
+    }
+    with tracker_agent.override(model=FunctionModel(_account_lookup)):
+        reply = asyncio.run(_post_copilotkit(body))
+    assert "signed in" in reply
+
+
+def _compare_plans(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+    if not any(isinstance(p, ToolReturnPart) for m in messages for p in m.parts):
+        return ModelResponse(parts=[ToolCallPart("compare_insurance_plans", {})])
+    return ModelResponse(parts=[TextPart("Here are your prices.")])
+
+
+def _writes_queued(thread_id: str, headers: dict) -> Tuple[List[tuple], List[tuple]]:
+    """(quote records, tractor records) queued by one compare_insurance_plans turn."""
+    ctx = agent_module.get_session_context(f"copilotkit:{thread_id}")
+    ctx.tractor_type, ctx.tractor_age = "Farm Tractor", 5
+    quotes_before, tractors_before = len(quote_writes), len(tractor_writes)
+    body = {"threadId": thread_id, "messages": [{"role": "user", "content": "Compare the plans for me"}]}
+
+    async def post() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/copilotkit", json=body, headers=headers)
+
+    with tracker_agent.override(model=FunctionModel(_compare_plans)):
+        asyncio.run(post())
+    return quote_writes._records[quotes_before:], tractor_writes._records[tractors_before:]
+
+
+def test_anonymous_quotes_are_recorded_without_a_user(monkeypatch):
+    monkeypatch.setattr(auth, "AGENT_AUTH_SECRET", SECRET)
+    monkeypatch.setattr(agent_module, "FAST_PATH_ENABLED", False)
+
+    quotes, tractors = _writes_queued("test-writes-anonymous", {})
+    assert quotes and all(record[0] is None for record in quotes)
+    assert tractors == []
+
+    token = sign_identity("user-1")
+    quotes, tractors = _writes_queued("test-writes-signed-in", {"Authorization": f"Bearer {token}"})
+    assert quotes and all(record[0] == "user-1" for record in quotes)
+    assert [record[0] for record in tractors] == ["user-1"]
+
+
+def _greeting(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+    return ModelResponse(parts=[TextPart("Hello!")])
+
+
+def test_hume_session_key_never_carries_the_token(monkeypatch):
+    monkeypatch.setattr(auth, "AGENT_AUTH_SECRET", SECRET)
+    monkeypatch.setattr(agent_module, "FAST_PATH_ENABLED", False)
+    first, second = sign_identity("user-7"), sign_identity("user-7", ttl_seconds=999)
+    seen = []
+
+    async def post(token: str) -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post(
+                "/chat/completions",
+                params={"custom_session_id": f"Sam|user-7|{token}"},
+                json={"stream": False, "messages": [{"role": "user", "content": "hello there"}]},
+            )
+
+    original = agent_module.run_agent_turn
+
+    async def capture(prompt, deps, *args, **kwargs):
+        seen.append((deps.session_id, deps.user_id))
+        return await original(prompt, deps, *args, **kwargs)
+
+    monkeypatch.setattr(agent_module, "run_agent_turn", capture)
+    with tracker_agent.override(model=FunctionModel(_greeting)):
+        asyncio.run(post(first))
+        asyncio.run(post(second))
+
+    # Reissuing the token keeps the same session, and the token is stored nowhere
+    assert seen == [("Sam|user-7", "user-7"), ("Sam|user-7", "user-7")]
+    assert not any(first in key or second in key for key in session_store._entries)
@@ -0,0 +1,38 @@
+"""The in-process catalog answers lookups locally and backs off a failing database."""
+
+import asyncio
+
+from benchmarks.fakes import TRACTOR_TYPES
+from src.catalog import TractorTypeCatalog
+
+
+def test_lookups_and_misspelt_search():
+    catalog = TractorTypeCatalog(lambda: None)
+    catalog.load(TRACTOR_TYPES)
+
+    assert catalog.get("farm")["name"] == "Farm Tractor"
+    assert catalog.get("RIDE-ON mower")["name"] == "Ride-on Mower"
+    assert [t["name"] for t in catalog.search("tractor", limit=2)] == ["Compact Tractor", "Farm Tractor"]
+    # No substring match: ranked by trigram similarity
+    assert catalog.search("vintaje tracter")[0]["name"] == "Vintage Tractor"
+
+
+def test_failed_load_backs_off_before_retrying():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return [] if len(calls) == 1 else TRACTOR_TYPES
+
+    async def scenario() -> None:
+        catalog = TractorTypeCatalog(loader, retry_seconds=60)
+        assert not await catalog.ensure_loaded()
+        # Within the backoff window nothing touches the database
+        assert not await catalog.ensure_loaded()
+        assert len(calls) == 1
+
+        catalog._retry_at = 0.0
+        assert await catalog.ensure_loaded()
+        assert len(calls) == 2 and len(catalog) == len(TRACTOR_TYPES)
+
+    asyncio.run(scenario())
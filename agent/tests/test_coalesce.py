@@ -0,0 +1,92 @@
+"""@coalesce shares one in-flight call and isolates callers from each other."""
+
+import asyncio
+
+import pytest
+
+from src import database
+from src.database import coalesce
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(database, "DB_COALESCE", True)
+
+
+def _counted(fail: bool = False):
+    calls = []
+    release = asyncio.Event()
+
+    @coalesce()
+    async def read(key):
+        calls.append(key)
+        await release.wait()
+        if fail:
+            raise RuntimeError("database down")
+        return f"row {key}"
+
+    return read, calls, release
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        read, calls, release = _counted()
+        callers = [asyncio.create_task(read("a")) for _ in range(5)] + [asyncio.create_task(read("b"))]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*callers) == ["row a"] * 5 + ["row b"]
+        assert calls == ["a", "b"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_one_caller_does_not_cancel_the_others():
+    async def scenario():
+        read, calls, release = _counted()
+        first = asyncio.create_task(read("a"))
+        second = asyncio.create_task(read("a"))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == "row a"
+        assert first.cancelled()
+        assert calls == ["a"]
+
+    asyncio.run(scenario())
+
+
+def test_failure_reaches_every_caller_and_is_not_cached():
+    async def scenario():
+        read, calls, release = _counted(fail=True)
+        callers = [asyncio.create_task(read("a")) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        # The failed call is no longer in flight, so the next caller retries
+        with pytest.raises(RuntimeError):
+            await read("a")
+        assert calls == ["a", "a"]
+
+    asyncio.run(scenario())
+
+
+def test_call_with_every_caller_cancelled_still_completes(caplog):
+    async def scenario():
+        read, calls, release = _counted(fail=True)
+        caller = asyncio.create_task(read("a"))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        # Let the shared call finish on its own
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert calls == ["a"]
+        assert not database._inflight
+
+    asyncio.run(scenario())
+    assert "exception was never retrieved" not in caplog.text
@@ -0,0 +1,69 @@
+"""History trimming drops whole turns and never splits a tool call from its return."""
+
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from src.history import HISTORY_MAX_TURNS, history_for_run, record_run, trim_history
+from src.sessions import SessionContext
+
+
+def _turn(i: int, tool: bool):
+    """One user turn; tool turns call a tool and get its return before answering."""
+    messages = [ModelRequest(parts=[UserPromptPart(f"question {i} " + "words " * 20)])]
+    if tool:
+        call_id = f"call-{i}"
+        messages += [
+            ModelResponse(parts=[ToolCallPart("show_all_plans", {"detail": i}, tool_call_id=call_id)]),
+            ModelRequest(parts=[ToolReturnPart("show_all_plans", "plans " * 40, tool_call_id=call_id)]),
+        ]
+    messages.append(ModelResponse(parts=[TextPart(f"answer {i} " + "words " * 20)]))
+    return messages
+
+
+def _conversation(turns: int):
+    return [message for i in range(turns) for message in _turn(i, tool=i % 2 == 0)]
+
+
+def _tool_call_ids(messages, part_type):
+    return {part.tool_call_id for m in messages for part in m.parts if isinstance(part, part_type)}
+
+
+def test_trim_keeps_tool_calls_with_their_returns():
+    messages = _conversation(10)
+    for budget in range(50, 600, 25):
+        kept, dropped = trim_history(messages, token_budget=budget, max_turns=100)
+        assert dropped > 0
+        assert _tool_call_ids(kept, ToolCallPart) == _tool_call_ids(kept, ToolReturnPart)
+        # Kept history starts at a user turn and ends with the newest answer
+        assert isinstance(kept[0].parts[0], UserPromptPart)
+        assert kept[-1] is messages[-1]
+
+
+def test_newest_turn_is_kept_even_over_budget_and_max_turns_applies():
+    messages = _conversation(6)
+    kept, dropped = trim_history(messages, token_budget=1)
+    assert (len(kept), dropped) == (2, 5)
+
+    kept, dropped = trim_history(messages, token_budget=100_000, max_turns=3)
+    assert dropped == 3
+    assert kept[0].parts[0].content.startswith("question 3")
+
+
+def test_dropped_turns_are_summarised_from_session_facts():
+    ctx = SessionContext(user_name="Sam", tractor_type="Farm Tractor", tractor_age=7)
+    for i in range(HISTORY_MAX_TURNS + 2):
+        record_run(ctx, [ModelRequest(parts=[SystemPromptPart("instructions")]), *_turn(i, tool=True)])
+
+    assert ctx.history_dropped_turns > 0
+    assert not any(isinstance(p, SystemPromptPart) for m in ctx.message_history for p in m.parts)
+
+    summary = history_for_run(ctx)[0].parts[0]
+    assert isinstance(summary, SystemPromptPart)
+    assert "Sam" in summary.content and "Farm Tractor" in summary.content and "7 years old" in summary.content
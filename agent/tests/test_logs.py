@@ -0,0 +1,27 @@
+"""The queued log writer can be stopped and started again without losing records."""
+
+import logging
+import logging.handlers
+
+from src import logs
+
+
+def _queue_handlers(logger: logging.Logger):
+    return [h for h in logger.handlers if isinstance(h, logging.handlers.QueueHandler)]
+
+
+def test_stop_logging_detaches_the_queue_and_configure_restarts_it(capsys):
+    tracker = logging.getLogger("tracker")
+    logs.configure_logging()
+    try:
+        logs.stop_logging()
+        assert _queue_handlers(tracker) == []
+        assert tracker.propagate
+
+        logs.configure_logging()
+        assert len(_queue_handlers(tracker)) == 1
+        logs.get_logger("test").warning("after restart")
+        logs.stop_logging()
+        assert "after restart" in capsys.readouterr().err
+    finally:
+        logs.configure_logging()
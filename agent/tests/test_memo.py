@@ -0,0 +1,97 @@
+"""RequestMemo runs each lookup once per request and never keeps a failure."""
+
+import asyncio
+
+import pytest
+
+from src.memo import RequestMemo
+
+
+def test_concurrent_calls_share_one_lookup():
+    async def scenario():
+        memo = RequestMemo()
+        calls = []
+        release = asyncio.Event()
+
+        async def lookup():
+            calls.append(1)
+            await release.wait()
+            return "row"
+
+        callers = [asyncio.create_task(memo.call("key", lookup)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*callers) == ["row"] * 3
+        # A later call in the same request reuses the stored result
+        assert await memo.call("key", lookup) == "row"
+        assert len(calls) == 1
+        assert (memo.calls, memo.executed, memo.saved) == (4, 1, 3)
+        memo.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_lookup_is_evicted_and_retried():
+    async def scenario():
+        memo = RequestMemo()
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("pool exhausted")
+            return "row"
+
+        with pytest.raises(ConnectionError):
+            await memo.call("key", flaky)
+        assert await memo.call("key", flaky) == "row"
+        assert len(attempts) == 2
+        memo.close()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_leaves_the_lookup_running_for_others():
+    async def scenario():
+        memo = RequestMemo()
+        release = asyncio.Event()
+
+        async def lookup():
+            await release.wait()
+            return "row"
+
+        first = asyncio.create_task(memo.call("key", lookup))
+        second = asyncio.create_task(memo.call("key", lookup))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == "row"
+        assert memo.executed == 1
+        memo.close()
+
+    asyncio.run(scenario())
+
+
+def test_prefetch_is_used_or_counted_as_wasted_and_cancelled_on_close():
+    async def scenario():
+        memo = RequestMemo()
+        never = asyncio.Event()
+
+        async def value(v):
+            return v
+
+        async def slow():
+            await never.wait()
+
+        memo.start("used", value("prefetched"))
+        memo.start("unused", slow())
+        assert await memo.call("used", lambda: value("fetched again")) == "prefetched"
+        assert (memo.executed, memo.prefetch_used, memo.saved) == (0, 1, 0)
+
+        unused = memo._entries["unused"]
+        memo.close()
+        await asyncio.sleep(0)
+        assert unused.cancelled()
+
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+"""User memory never holds up a turn and writes turns in batches."""
+
+import asyncio
+
+from src.memory import LocalMemoryBackend, UserMemory
+
+
+def test_context_is_cached_per_user():
+    async def scenario():
+        backend = LocalMemoryBackend()
+        backend.remember("user-1", "Owns a 1962 Ford")
+        memory = UserMemory(backend)
+
+        assert await memory.get_context("user-1") == "- Owns a 1962 Ford"
+        assert await memory.get_context("user-1") == "- Owns a 1962 Ford"
+        assert backend.searches == 1
+        # Anonymous callers have no memory
+        assert await memory.get_context(None) is None
+
+    asyncio.run(scenario())
+
+
+def test_slow_fetch_is_not_awaited_past_the_budget_but_fills_the_cache():
+    async def scenario():
+        backend = LocalMemoryBackend(latency_seconds=0.05)
+        backend.remember("user-1", "Prefers the Premium plan")
+        memory = UserMemory(backend)
+
+        assert await memory.get_context("user-1", budget_seconds=0.001) is None
+        assert memory.late == 1
+        await asyncio.sleep(0.1)
+        assert await memory.get_context("user-1", budget_seconds=0.001) == "- Prefers the Premium plan"
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_keeps_serving_the_stale_context():
+    async def scenario():
+        backend = LocalMemoryBackend()
+        backend.remember("user-1", "Tractor is called Old Red")
+        memory = UserMemory(backend, ttl_seconds=0)
+        assert await memory.get_context("user-1") == "- Tractor is called Old Red"
+
+        async def down(user_id):
+            raise ConnectionError("zep unavailable")
+
+        backend.search_facts = down
+        memory.prefetch("user-1")
+        await asyncio.sleep(0)
+        assert memory.fetch_errors == 1
+        assert memory._cache["user-1"][1] == "- Tractor is called Old Red"
+
+    asyncio.run(scenario())
+
+
+def test_turns_are_queued_and_written_in_batches_per_thread():
+    async def scenario():
+        backend = LocalMemoryBackend()
+        memory = UserMemory(backend, flush_batch=10, max_pending=3)
+        calls = []
+        original = backend.add_turns
+
+        async def add_turns(user_id, thread_id, turns):
+            calls.append((user_id, thread_id, len(turns)))
+            await original(user_id, thread_id, turns)
+
+        backend.add_turns = add_turns
+        memory.record_turn(None, "anon", None, "hi", "hello")
+        for i in range(4):
+            memory.record_turn("user-1", "thread-a" if i < 3 else "thread-b", "Sam", f"q{i}", f"a{i}")
+
+        # Over max_pending the oldest turn is dropped; the anonymous one was never queued
+        assert (memory.queued_turns, memory.dropped_turns) == (4, 1)
+        await memory.flush()
+        assert sorted(calls) == [("user-1", "thread-a", 2), ("user-1", "thread-b", 1)]
+        assert [turn.user_text for turn in backend.turns if turn.thread_id == "thread-a"] == ["q1", "q2"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+"""The connection pool is created once, warmed at startup and reported on /health."""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeDatabase, FakePool
+from src import database, queries
+from src.database import Database, get_connection
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    db = FakeDatabase()
+    created = []
+
+    async def create_pool(dsn, **options):
+        created.append(options)
+        await asyncio.sleep(0.01)  # long enough for concurrent callers to pile up
+        return FakePool(db, max_size=options["max_size"], query_latency=0)
+
+    monkeypatch.setattr(database.asyncpg, "create_pool", create_pool)
+    monkeypatch.setattr(Database, "_pool", None)
+    monkeypatch.setattr(Database, "_pool_lock", None)
+    return db, created
+
+
+def test_concurrent_first_requests_share_one_pool(fake_pool):
+    db, created = fake_pool
+
+    async def scenario():
+        pools = await asyncio.gather(*(Database.get_pool() for _ in range(5)))
+        assert all(pool is pools[0] for pool in pools)
+
+    asyncio.run(scenario())
+    assert len(created) == 1
+    options = created[0]
+    assert (options["min_size"], options["max_size"]) == (database.DB_POOL_MIN_SIZE, database.DB_POOL_MAX_SIZE)
+    # Prepared-statement registry unless PgBouncer-safe mode is on
+    assert options["init"] is queries.prepare_connection
+
+
+def test_warm_pings_min_size_connections_and_stats_report_usage(fake_pool, monkeypatch):
+    db, _ = fake_pool
+    monkeypatch.setattr(database, "DB_POOL_MIN_SIZE", 3)
+
+    async def scenario():
+        await Database.warm()
+        assert db.queries["select"] == 3
+        async with get_connection():
+            stats = Database.stats()
+            assert stats["open"] and stats["in_use"] == 1
+            assert stats["saturation"] == round(1 / stats["max_size"], 4)
+
+    asyncio.run(scenario())
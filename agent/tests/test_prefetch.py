@@ -0,0 +1,82 @@
+"""speculate() starts the lookups a turn's tools will ask for, under the same memo keys."""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import TRACTOR_TYPES
+from src import database, prefetch
+from src.catalog import TractorTypeCatalog
+from src.memo import RequestMemo, memo_stats, quote_key, tractor_type_key
+from src.prefetch import speculate
+from src.sessions import SessionContext
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    catalog = TractorTypeCatalog(lambda: None)
+    catalog.load(TRACTOR_TYPES)
+    monkeypatch.setattr(database, "tractor_catalog", catalog)
+    monkeypatch.setattr(database, "_type_resolver", None)
+    monkeypatch.setattr(database, "_type_resolver_version", -1)
+    monkeypatch.setattr(prefetch, "PREFETCH_ENABLED", True)
+
+
+async def _speculate(message, ctx):
+    memo = RequestMemo()
+    speculate(memo, message, ctx)
+    await asyncio.gather(*memo._background)
+    return memo
+
+
+def test_mentioned_type_and_plan_are_prefetched_and_used_by_the_tools():
+    async def scenario():
+        ctx = SessionContext(tractor_type="Farm Tractor", tractor_age=7)
+        memo = await _speculate("how much is premium for a kubota compact?", ctx)
+        assert set(memo._entries) == {
+            tractor_type_key("Compact Tractor"),
+            tractor_type_key("Farm Tractor"),
+            quote_key("Compact Tractor", 7, "premium", False),
+        }
+
+        tractor_type, quote = await memo.quote("Compact Tractor", 7, "premium", False)
+        assert tractor_type["name"] == "Compact Tractor"
+        assert quote["monthly_premium"] == database.calculate_quote(tractor_type, 7, "premium")["monthly_premium"]
+        # The quote and the type row it prices from were both prefetched
+        assert (memo.executed, memo.prefetch_used) == (0, 2)
+        # The session's old type was never asked for
+        wasted = memo_stats.prefetch_wasted
+        memo.close()
+        assert memo_stats.prefetch_wasted == wasted + 1
+
+    asyncio.run(scenario())
+
+
+def test_price_question_without_a_plan_prefetches_the_default_plan():
+    async def scenario():
+        ctx = SessionContext(tractor_type="Compact Tractor", tractor_age=3)
+        memo = await _speculate("what would it cost?", ctx)
+        assert quote_key("Compact Tractor", 3, database.DEFAULT_PLAN_TYPE, False) in memo._entries
+        memo.close()
+
+    asyncio.run(scenario())
+
+
+def test_nothing_is_priced_until_the_session_knows_the_age():
+    async def scenario():
+        memo = await _speculate("premium for a kubota compact please", SessionContext())
+        assert set(memo._entries) == {tractor_type_key("Compact Tractor")}
+        memo.close()
+
+    asyncio.run(scenario())
+
+
+def test_disabled_prefetch_starts_nothing(monkeypatch):
+    monkeypatch.setattr(prefetch, "PREFETCH_ENABLED", False)
+
+    async def scenario():
+        memo = RequestMemo()
+        speculate(memo, "premium for a kubota compact", SessionContext(tractor_age=7))
+        assert memo._background == [] and memo._entries == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,138 @@
+"""Batch pricing matches calculate_quote row for row."""
+
+import asyncio
+import random
+from typing import List
+
+import httpx
+import numpy as np
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from benchmarks.fakes import TRACTOR_TYPES
+from src import agent as agent_module
+from src import database
+from src.catalog import TractorTypeCatalog
+from src.database import calculate_quote
+from src.pricing import PLAN_TYPES, compare_plans, quote_batch, reprice_portfolio, round_2dp, type_multiplier
+from src.writes import quote_writes
+
+
+def test_round_2dp_matches_round_on_half_cent_ties():
+    # x.xx5 values sit on (or within float error of) a tie; round() decides
+    # by the exact binary value, e.g. 2.675 -> 2.67 but 0.125 -> 0.12
+    values = [k / 1000 for k in range(5, 200_000, 10)] + [2.675, 1.005, 0.125, 0.135, 1234.565]
+    expected = [round(v, 2) for v in values]
+    assert round_2dp(np.array(values)).tolist() == expected
+
+
+def test_quote_batch_matches_calculate_quote_on_random_rows():
+    rng = random.Random(7)
+    tractor_types = TRACTOR_TYPES + [{"id": 91, "name": "Odd", "base_premium_multiplier": 1.137}]
+    rows = [
+        (
+            rng.choice(tractor_types),
+            rng.choice([rng.randint(-1, 40), round(rng.uniform(0, 20), 1)]),
+            rng.choice(PLAN_TYPES + ["unknown"]),
+            rng.random() < 0.5,
+        )
+        for _ in range(5000)
+    ]
+
+    batch = quote_batch(
+        [type_multiplier(t) for t, *_ in rows],
+        [age for _, age, _, _ in rows],
+        [plan for _, _, plan, _ in rows],
+        [flag for *_, flag in rows],
+    )
+
+    for i, row in enumerate(rows):
+        expected = calculate_quote(*row)
+        assert batch["monthly_premium"][i] == expected["monthly_premium"], row
+        assert batch["annual_premium"][i] == expected["annual_premium"], row
+        assert batch["age_adjustment"][i] == expected["factors"]["age_adjustment"], row
+
+
+def test_reprice_portfolio_matches_types_by_id_then_name():
+    by_id, by_name = TRACTOR_TYPES[0], TRACTOR_TYPES[1]
+    policies = [
+        {"policy_id": 1, "type_id": by_id["id"], "type_name": "stale name", "age_years": 3,
+         "plan_type": "premium", "monthly_premium": 10, "has_preexisting_conditions": True},
+        {"policy_id": 2, "type_id": None, "type_name": by_name["name"].upper(), "age_years": 12,
+         "plan_type": None, "monthly_premium": None, "has_preexisting_conditions": False},
+    ]
+
+    quotes = reprice_portfolio(policies, TRACTOR_TYPES)
+
+    first = calculate_quote(by_id, 3, "premium", True)["monthly_premium"]
+    second = calculate_quote(by_name, 12, "standard", False)["monthly_premium"]
+    assert quotes["policy_id"].tolist() == [1, 2]
+    assert quotes["monthly_premium"].tolist() == [first, second]
+    assert quotes["monthly_change"].tolist() == [round(first - 10, 2), second]
+
+
+def test_batch_endpoint_rejects_unknown_types(monkeypatch):
+    catalog = {t["name"].lower(): t for t in TRACTOR_TYPES}
+
+    async def by_name(name):
+        return catalog.get(name.lower())
+
+    monkeypatch.setattr(agent_module, "get_tractor_type_by_name", by_name)
+
+    async def post(type_names):
+        transport = httpx.ASGITransport(app=agent_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/quotes/batch", json={"type_names": type_names, "ages": [3] * len(type_names)})
+
+    known = TRACTOR_TYPES[0]["name"]
+    rejected = asyncio.run(post([known, "Tracter X", "Zzz", "Tracter X"]))
+    assert rejected.status_code == 400
+    assert rejected.json()["unknown_types"] == ["Tracter X", "Zzz"]
+
+    priced = asyncio.run(post([known]))
+    assert priced.status_code == 200
+    assert priced.json()["quotes"]["type_name"] == [known]
+    assert priced.json()["quotes"]["monthly_premium"] == [calculate_quote(TRACTOR_TYPES[0], 3)["monthly_premium"]]
+
+
+def test_compare_plans_prices_every_plan_like_calculate_quote():
+    tractor_type = TRACTOR_TYPES[1]
+    rows = compare_plans(tractor_type, 12, True)
+    assert [row["plan_type"] for row in rows] == PLAN_TYPES
+    for row in rows:
+        expected = calculate_quote(tractor_type, 12, row["plan_type"], True)
+        assert (row["monthly_premium"], row["annual_premium"]) == (
+            expected["monthly_premium"], expected["annual_premium"])
+
+
+def _compare_turn(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+    if not any(isinstance(p, ToolReturnPart) for m in messages for p in m.parts):
+        return ModelResponse(parts=[ToolCallPart("compare_insurance_plans", {})])
+    return ModelResponse(parts=[TextPart("Here are your prices.")])
+
+
+def test_compare_tool_quotes_every_plan_in_one_call(monkeypatch):
+    catalog = TractorTypeCatalog(lambda: None)
+    catalog.load(TRACTOR_TYPES)
+    monkeypatch.setattr(database, "tractor_catalog", catalog)
+    monkeypatch.setattr(database, "_type_resolver", None)
+    monkeypatch.setattr(database, "_type_resolver_version", -1)
+    monkeypatch.setattr(agent_module, "FAST_PATH_ENABLED", False)
+
+    ctx = agent_module.get_session_context("copilotkit:test-compare")
+    ctx.tractor_type, ctx.tractor_age = "Vintage Tractor", 20
+    before = len(quote_writes)
+
+    async def post():
+        transport = httpx.ASGITransport(app=agent_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"threadId": "test-compare", "messages": [{"role": "user", "content": "Compare the plans"}]}
+            return await client.post("/copilotkit", json=body)
+
+    with agent_module.tracker_agent.override(model=FunctionModel(_compare_turn)):
+        assert asyncio.run(post()).status_code == 200
+
+    # quotes.insert parameters: (user_id, session_id, details, plan_type, premium, coverage, valid_until)
+    quoted = {record[3]: record[4] for record in quote_writes._records[before:]}
+    vintage = TRACTOR_TYPES[1]
+    assert quoted == {plan: calculate_quote(vintage, 20, plan)["monthly_premium"] for plan in PLAN_TYPES}
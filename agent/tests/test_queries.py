@@ -0,0 +1,71 @@
+"""Registered queries reuse prepared statements, or none at all behind PgBouncer."""
+
+import asyncio
+
+import asyncpg
+import pytest
+
+from src import queries
+
+QUERY = "policies.by_user"
+
+
+class _Statement:
+    def __init__(self, conn: "_Connection", failures: int = 0):
+        self.conn = conn
+        self.failures = failures
+
+    async def fetch(self, *args):
+        self.conn.calls.append(("statement.fetch", args))
+        if self.failures:
+            self.failures -= 1
+            raise asyncpg.exceptions.InvalidCachedStatementError("cached statement plan is invalid")
+        return [{"id": 1}]
+
+
+class _Connection:
+    """Stands in for queries.RegistryConnection."""
+
+    def __init__(self, failing_statements: int = 0):
+        self.registry_statements = {}
+        self.calls = []
+        # The first N statements prepared fail their first fetch
+        self.failing_statements = failing_statements
+
+    async def prepare(self, sql):
+        self.calls.append(("prepare", sql))
+        failures = 1 if self.failing_statements else 0
+        self.failing_statements = max(self.failing_statements - 1, 0)
+        return _Statement(self, failures)
+
+    async def fetch(self, sql, *args):
+        self.calls.append(("conn.fetch", args))
+        return [{"id": 1}]
+
+
+def test_statement_is_prepared_once_and_reused():
+    conn = _Connection()
+    for _ in range(3):
+        assert asyncio.run(queries.fetch(conn, QUERY, "user-1")) == [{"id": 1}]
+    assert [name for name, _ in conn.calls].count("prepare") == 1
+
+
+def test_invalidated_statement_is_prepared_again_once():
+    conn = _Connection(failing_statements=1)
+    assert asyncio.run(queries.fetch(conn, QUERY, "user-1")) == [{"id": 1}]
+    assert [name for name, _ in conn.calls] == ["prepare", "statement.fetch", "prepare", "statement.fetch"]
+
+    # A second failure in a row is raised, not retried again
+    conn = _Connection(failing_statements=2)
+    with pytest.raises(asyncpg.exceptions.InvalidCachedStatementError):
+        asyncio.run(queries.fetch(conn, QUERY, "user-1"))
+    assert [name for name, _ in conn.calls].count("prepare") == 2
+
+
+def test_pgbouncer_safe_mode_never_prepares(monkeypatch):
+    monkeypatch.setattr(queries, "DB_PGBOUNCER_SAFE", True)
+    conn = _Connection()
+    assert asyncio.run(queries.fetch(conn, QUERY, "user-1")) == [{"id": 1}]
+    assert conn.calls == [("conn.fetch", ("user-1",))]
+    assert conn.registry_statements == {}
+    assert queries.pool_options() == {"statement_cache_size": 0}
@@ -0,0 +1,35 @@
+"""The compiled rating table prices exactly as calculate_quote does."""
+
+import json
+
+from benchmarks.fakes import TRACTOR_TYPES
+from src.database import calculate_quote
+from src.rating import RatingTable, compile_rating_table, verify_parity
+
+# Catalog rows plus the edge cases calculate_quote handles: no multiplier
+# and a fractional one
+CATALOG = TRACTOR_TYPES + [
+    {"id": 90, "name": "Unrated Tractor", "risk_category": "medium"},
+    {"id": 91, "name": "Odd Multiplier", "risk_category": "low", "base_premium_multiplier": 1.137},
+]
+
+
+def test_compiled_table_matches_calculate_quote():
+    table = compile_rating_table(CATALOG)
+    assert verify_parity(table, CATALOG) == []
+
+
+def test_stored_table_matches_calculate_quote():
+    # The file / rating_tables form, as loaded in production
+    payload = json.loads(json.dumps(compile_rating_table(CATALOG).to_payload()))
+    assert verify_parity(RatingTable.from_payload(payload), CATALOG) == []
+
+
+def test_fractional_ages_match_calculate_quote():
+    # calculate_quote compares the age as given, so 2.5 is past the "new" band
+    table = compile_rating_table(CATALOG)
+    tractor_type = CATALOG[0]
+    for age in (1.5, 2.0, 2.5, 4.99, 5.0, 9.5, 14.99, 15.5):
+        expected = calculate_quote(tractor_type, age, "premium", True)
+        assert table.lookup(tractor_type["id"], age, "premium", True) == (
+            expected["monthly_premium"], expected["annual_premium"]), age
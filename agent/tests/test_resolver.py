@@ -0,0 +1,60 @@
+"""Misheard tractor types and brands resolve to the catalog locally."""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import TRACTOR_TYPES
+from src import database, resolver
+from src.catalog import TractorTypeCatalog
+from src.resolver import TypeResolver
+
+# (heard, type, brand, method) - the mishearings the resolver documents
+MISHEARINGS = [
+    ("cabota", "Compact Tractor", "Kubota", "brand_default"),
+    ("massey fergie", "Farm Tractor", "Massey Ferguson", "brand_default"),
+    ("my jon deere is old", "Farm Tractor", "John Deere", "brand_default"),
+    ("sit on", "Ride-on Mower", None, "alias"),
+    ("kubota compact", "Compact Tractor", "Kubota", "alias"),
+    ("it is a farm tractor", "Farm Tractor", None, "exact"),
+    ("vintij tractor", "Vintage Tractor", None, "phonetic"),
+    ("ridon mower", "Ride-on Mower", None, "edit_distance"),
+]
+
+
+@pytest.fixture(params=[True, False], ids=["metaphone", "soundex"])
+def type_resolver(request, monkeypatch):
+    if request.param and not resolver.METAPHONE_AVAILABLE:
+        pytest.skip("metaphone not installed")
+    monkeypatch.setattr(resolver, "METAPHONE_AVAILABLE", request.param)
+    return TypeResolver(t["name"] for t in TRACTOR_TYPES)
+
+
+@pytest.mark.parametrize("heard, type_name, brand, method", MISHEARINGS)
+def test_documented_mishearings(type_resolver, heard, type_name, brand, method):
+    resolution = type_resolver.resolve(heard)
+    assert (resolution.type_name, resolution.brand) == (type_name, brand)
+    if method in ("alias", "exact", "brand_default"):
+        assert resolution.method == method
+
+
+def test_unrelated_words_do_not_resolve(type_resolver):
+    assert type_resolver.resolve("purple elephant") is None
+
+
+def test_resolve_exact_finds_mentions_inside_a_sentence(type_resolver):
+    resolution = type_resolver.resolve_exact("I have a massey fergie sit on mower")
+    assert (resolution.type_name, resolution.brand) == ("Ride-on Mower", "Massey Ferguson")
+    # No phonetic guessing in the exact pass
+    assert type_resolver.resolve_exact("vintij tractor") is None
+
+
+def test_type_lookup_falls_back_to_the_resolver(monkeypatch):
+    catalog = TractorTypeCatalog(lambda: None)
+    catalog.load(TRACTOR_TYPES)
+    monkeypatch.setattr(database, "tractor_catalog", catalog)
+    monkeypatch.setattr(database, "_type_resolver", None)
+    monkeypatch.setattr(database, "_type_resolver_version", -1)
+
+    assert asyncio.run(database.get_tractor_type_by_name("cabota"))["name"] == "Compact Tractor"
+    assert asyncio.run(database.search_tractor_types("massey fergie"))[0]["name"] == "Farm Tractor"
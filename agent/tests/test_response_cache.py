@@ -0,0 +1,41 @@
+"""Near-duplicate prompts share a cached answer only when it fits them."""
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+
+from src.response_cache import ResponseCache
+
+PROMPT = "what does the premium plan cover on a kubota compact tractor"
+
+
+def _cache_with(prompt: str, text: str = "Cached answer.") -> ResponseCache:
+    cache = ResponseCache(enabled=True)
+    assert cache.store(prompt, None, text, [])
+    return cache
+
+
+def test_near_duplicate_prompt_is_a_hit():
+    cache = _cache_with(PROMPT)
+    assert cache.lookup("what exactly does the premium plan cover on a kubota compact tractor") == "Cached answer."
+    assert cache.near_hits == 1
+
+
+def test_different_brand_or_plan_is_never_a_near_hit():
+    cache = _cache_with(PROMPT)
+    # Jaccard 0.75 each, but the answer is about another brand / plan
+    assert cache.lookup("what does the premium plan cover on a deere compact tractor") is None
+    assert cache.lookup("what does the basic plan cover on a kubota compact tractor") is None
+    assert cache.lookup("what does the premium plan cover on a compact tractor") is None
+    assert cache.near_hits == 0
+
+
+def test_state_changing_and_personal_runs_are_not_stored():
+    cache = ResponseCache(enabled=True)
+    quoted = [ModelResponse(parts=[ToolCallPart("generate_insurance_quote", {"plan_type": "premium"})])]
+    assert not cache.store(PROMPT, None, "Your quote is 40 pounds.", quoted)
+
+    class Session:
+        user_name, tractor_name = "Sam", "Old Red"
+        tractor_type = tractor_age = has_modifications = quoted_plan = None
+
+    assert not cache.store(PROMPT, Session(), "Old Red is covered for breakdowns.", [])
+    assert len(cache) == 0 and cache.rejected == 2
@@ -0,0 +1,62 @@
+"""The fast path answers labelled slot-filling turns and defers everything else."""
+
+import asyncio
+import glob
+import os
+
+import httpx
+import pytest
+from pydantic_ai.models.function import FunctionModel
+
+from benchmarks.fakes import TRACTOR_TYPES
+from benchmarks.router_bench import TRANSCRIPT_DIR, load_turns, matches
+from src import agent as agent_module
+from src import database
+from src.catalog import TractorTypeCatalog
+from src.resolver import TypeResolver
+from src.router import route_utterance
+from src.sessions import SessionContext
+
+TURNS = load_turns(sorted(glob.glob(os.path.join(TRANSCRIPT_DIR, "*.jsonl"))))
+RESOLVER = TypeResolver(t["name"] for t in TRACTOR_TYPES)
+
+
+@pytest.mark.parametrize("turn", TURNS, ids=[turn["text"] for turn in TURNS])
+def test_recorded_turns_route_as_labelled(turn):
+    route = route_utterance(turn["text"], RESOLVER, SessionContext(**turn.get("context", {})))
+    assert matches(route, turn.get("expected")), route
+
+
+def test_bare_number_is_an_age_only_when_one_was_asked_for():
+    assert route_utterance("seven", RESOLVER, SessionContext()) is None
+    route = route_utterance("seven", RESOLVER, SessionContext(tractor_type="Farm Tractor"))
+    assert (route.intent, route.age_years) == ("provide_age", 7)
+
+
+def _no_model(messages, info):
+    raise AssertionError("the fast path must not call the model")
+
+
+def test_slot_filling_turn_is_answered_without_the_model(monkeypatch):
+    catalog = TractorTypeCatalog(lambda: None)
+    catalog.load(TRACTOR_TYPES)
+    monkeypatch.setattr(database, "tractor_catalog", catalog)
+    monkeypatch.setattr(database, "_type_resolver", None)
+    monkeypatch.setattr(database, "_type_resolver_version", -1)
+    monkeypatch.setattr(agent_module, "FAST_PATH_ENABLED", True)
+
+    async def post(content):
+        transport = httpx.ASGITransport(app=agent_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/chat/completions",
+                params={"custom_session_id": "Sam|test-router"},
+                json={"stream": False, "messages": [{"role": "user", "content": content}]},
+            )
+
+    with agent_module.tracker_agent.override(model=FunctionModel(_no_model)):
+        reply = asyncio.run(post("it's a cabota compact, 7 years old")).json()["choices"][0]["message"]["content"]
+
+    ctx = agent_module.get_session_context("Sam|test-router")
+    assert (ctx.tractor_type, ctx.tractor_brand, ctx.tractor_age) == ("Compact Tractor", "Kubota", 7)
+    assert "Compact Tractor" in reply and reply.endswith(agent_module.next_question(ctx))
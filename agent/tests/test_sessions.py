@@ -0,0 +1,52 @@
+"""A failed session read must never be written back over the stored session."""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.sessions import SessionBackend, SessionContext, SessionStore
+
+
+class FlakyBackend(SessionBackend):
+    shared = True
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {"s1": SessionContext(tractor_age=9).to_dict()}
+        self.saved: List[Tuple[str, Dict[str, Any]]] = []
+        self.failing = True
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if self.failing:
+            raise ConnectionError("backend unavailable")
+        return self.rows.get(session_id)
+
+    async def save_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        self.saved.extend(items)
+        self.rows.update(items)
+
+
+async def _scenario(backend: FlakyBackend, store: SessionStore) -> None:
+    ctx = await store.load("s1")
+    assert ctx.tractor_age is None
+    # Tools in the same turn see the same context
+    assert store.get("s1") is ctx
+    ctx.tractor_type = "Farm Tractor"
+    store.mark_dirty("s1")
+    await store.flush()
+    assert backend.saved == []
+    assert backend.rows["s1"]["tractor_age"] == 9
+
+    # The next turn reads the backend again
+    backend.failing = False
+    ctx = await store.load("s1")
+    assert ctx.tractor_age == 9
+    store.mark_dirty("s1")
+    await store.flush()
+    assert [session_id for session_id, _ in backend.saved] == ["s1"]
+
+
+def test_failed_load_is_not_written_back():
+    backend = FlakyBackend()
+    store = SessionStore(backend)
+    asyncio.run(_scenario(backend, store))
+    assert store.stats()["load_errors"] == 1
+    assert store.stats()["unsaved"] == 1
@@ -0,0 +1,61 @@
+"""Model deltas are re-chunked for TTS without changing the transcript."""
+
+import asyncio
+import json
+
+from src.sse import CompletionChunks, SentenceChunker, chunk_deltas
+
+
+def _chunker() -> SentenceChunker:
+    return SentenceChunker(first_min_chars=12, first_max_ms=150, max_chars=60)
+
+
+def test_first_chunk_flushes_at_the_first_clause_once_long_enough():
+    chunker = _chunker()
+    assert chunker.feed("Sure, ", now=0.0) == []  # a boundary, but under first_min_chars
+    assert chunker.feed("a Farm Tractor, seven", now=0.01) == ["Sure, a Farm Tractor, "]
+    assert chunker.buffer == "seven"
+
+
+def test_first_chunk_flushes_at_a_word_after_the_deadline():
+    chunker = _chunker()
+    assert chunker.feed("Well", now=0.0) == []
+    assert chunker.feed(" let", now=0.1) == []
+    assert chunker.feed(" me", now=0.2) == ["Well let "]
+
+
+def test_later_chunks_wait_for_a_sentence_unless_too_long():
+    chunker = _chunker()
+    chunker.feed("Hello there. ", now=0.0)
+    # A clause boundary alone does not end a later chunk
+    assert chunker.feed("Premium covers theft, ", now=0.3) == []
+    assert chunker.feed("fire and flood. And", now=0.4) == ["Premium covers theft, fire and flood. "]
+    # No sentence end: cut at a word once max_chars is reached
+    chunks = [chunk for _ in range(10) for chunk in chunker.feed(" more words", now=0.5)]
+    assert chunks and all(60 <= len(chunk) < 60 + len(" more words") for chunk in chunks)
+
+
+def test_chunks_concatenate_to_the_model_output():
+    text = "Right, so a seven year old Kubota on Premium is 41.40 a month! Want me to save that? Great."
+    deltas = [text[i:i + 3] for i in range(0, len(text), 3)]
+
+    async def stream():
+        for delta in deltas:
+            yield delta
+
+    async def collect():
+        return [chunk async for chunk in chunk_deltas(stream(), chunking=True)]
+
+    chunks = asyncio.run(collect())
+    assert "".join(chunks) == text
+    assert len(chunks) < len(deltas)
+
+
+def test_completion_frames_are_valid_sse_json():
+    frames = CompletionChunks()
+    frame = frames.content('He said "hi"\n')
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    payload = json.loads(frame[len("data: "):])
+    assert payload["id"] == frames.id
+    assert payload["choices"][0]["delta"]["content"] == 'He said "hi"\n'
+    assert frames.done().endswith("data: [DONE]\n\n")
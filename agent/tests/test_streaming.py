@@ -0,0 +1,65 @@
+"""Streamed turns run every tool call, including ones made after text."""
+
+import asyncio
+import json
+from typing import List
+
+import httpx
+
+from pydantic_ai.messages import ModelMessage, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+from src import agent as agent_module
+from src.agent import TrackerDeps, app, get_session_context, stream_agent_deltas, tracker_agent
+
+
+def _tool_returns(messages: List[ModelMessage]) -> List[ToolReturnPart]:
+    return [part for message in messages for part in message.parts if isinstance(part, ToolReturnPart)]
+
+
+async def _lead_in_then_tool(messages: List[ModelMessage], info: AgentInfo):
+    """Gemini's pattern: a sentence, then a tool call in the same response."""
+    if not _tool_returns(messages):
+        yield "Let me check that."
+        yield {0: DeltaToolCall(name="confirm_tractor_age", json_args='{"age_years": 7}', tool_call_id="call-1")}
+    else:
+        yield "Seven years is a solid working age."
+
+
+async def _collect(session_id: str) -> List[str]:
+    deps = TrackerDeps(session_id=session_id)
+    return [delta async for delta in stream_agent_deltas("My tractor is 7 years old", deps, None, [])]
+
+
+def test_tool_call_after_text_is_executed():
+    session_id = "test-stream-tool-after-text"
+    with tracker_agent.override(model=FunctionModel(stream_function=_lead_in_then_tool)):
+        deltas = asyncio.run(_collect(session_id))
+
+    assert get_session_context(session_id).tractor_age == 7
+    assert "".join(deltas) == "Let me check that. Seven years is a solid working age."
+
+
+async def _post_copilotkit(thread_id: str) -> List[dict]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/copilotkit",
+            json={"threadId": thread_id, "messages": [{"role": "user", "content": "My tractor is 7 years old"}]},
+            headers={"accept": "text/event-stream"},
+        )
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def test_copilotkit_stream_executes_tool_after_text(monkeypatch):
+    # Force the agent run rather than the local slot-filling router
+    monkeypatch.setattr(agent_module, "FAST_PATH_ENABLED", False)
+    thread_id = "test-copilotkit-tool-after-text"
+    with tracker_agent.override(model=FunctionModel(stream_function=_lead_in_then_tool)):
+        events = asyncio.run(_post_copilotkit(thread_id))
+
+    assert get_session_context(f"copilotkit:{thread_id}").tractor_age == 7
+    assert [e["type"] for e in events][0] == "RUN_STARTED"
+    assert events[-1]["type"] == "RUN_FINISHED"
+    text = "".join(e["delta"] for e in events if e["type"] == "TEXT_MESSAGE_CONTENT")
+    assert text == "Let me check that. Seven years is a solid working age."
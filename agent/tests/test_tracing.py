@@ -0,0 +1,74 @@
+"""Stage latencies feed per-request traces and the Prometheus /metrics endpoint."""
+
+import asyncio
+import contextvars
+
+import httpx
+
+from src import agent as agent_module
+from src import tracing
+from src.tracing import StageMetrics, record, span, start_trace
+
+
+def test_histogram_buckets_are_cumulative_with_quantiles():
+    metrics = StageMetrics()
+    for seconds in (0.004, 0.02, 0.02, 3.0, 60.0):
+        metrics.observe("db_query", "get_user", seconds)
+    text = metrics.render_prometheus({"tracker_db_pool_size": 4})
+
+    labels = 'stage="db_query",name="get_user"'
+    assert f'tracker_stage_duration_seconds_bucket{{{labels},le="0.005"}} 1' in text
+    assert f'tracker_stage_duration_seconds_bucket{{{labels},le="0.025"}} 3' in text
+    assert f'tracker_stage_duration_seconds_bucket{{{labels},le="30.0"}} 4' in text
+    # Samples past the last bound only show up under +Inf
+    assert f'tracker_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 5' in text
+    assert f"tracker_stage_duration_seconds_count{{{labels}}} 5" in text
+    assert f'tracker_stage_duration_quantile_seconds{{{labels},quantile="0.5"}} 0.020000' in text
+    assert "# TYPE tracker_db_pool_size gauge\ntracker_db_pool_size 4\n" in text
+
+    summary = metrics.summary()["db_query"]
+    assert summary["count"] == 5 and summary["p50_ms"] == 20.0
+
+
+def test_spans_are_collected_on_the_current_request_trace(monkeypatch):
+    monkeypatch.setattr(tracing, "stage_metrics", StageMetrics())
+
+    def request():
+        trace = start_trace()
+        with span("tool", "calculate_quote"):
+            pass
+        record("db_query", "get_user", 0.03)
+        record("db_query", "get_user", 0.01)
+        return trace
+
+    trace = contextvars.copy_context().run(request)
+    assert [(stage, name) for stage, name, _ in trace.spans] == [
+        ("tool", "calculate_quote"), ("db_query", "get_user"), ("db_query", "get_user"),
+    ]
+    assert round(trace.breakdown()["db_query"]) == 40
+    assert "db_query=40ms(2)" in trace.summary()
+    # Outside a request only the histograms are fed
+    record("llm", "gemini", 0.5)
+    assert tracing.stage_metrics.summary()["llm"]["count"] == 1
+    assert trace.spans[-1][0] == "db_query"
+
+
+def test_metrics_endpoint_serves_histograms_and_gauges(monkeypatch):
+    metrics = StageMetrics()
+    metrics.observe("request", "/chat/completions", 0.2)
+    monkeypatch.setattr(agent_module, "stage_metrics", metrics)
+
+    async def get():
+        transport = httpx.ASGITransport(app=agent_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/metrics")
+
+    response = asyncio.run(get())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert 'tracker_stage_duration_seconds_count{stage="request",name="/chat/completions"} 1' in lines
+    for gauge in ("tracker_db_pool_size", "tracker_db_pool_in_use", "tracker_db_reads_executed",
+                  "tracker_write_queue_quotes_depth"):
+        assert any(line.startswith(f"{gauge} ") for line in lines), gauge
+    assert any(line.startswith("tracker_admission_") for line in lines)
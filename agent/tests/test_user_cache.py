@@ -0,0 +1,68 @@
+"""Per-user read cache: hits, invalidation, and loads racing a write."""
+
+import asyncio
+
+from src import database
+from src.database import UserReadCache, _MISSING
+
+
+def test_load_overlapping_an_invalidation_is_not_stored():
+    cache = UserReadCache(ttl_seconds=60, max_users=10)
+    token = cache.token()
+    # A write lands while the read is in flight
+    cache.invalidate("user-1")
+    cache.put("user-1", "profile", {"name": "before the write"}, token)
+    assert cache.get("user-1", "profile") is _MISSING
+
+    cache.put("user-1", "profile", {"name": "after"}, cache.token())
+    assert cache.get("user-1", "profile") == {"name": "after"}
+
+
+def test_invalidate_drops_every_read_for_the_user_only():
+    cache = UserReadCache(ttl_seconds=60, max_users=10)
+    for user_id in ("user-1", "user-2"):
+        for kind in ("profile", "tractors"):
+            cache.put(user_id, kind, f"{user_id}:{kind}", cache.token())
+
+    cache.invalidate("user-1")
+    assert cache.get("user-1", "profile") is _MISSING and cache.get("user-1", "tractors") is _MISSING
+    assert cache.get("user-2", "tractors") == "user-2:tractors"
+
+
+def test_least_recently_used_user_is_evicted():
+    cache = UserReadCache(ttl_seconds=60, max_users=2)
+    cache.put("a", "profile", 1, cache.token())
+    cache.put("b", "profile", 2, cache.token())
+    cache.get("a", "profile")
+    cache.put("c", "profile", 3, cache.token())
+    assert cache.get("b", "profile") is _MISSING
+    assert cache.get("a", "profile") == 1 and cache.evicted == 1
+
+
+def test_read_racing_a_write_does_not_cache_the_old_row(monkeypatch):
+    cache = UserReadCache(ttl_seconds=60, max_users=10)
+    monkeypatch.setattr(database, "user_cache", cache)
+    rows = {"user-1": {"name": "old"}}
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def user_read(name, method, user_id):
+        row = dict(rows[user_id])
+        started.set()
+        await release.wait()
+        return row
+
+    monkeypatch.setattr(database, "_user_read", user_read)
+
+    async def scenario():
+        read = asyncio.create_task(database.get_user_profile("user-1"))
+        await started.wait()
+        rows["user-1"] = {"name": "new"}
+        cache.invalidate("user-1")
+        release.set()
+        assert await read == {"name": "old"}
+        # The stale result was served to the racing read but not cached
+        started.clear()
+        release.set()
+        assert await database.get_user_profile("user-1") == {"name": "new"}
+
+    asyncio.run(scenario())
@@ -7,6 +7,8 @@
  * - insurance_policies: Active insurance policies
  * - policy_quotes: Quote history
  * - claims: Insurance claims
+ * - agent_sessions: Tracker agent session state (SESSION_BACKEND=postgres)
+ * - rating_tables: Compiled Tracker rating tables (RATING_TABLE_SOURCE=db)
  */
 
 require('dotenv').config({ path: '.env.local' });
@@ -137,6 +139,26 @@ async function setupDatabase() {
     )
   `;
 
+  // Session state shared by agent workers (agent/src/sessions.py)
+  console.log('Creating agent_sessions table...');
+  await sql`
+    CREATE TABLE IF NOT EXISTS agent_sessions (
+      session_id TEXT PRIMARY KEY,
+      data JSONB NOT NULL,
+      updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+  `;
+
+  // Compiled rating tables (agent/src/rating.py: python -m src.rating compile --save-db)
+  console.log('Creating rating_tables table...');
+  await sql`
+    CREATE TABLE IF NOT EXISTS rating_tables (
+      version TEXT PRIMARY KEY,
+      payload JSONB NOT NULL,
+      created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+  `;
+
   // Seed dog breeds data
   console.log('\n🐾 Seeding dog breeds...');
   const breeds = [
@@ -185,6 +207,8 @@ async function setupDatabase() {
   console.log('  - policy_quotes');
   console.log('  - claims');
   console.log('  - user_profiles');
+  console.log('  - agent_sessions');
+  console.log('  - rating_tables');
 }
 
 setupDatabase().catch(console.error);